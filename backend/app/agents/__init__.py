@@ -3,26 +3,51 @@ Agents Module
 =============
 
 AI Agent 层，负责业务逻辑编排 (所有使用 LLM 的模块)
+
+各 Agent 按需懒加载（PEP 562），导入 app.agents 时不会加载全部子模块及其依赖。
 """
 
-from .base import BaseAgent
-from .report_agent import ReportAgent
-from .intent_agent import IntentAgent
-from .suggestion_agent import SuggestionAgent
-from .error_explainer import ErrorExplainerAgent
-from .sentiment_agent import SentimentAgent
-from .news_summary_agent import NewsSummaryAgent
-from .prediction_analysis_agent import PredictionAnalysisAgent
-from .influence_summary_agent import InfluenceSummaryAgent
-
-__all__ = [
-    "BaseAgent",
-    "ReportAgent",
-    "IntentAgent",
-    "SuggestionAgent",
-    "ErrorExplainerAgent",
-    "SentimentAgent",
-    "NewsSummaryAgent",
-    "PredictionAnalysisAgent",
-    "InfluenceSummaryAgent",
-]
+import importlib
+from typing import TYPE_CHECKING
+
+# 导出名称 -> 所在子模块
+_LAZY_IMPORTS = {
+    "BaseAgent": "base",
+    "ReportAgent": "report_agent",
+    "IntentAgent": "intent_agent",
+    "SuggestionAgent": "suggestion_agent",
+    "ErrorExplainerAgent": "error_explainer",
+    "SentimentAgent": "sentiment_agent",
+    "NewsSummaryAgent": "news_summary_agent",
+    "PredictionAnalysisAgent": "prediction_analysis_agent",
+    "InfluenceSummaryAgent": "influence_summary_agent",
+    "EventSummaryAgent": "event_summary_agent",
+}
+
+if TYPE_CHECKING:
+    from .base import BaseAgent
+    from .report_agent import ReportAgent
+    from .intent_agent import IntentAgent
+    from .suggestion_agent import SuggestionAgent
+    from .error_explainer import ErrorExplainerAgent
+    from .sentiment_agent import SentimentAgent
+    from .news_summary_agent import NewsSummaryAgent
+    from .prediction_analysis_agent import PredictionAnalysisAgent
+    from .influence_summary_agent import InfluenceSummaryAgent
+    from .event_summary_agent import EventSummaryAgent
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value  # 缓存，后续访问不再走 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
+
+
+__all__ = list(_LAZY_IMPORTS)
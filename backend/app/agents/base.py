@@ -5,13 +5,14 @@ Agent 基类
 所有 LLM Agent 的基类，提供统一的初始化、调用和错误处理逻辑。
 """
 
-import json
 from abc import ABC
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, AsyncGenerator
 
-from openai import OpenAI
+import orjson
 
 from app.core.config import settings
+from . import llm_cache
+from .llm_client import get_sync_client, get_async_client, call_with_retry, acall_with_retry
 
 
 class BaseAgent(ABC):
@@ -19,13 +20,18 @@ class BaseAgent(ABC):
     LLM Agent 基类
 
     提供：
-    1. 统一的 OpenAI 客户端初始化
-    2. 统一的 LLM 调用接口
+    1. 统一的 OpenAI 客户端初始化（同步 + 异步）
+    2. 统一的 LLM 调用接口（call_llm / acall_llm / astream_llm）
     3. 统一的错误处理
     4. 统一的对话历史处理
     5. 统一的 JSON 解析
+    6. 可选的 LLM 响应缓存（cache=True，仅非流式调用）
+    7. 全局并发限流 + 瞬时错误（429/超时/5xx）指数退避重试
     """
 
+    # 固定实例属性，省去每个实例的 __dict__；子类需声明 __slots__ = ()
+    __slots__ = ("api_key", "base_url", "model", "temperature", "client", "async_client")
+
     DEFAULT_MODEL = "deepseek-chat"
     DEFAULT_BASE_URL = "https://api.deepseek.com"
     DEFAULT_TEMPERATURE = 0.3
@@ -51,7 +57,9 @@ class BaseAgent(ABC):
         self.base_url = base_url or self.DEFAULT_BASE_URL
         self.model = model or self.DEFAULT_MODEL
         self.temperature = temperature if temperature is not None else self.DEFAULT_TEMPERATURE
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        # 同一配置的 Agent 共享客户端；异步客户端复用共享连接池（HTTP/2 + keep-alive）
+        self.client = get_sync_client(self.api_key, self.base_url)
+        self.async_client = get_async_client(self.api_key, self.base_url)
 
     @property
     def agent_name(self) -> str:
@@ -67,7 +75,9 @@ class BaseAgent(ABC):
         fallback: Optional[str] = None,
         temperature: Optional[float] = None,
         response_format: Optional[Dict] = None,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        cache: bool = False,
+        timeout: Optional[float] = None
     ) -> str:
         """
         统一 LLM 调用
@@ -80,6 +90,8 @@ class BaseAgent(ABC):
             temperature: 温度参数（覆盖默认）
             response_format: 响应格式（如 {"type": "json_object"}）
             max_tokens: 最大 token 数
+            cache: 是否启用响应缓存（流式调用忽略）
+            timeout: 单次请求超时秒数（超时按瞬时错误重试）
 
         Returns:
             LLM 响应内容字符串
@@ -94,9 +106,19 @@ class BaseAgent(ABC):
             kwargs["response_format"] = response_format
         if max_tokens:
             kwargs["max_tokens"] = max_tokens
+        if timeout:
+            kwargs["timeout"] = timeout
+
+        cache_key = self._cache_key(kwargs) if cache and not stream else None
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
         try:
-            response = self.client.chat.completions.create(**kwargs)
+            response = call_with_retry(
+                lambda: self.client.chat.completions.create(**kwargs), self.agent_name
+            )
 
             if stream:
                 content = ""
@@ -108,7 +130,12 @@ class BaseAgent(ABC):
                             on_chunk(delta)
                 return content
             else:
-                return response.choices[0].message.content
+                choice = response.choices[0]
+                content = choice.message.content
+                # 被 max_tokens 截断的响应不缓存（否则截断结果会被反复复用）
+                if cache_key and content and choice.finish_reason != "length":
+                    llm_cache.put(cache_key, content)
+                return content
 
         except Exception as e:
             print(f"[{self.agent_name}] LLM 调用失败: {e}")
@@ -116,6 +143,117 @@ class BaseAgent(ABC):
                 return fallback
             raise
 
+    async def acall_llm(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        fallback: Optional[str] = None,
+        temperature: Optional[float] = None,
+        response_format: Optional[Dict] = None,
+        max_tokens: Optional[int] = None,
+        cache: bool = False,
+        cache_if: Optional[Callable[[str], bool]] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        异步 LLM 调用（非流式），不阻塞事件循环，可配合 asyncio.gather 并发
+
+        Args:
+            messages: 消息列表
+            fallback: 错误时返回值（设置后启用异常捕获）
+            temperature: 温度参数（覆盖默认）
+            response_format: 响应格式（如 {"type": "json_object"}）
+            max_tokens: 最大 token 数
+            cache: 是否启用响应缓存
+            cache_if: 缓存前的校验（返回 False 时不写入缓存，如 JSON 解析失败）
+            timeout: 单次请求超时秒数（超时按瞬时错误重试）
+
+        Returns:
+            LLM 响应内容字符串
+        """
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature if temperature is not None else self.temperature,
+        }
+        if response_format:
+            kwargs["response_format"] = response_format
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        if timeout:
+            kwargs["timeout"] = timeout
+
+        cache_key = self._cache_key(kwargs) if cache else None
+        if cache_key:
+            cached = await llm_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            response = await acall_with_retry(
+                lambda: self.async_client.chat.completions.create(**kwargs), self.agent_name
+            )
+            choice = response.choices[0]
+            content = choice.message.content
+            # 被 max_tokens 截断或未通过校验的响应不缓存
+            if (
+                cache_key
+                and content
+                and choice.finish_reason != "length"
+                and (cache_if is None or cache_if(content))
+            ):
+                await llm_cache.aput(cache_key, content)
+            return content
+        except Exception as e:
+            print(f"[{self.agent_name}] LLM 异步调用失败: {e}")
+            if fallback is not None:
+                return fallback
+            raise
+
+    async def astream_llm(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        异步流式 LLM 调用，逐个产出增量文本（首 token 即可下发）
+
+        Args:
+            messages: 消息列表
+            temperature: 温度参数（覆盖默认）
+            max_tokens: 最大 token 数
+
+        Yields:
+            增量文本片段
+        """
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature if temperature is not None else self.temperature,
+            "stream": True
+        }
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+
+        response = await acall_with_retry(
+            lambda: self.async_client.chat.completions.create(**kwargs), self.agent_name
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _cache_key(self, kwargs: Dict[str, Any]) -> str:
+        """根据请求参数生成响应缓存键"""
+        params = {
+            k: v for k, v in kwargs.items()
+            if k not in ("model", "temperature", "messages", "stream", "timeout")
+        }
+        return llm_cache.make_key(
+            kwargs["model"], kwargs["temperature"], kwargs["messages"], **params
+        )
+
     def build_messages(
         self,
         user_content: str,
@@ -135,26 +273,20 @@ class BaseAgent(ABC):
         Returns:
             消息列表
         """
-        messages = []
-
-        # 系统提示
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-
-        # 对话历史
+        # 对话历史（仅保留最近 window 条）
+        recent = ()
         if conversation_history:
-            window = history_window or self.DEFAULT_HISTORY_WINDOW
-            recent = conversation_history[-window:] if len(conversation_history) > window else conversation_history
-            for msg in recent:
-                messages.append({
-                    "role": msg.get("role", "user"),
-                    "content": msg.get("content", "")
-                })
-
-        # 用户消息
-        messages.append({"role": "user", "content": user_content})
+            recent = conversation_history[-(history_window or self.DEFAULT_HISTORY_WINDOW):]
 
-        return messages
+        # 一次性构建：系统提示 + 对话历史 + 用户消息
+        return [
+            *(({"role": "system", "content": system_prompt},) if system_prompt else ()),
+            *(
+                {"role": msg.get("role", "user"), "content": msg.get("content", "")}
+                for msg in recent
+            ),
+            {"role": "user", "content": user_content},
+        ]
 
     def parse_json(self, text: str) -> Dict[str, Any]:
         """
@@ -167,7 +299,7 @@ class BaseAgent(ABC):
             解析后的字典
 
         Raises:
-            json.JSONDecodeError: JSON 解析失败
+            orjson.JSONDecodeError: JSON 解析失败（json.JSONDecodeError 的子类）
         """
         text = text.strip()
         if text.startswith("```"):
@@ -179,7 +311,7 @@ class BaseAgent(ABC):
             if lines and lines[-1].strip() == "```":
                 lines = lines[:-1]
             text = "\n".join(lines).strip()
-        return json.loads(text)
+        return orjson.loads(text)
 
     def parse_json_safe(self, text: str, fallback: Optional[Dict] = None) -> Dict[str, Any]:
         """
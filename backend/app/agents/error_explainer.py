@@ -12,6 +12,8 @@ from app.data.fetcher import DataFetchError
 class ErrorExplainerAgent(BaseAgent):
     """错误解释 Agent - 将技术错误转换为友好的用户解释"""
 
+    __slots__ = ()
+
     DEFAULT_TEMPERATURE = 0.7
 
     SYSTEM_PROMPT = "你是小易，一个专业且友好的金融分析助手。你擅长用简单易懂的方式解释技术问题，并给出实用建议。"
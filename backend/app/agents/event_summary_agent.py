@@ -6,12 +6,16 @@
 用于将供电量变化+新闻聚合总结为简洁的事件描述
 """
 
-from typing import List, Dict
-from datetime import datetime
-from openai import OpenAI
+import asyncio
+import functools
+import heapq
+import os
+from typing import Any, Callable, List, Dict, Optional
 
+from .base import BaseAgent
 
-class EventSummaryAgent:
+
+class EventSummaryAgent(BaseAgent):
     """
     事件总结Agent
 
@@ -19,8 +23,26 @@ class EventSummaryAgent:
     - 聚合异常区间内的新闻
     - 结合供电量变化
     - 生成30字以内的凝练事件摘要
+    - 多区间并发总结（TaskGroup + 固定数量 worker 限流）
     """
 
+    __slots__ = ()
+
+    DEFAULT_TEMPERATURE = 0.0  # 确定性输出，确保专业性并可复用响应缓存
+
+    # 批量总结时的最大并发请求数
+    MAX_CONCURRENCY = 16
+
+    # prompt 中最多使用的新闻条数与标题长度（控制输入 token）
+    MAX_PROMPT_NEWS = 10
+    MAX_TITLE_CHARS = 80
+
+    SYSTEM_PROMPT = "你是专业的电力能源分析师，擅长提炼核心事件。"
+
+    # LLM 失败时的降级摘要模板
+    FALLBACK_NEWS_TEMPLATE = "%s等%d条信息"
+    FALLBACK_CHANGE_TEMPLATE = "供电量变化%+.1f%%"
+
     def __init__(self, api_key: str = None):
         """
         初始化
@@ -28,21 +50,20 @@ class EventSummaryAgent:
         Args:
             api_key: Deepseek API密钥（可选，从环境变量读取）
         """
-        import os
+        api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
 
-        self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
-
-        if not self.api_key:
+        if not api_key:
             raise ValueError("DEEPSEEK_API_KEY not found in environment")
 
-        self.client = OpenAI(api_key=self.api_key, base_url="https://api.deepseek.com")
+        super().__init__(api_key=api_key)
 
-    def summarize_zone(
+    async def summarize_zone(
         self,
         zone_dates: List[str],
         price_change: float,
         news_items: List[Dict],
         region_name: str = "该地区",
+        rank_fn: Optional[Callable[[Dict], Any]] = None,
     ) -> str:
         """
         总结异常区间的关键事件
@@ -52,29 +73,101 @@ class EventSummaryAgent:
             price_change: 区间供电量变化百分比
             news_items: 新闻列表
             region_name: 区域名称 (Added for internal knowledge context)
+            rank_fn: 新闻排序键（可选，取值越大越优先，如 impact_score），默认保持原顺序
 
         Returns:
             凝练的事件摘要（30字以内）
         """
+        prompt = self._build_prompt(
+            zone_dates, price_change, news_items, region_name, rank_fn
+        )
+        messages = self.build_messages(
+            user_content=prompt, system_prompt=self.SYSTEM_PROMPT
+        )
+
+        try:
+            summary = (
+                await self.acall_llm(messages, max_tokens=100, cache=True)
+            ).strip()
+
+            # 截断超长输出
+            if len(summary) > 40:
+                summary = summary[:37] + "..."
+
+            return summary
+
+        except Exception:
+            # Fallback到简单总结
+            if news_items:
+                first_news = news_items[0].get("title", "")[:20]
+                return self._fallback_summary(first_news, len(news_items), price_change)
+            return self._fallback_summary(None, 0, price_change)
+
+    async def summarize_zones(self, zones: List[Dict]) -> List[str]:
+        """
+        并发总结多个异常区间
+
+        Args:
+            zones: summarize_zone 的参数字典列表，每项包含
+                   zone_dates / price_change / news_items / region_name
+
+        Returns:
+            与 zones 顺序一致的事件摘要列表
+        """
+        results: List[Optional[str]] = [None] * len(zones)
+        pending = iter(enumerate(zones))
+
+        # 最多 MAX_CONCURRENCY 个 worker 依次领取区间，任务数与区间数无关
+        async def _worker():
+            for i, zone in pending:
+                results[i] = await self.summarize_zone(**zone)
+
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(min(self.MAX_CONCURRENCY, len(zones))):
+                tg.create_task(_worker())
+
+        return results
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def _fallback_summary(
+        cls, first_news: Optional[str], news_count: int, price_change: float
+    ) -> str:
+        """降级摘要（缓存：故障期间重试相同输入时复用结果）"""
+        if first_news is not None:
+            return cls.FALLBACK_NEWS_TEMPLATE % (first_news, news_count)
+        return cls.FALLBACK_CHANGE_TEMPLATE % price_change
+
+    def _build_prompt(
+        self,
+        zone_dates: List[str],
+        price_change: float,
+        news_items: List[Dict],
+        region_name: str,
+        rank_fn: Optional[Callable[[Dict], Any]] = None,
+    ) -> str:
+        """构建事件总结 prompt"""
         # 如果没有新闻，强制使用LLM内部知识
         has_news = bool(news_items)
 
-        # 构建prompt
         start_date = zone_dates[0]
         end_date = zone_dates[-1]
 
         if has_news:
+            # 先截取 Top-K 再格式化，避免对全部新闻分配字符串
+            if rank_fn:
+                top_news = heapq.nlargest(self.MAX_PROMPT_NEWS, news_items, key=rank_fn)
+            else:
+                top_news = news_items[: self.MAX_PROMPT_NEWS]
             news_summary = "\n".join(
-                [
-                    f"- [{item.get('content_type', '资讯')}] {item.get('title', '')}"
-                    for item in news_items[:10]
-                ]
+                f"- [{item.get('content_type', '资讯')}] {item.get('title', '')[: self.MAX_TITLE_CHARS]}"
+                for item in top_news
             )
             context_str = f"新闻:\n{news_summary}"
         else:
             context_str = f"（无外部新闻提供，请调用你的内部知识库，分析{region_name}在此期间可能发生的事件，如气候、节假日、政策等）"
 
-        prompt = f"""你是电力能源分析师。根据以下信息总结这段时期的关键事件（严格控制在30字以内）：
+        return f"""你是电力能源分析师。根据以下信息总结这段时期的关键事件（严格控制在30字以内）：
 
 区域: {region_name}
 时间: {start_date} 至 {end_date}
@@ -92,34 +185,3 @@ class EventSummaryAgent:
 - "受寒潮影响，居民取暖负荷预期将大幅攀升"
 - "春节假期结束，工业复工导致负荷快速回升"
 """
-
-        try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是专业的电力能源分析师，擅长提炼核心事件。",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=100,
-                temperature=0.3,  # 降低随机性，确保专业性
-            )
-
-            summary = response.choices[0].message.content.strip()
-
-            # 截断超长输出
-            if len(summary) > 40:
-                summary = summary[:37] + "..."
-
-            return summary
-
-        except Exception as e:
-            print(f"[EventSummaryAgent] Error calling Deepseek: {e}")
-            # Fallback到简单总结
-            if news_items:
-                first_news = news_items[0].get("title", "")[:20]
-                return f"{first_news}等{len(news_items)}条信息"
-            else:
-                return f"供电量变化{price_change:+.1f}%"
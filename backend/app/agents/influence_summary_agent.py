@@ -5,6 +5,7 @@
 使用 LLM 生成多因素相关性分析的摘要
 """
 
+from datetime import date
 from typing import Dict, Any, List, Optional
 
 from .base import BaseAgent
@@ -13,7 +14,16 @@ from .base import BaseAgent
 class InfluenceSummaryAgent(BaseAgent):
     """多因素相关性分析摘要生成 Agent"""
 
-    DEFAULT_TEMPERATURE = 0.4
+    __slots__ = ()
+
+    # 确定性输出，相同输入可命中响应缓存
+    DEFAULT_TEMPERATURE = 0.0
+
+    # 因子类型 -> (英文名关键词, 中文名关键词, 单位)
+    FACTOR_KINDS = {
+        "temperature": ("temperature", "气温", "℃"),
+        "humidity": ("humidity", "湿度", "%"),
+    }
 
     SYSTEM_PROMPT = """你是资深的电力需求分析专家。你的任务是根据多因素相关性分析结果，生成一段简洁、准确、逻辑自洽的分析摘要。
 
@@ -51,7 +61,7 @@ class InfluenceSummaryAgent(BaseAgent):
         
         messages = self.build_messages(user_content=prompt, system_prompt=self.SYSTEM_PROMPT)
         
-        content = self.call_llm(messages, fallback=None)
+        content = self.call_llm(messages, fallback=None, cache=True)
         
         if content is None:
             print(f"[{self.agent_name}] LLM 生成摘要失败")
@@ -114,14 +124,8 @@ class InfluenceSummaryAgent(BaseAgent):
             # 格式化日期（仅用于内部参考，不在摘要中显示）
             start_date = period_info.get('start_date', '')
             end_date = period_info.get('end_date', '')
-            if hasattr(start_date, 'strftime'):
-                start_date_str = start_date.strftime('%Y-%m-%d')
-            else:
-                start_date_str = str(start_date)
-            if hasattr(end_date, 'strftime'):
-                end_date_str = end_date.strftime('%Y-%m-%d')
-            else:
-                end_date_str = str(end_date)
+            start_date_str = self._format_date(start_date)
+            end_date_str = self._format_date(end_date)
             
             prompt_parts.append(f"内部时间段参考：{start_date_str} 至 {end_date_str}")
             prompt_parts.append("请在摘要中使用模糊描述，如'在某段时间'、'在近期某段时期'等，不要使用具体日期。")
@@ -133,20 +137,13 @@ class InfluenceSummaryAgent(BaseAgent):
                 
                 # 判断因子类型，生成合适的描述
                 factor_name_val = str(period_info.get('factor_name', ''))
-                if 'temperature' in factor_name_val or '气温' in factor_name_cn:
-                    unit = "℃"
-                    if factor_change < 0:
-                        factor_desc = f"{factor_name_cn}从{factor_start:.1f}{unit}降至{factor_end:.1f}{unit}（下降{abs(factor_change):.1f}{unit}）"
-                    else:
-                        factor_desc = f"{factor_name_cn}从{factor_start:.1f}{unit}升至{factor_end:.1f}{unit}（上升{factor_change:.1f}{unit}）"
-                elif 'humidity' in factor_name_val or '湿度' in factor_name_cn:
-                    unit = "%"
-                    if factor_change < 0:
-                        factor_desc = f"{factor_name_cn}从{factor_start:.1f}{unit}降至{factor_end:.1f}{unit}（下降{abs(factor_change):.1f}{unit}）"
-                    else:
-                        factor_desc = f"{factor_name_cn}从{factor_start:.1f}{unit}升至{factor_end:.1f}{unit}（上升{factor_change:.1f}{unit}）"
-                else:
+                unit = self._factor_unit(factor_name_val, factor_name_cn)
+                if unit is None:
                     factor_desc = f"{factor_name_cn}从{factor_start:.2f}变化至{factor_end:.2f}（变化{factor_change:+.2f}）"
+                else:
+                    direction = "降至" if factor_change < 0 else "升至"
+                    trend = "下降" if factor_change < 0 else "上升"
+                    factor_desc = f"{factor_name_cn}从{factor_start:.1f}{unit}{direction}{factor_end:.1f}{unit}（{trend}{abs(factor_change):.1f}{unit}）"
                 
                 prompt_parts.append(f"{factor_desc}")
             
@@ -166,3 +163,18 @@ class InfluenceSummaryAgent(BaseAgent):
         prompt_parts.append("请基于以上数据生成分析摘要。")
         
         return "\n".join(prompt_parts)
+
+    @classmethod
+    def _factor_unit(cls, factor_name: str, factor_name_cn: str) -> Optional[str]:
+        """根据因子名称识别单位，未知类型返回 None"""
+        for name_en, name_cn, unit in cls.FACTOR_KINDS.values():
+            if name_en in factor_name or name_cn in factor_name_cn:
+                return unit
+        return None
+
+    @staticmethod
+    def _format_date(value: Any) -> str:
+        """日期格式化为 YYYY-MM-DD，非日期类型直接转字符串"""
+        if isinstance(value, date):
+            return value.strftime('%Y-%m-%d')
+        return str(value)
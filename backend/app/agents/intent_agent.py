@@ -11,169 +11,66 @@
 - 预测参数: forecast_model, history_days, forecast_horizon
 """
 
-from typing import Dict, List, Optional, Generator, Callable, Tuple
-import json
+from typing import Any, Dict, List, Optional, Generator, AsyncGenerator, Callable, Tuple
+import re
+import time
+
+import orjson
 
 from .base import BaseAgent
+from .json_stream import JSONFieldStream
 from app.schemas.session_schema import UnifiedIntent, ResolvedKeywords
 
 
 class IntentAgent(BaseAgent):
     """统一意图识别 Agent"""
 
-    DEFAULT_TEMPERATURE = 0.1
+    __slots__ = ()
 
-    INTENT_SYSTEM_PROMPT = """你是电力需求预测助手的意图识别模块。根据用户问题，一次性判断所有意图信息。
+    DEFAULT_TEMPERATURE = 0.1
 
-## 服务范围 (is_in_scope)
+    # 流式回复合并策略：遇到句末标点、累计字数或超时即刷新一帧
+    STREAM_FLUSH_PATTERN = re.compile(r"[。？！.?!\n]\s*$")
+    STREAM_FLUSH_CHARS = 40
+    STREAM_FLUSH_INTERVAL = 0.05  # 秒
 
-**原则：尽可能帮助用户，宽松判断，只对明显无关的问题拒绝**
+    # 流式意图识别中 JSON 代码块的起始标记与提取正则（允许未闭合）
+    JSON_FENCE_START = "```json"
+    JSON_FENCE_PATTERN = re.compile(r"```json(.*?)(?:```|\Z)", re.DOTALL)
 
-- in_scope=true（绝大多数情况）:
-  - 电力需求分析/预测（如"预测北京供电需求"、"分析上海用电量"）
-  - 天气对电力影响相关问题
-  - 新闻/资讯查询
-  - 日常闲聊、打招呼（如"你好"、"谢谢"）
-  - 关于助手自身的问题（如"你是谁"、"你能做什么"）
-  - 任何可以用电力/天气知识或常识回答的问题
-  - 模糊边界的问题（先尝试回答）
+    # 意图识别系统提示词：保持逐字节一致，便于服务端前缀缓存命中；
+    # 输出方式通过 user 消息中的指令说明
+    INTENT_SYSTEM_PROMPT = """你是电力需求预测助手的意图识别模块。根据用户问题，一次性判断所有意图信息。
 
-- in_scope=false（仅限明显不相关）:
-  - 明确要求非电力服务（如"帮我写代码"、"翻译这段话"、"写一首诗"）
-  - 此时设置 out_of_scope_reply 友好拒绝并说明能力范围
+## 服务范围 (is_in_scope) - 宽松判断，只对明显无关的问题拒绝
+- true（绝大多数情况）: 电力需求分析/预测、天气对电力的影响、新闻/资讯查询、日常闲聊、关于助手自身的问题、任何可用电力/天气知识或常识回答的问题、模糊边界的问题
+- false（仅限明显不相关）: 明确要求非电力服务（如"帮我写代码"、"翻译这段话"、"写一首诗"），此时设置 out_of_scope_reply 友好拒绝并说明能力范围
 
 ## 预测判断 (is_forecast)
+- true: 明确要求分析/预测供电需求（"预测北京供电需求"）、要求换模型重新分析（"换XGBoost模型"）、要求改变时间参数（"预测未来60天"）
+- false: 只是查询新闻/资讯（"寒潮影响"）、闲聊或追问（"刚才的结果什么意思"）、无需预测的问题
 
-判断是否需要执行电力需求预测分析：
-- is_forecast=true:
-  - 明确要求分析/预测供电需求（"预测北京供电需求"、"分析未来用电量"）
-  - 要求改变模型重新分析（"换XGBoost模型"）
-  - 要求改变时间参数（"预测未来60天"）
-
-- is_forecast=false:
-  - 只是查询新闻/资讯（"北京最近有什么天气新闻"、"寒潮影响"）
-  - 闲聊或追问（"刚才的结果什么意思"）
-  - 无需预测的问题
-
-## 工具开关
-
-判断需要启用哪些工具（可同时开启多个）：
-
-- enable_rag: 研报知识库检索（电力相关）
-  - true: 用户提到研报、研究报告、行业分析
-  - 示例: "电力行业研报"、"供电需求分析报告"
-
-- enable_search: 网络搜索
-  - true: 用户明确要搜索新闻/资讯，或需要最新信息
-  - 示例: "搜索北京天气新闻"、"帮我查一下寒潮影响"
-
-- enable_domain_info: 领域信息获取
-  - true: 需要获取天气/电力相关的领域信息（实时新闻、天气数据等）
-  - 在预测流程中通常自动开启
-  - 示例: "今天有什么天气新闻"
-
-注意：
-- 预测流程 (is_forecast=true) 通常自动开启 enable_search 和 enable_domain_info
-- 非预测的新闻查询，如果用户只是随便问问，开启 enable_domain_info
-- 非预测的明确搜索，开启 enable_search
-
-## 区域提取 (region_mention + region_name)
-
-从用户问题中提取提到的城市/区域名称：
-- region_mention: 用户原始输入的区域名称
-  - 单区域: "北京"、"上海"、"广州"
-  - 多区域: "北京,上海" (逗号分隔，但通常只支持单区域)
-  - 无区域: 留空
-
-- region_name: 你需要将用户输入的简称/别名转换为标准城市名称
-  - "帝都" → "北京"
-  - "魔都" → "上海"
-  - "羊城"/"花城" → "广州"
-  - "鹏城" → "深圳"
-  - "杭城" → "杭州"
-  - "蓉城" → "成都"
-  - "江城" → "武汉"
-  - "古都" → "西安"
-  - "金陵" → "南京"
-  - "津门" → "天津"
-  - 如果用户输入的已经是标准名称，直接使用
-  - 多区域时用逗号分隔: "北京,上海"（但通常只支持单区域）
-  - 无区域: 留空
-
-## 关键词提取 (raw_*_keywords)
-
-提取初步搜索关键词（后续会根据区域匹配结果优化）：
-- raw_search_keywords: 网络搜索关键词
-- raw_rag_keywords: 研报检索关键词
-- raw_domain_keywords: 领域信息关键词
-
-示例：
-- "预测北京供电需求" → raw_search_keywords=["北京 供电需求", "北京 电力"]
-- "搜索寒潮影响" → raw_search_keywords=["寒潮", "寒潮 电力"]
-
-## 预测参数
-
-仅 is_forecast=true 时需要设置：
-- forecast_model: 如果用户明确指定了模型（如"用XGBoost"、"用prophet模型"），则返回对应的模型名称（prophet/xgboost/randomforest/dlinear）；如果用户没有指定模型，则返回 null（表示自动选择最佳模型）
-- history_days: 历史数据天数 (默认365)
-- forecast_horizon: 预测天数 (默认30)
-
-根据用户描述调整：
-- "用XGBoost" → forecast_model="xgboost"
-- "用prophet模型" → forecast_model="prophet"
-- 用户没有提到具体模型 → forecast_model=null
-- "预测三个月" → forecast_horizon=90
-- "看半年数据" → history_days=180
-
-返回 JSON 格式:
-{
-    "is_in_scope": true/false,
-    "is_forecast": true/false,
-    "enable_rag": true/false,
-    "enable_search": true/false,
-    "enable_domain_info": true/false,
-    "region_mention": "用户原始输入的区域名称或空字符串",
-    "region_name": "转换后的标准城市名称或空字符串",
-    "raw_search_keywords": ["关键词1", "关键词2"],
-    "raw_rag_keywords": ["关键词1"],
-    "raw_domain_keywords": ["关键词1"],
-    "forecast_model": null,
-    "history_days": 365,
-    "forecast_horizon": 30,
-    "reason": "判断理由",
-    "out_of_scope_reply": "若超出范围的友好回复，否则为null"
-}"""
-
-    STREAMING_SYSTEM_PROMPT = """你是电力需求预测助手的意图识别模块。请先分析用户意图，然后返回结果。
-
-## 分析步骤（请详细描述你的思考过程）
-
-1. **理解问题**: 用户在问什么？是否涉及电力需求/天气/供电？
-2. **判断范围**: 是否在服务范围内？
-3. **识别意图**: 是否需要预测分析？还是只是查询/闲聊？
-4. **提取信息**: 提到了哪些城市/区域？需要哪些工具？
-5. **设置参数**: 如果需要预测，设置预测参数
+## 工具开关（可同时开启多个）
+- enable_rag: 研报知识库检索，用户提到研报、研究报告、行业分析时开启
+- enable_search: 网络搜索，用户明确要搜索新闻/资讯或需要最新信息时开启
+- enable_domain_info: 领域信息获取（天气新闻、电力资讯）
+- 预测流程通常自动开启 enable_search 和 enable_domain_info；非预测的随意询问开启 enable_domain_info；非预测的明确搜索开启 enable_search
 
-## 服务范围 (is_in_scope) - 宽松判断
-- true: 电力需求/天气相关问题、日常闲聊、关于助手的问题、任何可以回答的问题
-- false: 仅限明确要求非电力服务（如写代码、翻译），需设置 out_of_scope_reply
+## 区域提取
+- region_mention: 用户原始输入的区域名称，无区域留空
+- region_name: 转换后的标准城市名称，无区域留空；多区域用逗号分隔（通常只支持单区域）
+  - 别名: 帝都→北京、魔都→上海、羊城/花城→广州、鹏城→深圳、杭城→杭州、蓉城→成都、江城→武汉、古都→西安、金陵→南京、津门→天津
 
-## 预测判断 (is_forecast)
-- true: 明确要求分析/预测供电需求
-- false: 只是查询新闻/资讯、闲聊或追问
-
-## 工具开关
-- enable_rag: 研报知识库检索（电力相关）
-- enable_search: 网络搜索
-- enable_domain_info: 领域信息获取（天气新闻、电力资讯）
+## 关键词提取 (raw_*_keywords，后续会根据区域匹配结果优化)
+- raw_search_keywords / raw_rag_keywords / raw_domain_keywords: 网络搜索 / 研报检索 / 领域信息关键词
+- 示例: "预测北京供电需求" → raw_search_keywords=["北京 供电需求", "北京 电力"]
 
 ## 预测参数（仅 is_forecast=true）
-- forecast_model: 如果用户明确指定了模型（如"用XGBoost"、"用prophet模型"），则返回对应的模型名称（prophet/xgboost/randomforest/dlinear）；如果用户没有指定模型，则返回 null（表示自动选择最佳模型）
-- history_days: 历史数据天数
-- forecast_horizon: 预测天数
+- forecast_model: 用户明确指定模型时返回 prophet/xgboost/randomforest/dlinear（如"用XGBoost"→"xgboost"），未指定返回 null（自动选择最佳模型）
+- history_days: 历史数据天数，默认365（"看半年数据"→180）
+- forecast_horizon: 预测天数，默认30（"预测三个月"→90）
 
-请先输出你的思考过程，然后用 ```json 代码块输出结果：
-```json
+## 输出 JSON 格式
 {
     "is_in_scope": true/false,
     "is_forecast": true/false,
@@ -190,8 +87,10 @@ class IntentAgent(BaseAgent):
     "forecast_horizon": 30,
     "reason": "简短判断理由",
     "out_of_scope_reply": null
-}
-```"""
+}"""
+
+    # 流式模式的输出指令（放在 user 消息中，保持 system 前缀不变）
+    STREAMING_INSTRUCTION = "请先简要描述思考过程（理解问题→判断范围→识别意图→提取信息→设置参数），然后用 ```json 代码块输出结果。"
 
     CHAT_SYSTEM_PROMPT = """你是专业的电力能源分析助手。根据上下文和对话历史回答用户问题。
 
@@ -229,11 +128,37 @@ class IntentAgent(BaseAgent):
             out_of_scope_reply=result.get("out_of_scope_reply"),
         )
 
+    def _parse_intent_json(self, content: str) -> Dict:
+        """
+        解析意图 JSON：优先提取 ```json 代码块，没有代码块时按纯 JSON 解析
+
+        Args:
+            content: LLM 输出内容
+
+        Returns:
+            意图字典，解析失败时返回默认值
+        """
+        match = self.JSON_FENCE_PATTERN.search(content)
+        try:
+            result = orjson.loads(match.group(1).strip() if match else content)
+            if isinstance(result, dict):
+                return result
+        except orjson.JSONDecodeError:
+            pass
+
+        print(f"[{self.agent_name}] JSON 解析失败: {content}")
+        return {
+            "is_in_scope": True,
+            "is_forecast": False,
+            "reason": "解析失败，使用默认值",
+        }
+
     def recognize_intent_streaming(
         self,
         user_query: str,
         conversation_history: Optional[List[Dict[str, str]]] = None,
         on_thinking_chunk: Optional[Callable[[str], None]] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
     ) -> Tuple[UnifiedIntent, str]:
         """
         流式意图识别 - 实时返回思考过程
@@ -242,49 +167,59 @@ class IntentAgent(BaseAgent):
             user_query: 用户问题
             conversation_history: 对话历史
             on_thinking_chunk: 回调函数，接收思考内容片段
+            on_field: 回调函数，JSON 块中每个顶层字段完整到达时立即回调 (key, value)，
+                      下游可在整个响应结束前开始准备（如预测流程的数据预取）
 
         Returns:
             (UnifiedIntent, 完整思考内容)
         """
         messages = self.build_messages(
-            user_content=f"用户问题: {user_query}\n\n请分析意图。",
-            system_prompt=self.STREAMING_SYSTEM_PROMPT,
+            user_content=f"用户问题: {user_query}\n\n{self.STREAMING_INSTRUCTION}",
+            system_prompt=self.INTENT_SYSTEM_PROMPT,
             conversation_history=conversation_history,
         )
 
         # 使用状态变量跟踪是否进入 JSON 块
-        state = {"full_content": "", "in_json_block": False, "thinking_content": ""}
+        # scan_pos 记录已扫描位置，避免每个 chunk 都从头查找标记（O(n²)）
+        state = {
+            "full_content": "",
+            "in_json_block": False,
+            "thinking_content": "",
+            "scan_pos": 0,
+        }
+        fence = self.JSON_FENCE_START
+        field_stream = JSONFieldStream() if on_field else None
+
+        def _emit_fields(text: str):
+            for key, value in field_stream.feed(text):
+                on_field(key, value)
 
         def _on_chunk(delta: str):
             state["full_content"] += delta
 
-            if "```json" in state["full_content"] and not state["in_json_block"]:
-                state["in_json_block"] = True
-                state["thinking_content"] = (
-                    state["full_content"].split("```json")[0].strip()
-                )
+            if state["in_json_block"]:
+                if field_stream:
+                    _emit_fields(delta)
+                return
 
-            if not state["in_json_block"] and on_thinking_chunk:
+            full = state["full_content"]
+            idx = full.find(fence, state["scan_pos"])
+            if idx >= 0:
+                state["in_json_block"] = True
+                state["thinking_content"] = full[:idx].strip()
+                if field_stream:
+                    _emit_fields(full[idx + len(fence):])
+                return
+
+            # 保留标记长度-1 的尾部，防止标记跨 chunk 被截断
+            state["scan_pos"] = max(0, len(full) - len(fence) + 1)
+            if on_thinking_chunk:
                 on_thinking_chunk(delta)
 
         full_content = self.call_llm(messages, stream=True, on_chunk=_on_chunk)
 
         # 提取 JSON 结果
-        try:
-            if "```json" in full_content:
-                json_str = full_content.split("```json")[1]
-                if "```" in json_str:
-                    json_str = json_str.split("```")[0]
-                result = json.loads(json_str.strip())
-            else:
-                result = json.loads(full_content)
-        except json.JSONDecodeError:
-            print(f"[{self.agent_name}] JSON 解析失败: {full_content}")
-            result = {
-                "is_in_scope": True,
-                "is_forecast": False,
-                "reason": "解析失败，使用默认值",
-            }
+        result = self._parse_intent_json(full_content)
 
         thinking_content = state["thinking_content"]
         if not thinking_content:
@@ -320,49 +255,64 @@ class IntentAgent(BaseAgent):
         matched_code = region_code or stock_code
 
         if not matched_name and not matched_code:
-            return ResolvedKeywords(
+            # 原始关键词已在 UnifiedIntent 中校验过，直接构造，不再重复校验/复制
+            return ResolvedKeywords.model_construct(
                 search_keywords=intent.raw_search_keywords,
                 rag_keywords=intent.raw_rag_keywords,
                 domain_keywords=intent.raw_domain_keywords,
             )
 
-        search_keywords = list(intent.raw_search_keywords)
-        rag_keywords = list(intent.raw_rag_keywords)
-        domain_keywords = list(intent.raw_domain_keywords)
+        # 优先使用region_mention，如果没有则使用stock_mention（兼容）
+        region_mention = intent.region_mention or intent.stock_mention
 
-        if matched_name:
-            if matched_name not in search_keywords:
-                search_keywords.insert(0, matched_name)
-            if matched_name not in rag_keywords:
-                rag_keywords.insert(0, matched_name)
-            if matched_name not in domain_keywords:
-                domain_keywords.insert(0, matched_name)
+        return ResolvedKeywords(
+            search_keywords=self._merge_keywords(
+                intent.raw_search_keywords, matched_name, matched_code, region_mention
+            ),
+            rag_keywords=self._merge_keywords(
+                intent.raw_rag_keywords, matched_name, None, region_mention
+            ),
+            domain_keywords=self._merge_keywords(
+                intent.raw_domain_keywords, matched_name, matched_code, region_mention
+            ),
+        )
 
-        if matched_code:
-            if matched_code not in search_keywords:
-                search_keywords.append(matched_code)
-            if matched_code not in domain_keywords:
-                domain_keywords.append(matched_code)
+    @staticmethod
+    def _merge_keywords(
+        keywords: List[str],
+        matched_name: Optional[str],
+        matched_code: Optional[str],
+        region_mention: Optional[str],
+    ) -> List[str]:
+        """
+        合并单组关键词：区域名置首、区域代码置尾（去重），并将简称替换为标准名称
 
-        # 优先使用region_mention，如果没有则使用stock_mention（兼容）
-        region_mention = intent.region_mention or intent.stock_mention
+        Args:
+            keywords: 原始关键词
+            matched_name: 匹配到的区域名称
+            matched_code: 匹配到的区域代码（为 None 时不追加）
+            region_mention: 用户原始提及的区域名称
+
+        Returns:
+            合并后的关键词列表
+        """
+        result = list(keywords)
+        seen = set(result)
+
+        if matched_name and matched_name not in seen:
+            result.insert(0, matched_name)
+            seen.add(matched_name)
+
+        if matched_code and matched_code not in seen:
+            result.append(matched_code)
 
         if region_mention and matched_name and region_mention != matched_name:
-            for i, kw in enumerate(search_keywords):
-                if region_mention in kw:
-                    search_keywords[i] = kw.replace(region_mention, matched_name)
-            for i, kw in enumerate(rag_keywords):
-                if region_mention in kw:
-                    rag_keywords[i] = kw.replace(region_mention, matched_name)
-            for i, kw in enumerate(domain_keywords):
-                if region_mention in kw:
-                    domain_keywords[i] = kw.replace(region_mention, matched_name)
+            result = [
+                kw.replace(region_mention, matched_name) if region_mention in kw else kw
+                for kw in result
+            ]
 
-        return ResolvedKeywords(
-            search_keywords=search_keywords,
-            rag_keywords=rag_keywords,
-            domain_keywords=domain_keywords,
-        )
+        return result
 
     def generate_chat_response(
         self,
@@ -383,29 +333,104 @@ class IntentAgent(BaseAgent):
         Returns:
             回复文本或生成器
         """
+        messages = self._build_chat_messages(user_query, conversation_history, context)
+
+        if stream:
+            return self._stream_response(messages)
+        else:
+            return self.call_llm(messages, temperature=0.3)
+
+    async def agenerate_chat_response(
+        self,
+        user_query: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        context: Optional[str] = None,
+        stream: bool = False,
+    ):
+        """
+        生成聊天回复 (异步版本，直接在事件循环中 await，无需线程池)
+
+        Args:
+            user_query: 用户问题
+            conversation_history: 对话历史
+            context: 额外上下文 (如检索到的内容)
+            stream: 是否流式输出
+
+        Returns:
+            回复文本或异步生成器
+        """
+        messages = self._build_chat_messages(user_query, conversation_history, context)
+
+        if stream:
+            return self._astream_response(messages)
+        else:
+            return await self.acall_llm(messages, temperature=0.3)
+
+    def _build_chat_messages(
+        self,
+        user_query: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        context: Optional[str],
+    ) -> List[Dict[str, str]]:
+        """构建聊天回复的消息列表"""
         user_content = user_query
         if context:
             user_content = f"参考信息:\n{context}\n\n用户问题: {user_query}"
 
-        messages = self.build_messages(
+        return self.build_messages(
             user_content=user_content,
             system_prompt=self.CHAT_SYSTEM_PROMPT,
             conversation_history=conversation_history,
             history_window=10,
         )
 
-        if stream:
-            return self._stream_response(messages)
-        else:
-            return self.call_llm(messages, temperature=0.3)
+    def _should_flush(self, delta: str, size: int, last_flush: float) -> bool:
+        """判断缓冲区是否需要刷新"""
+        return (
+            size >= self.STREAM_FLUSH_CHARS
+            or self.STREAM_FLUSH_PATTERN.search(delta) is not None
+            or time.monotonic() - last_flush >= self.STREAM_FLUSH_INTERVAL
+        )
 
     def _stream_response(self, messages: List[Dict]) -> Generator[str, None, None]:
-        """流式响应 - 生成器模式"""
+        """流式响应 - 生成器模式（按句子边界合并 token，减少下游帧数）"""
         # 使用底层 client 直接调用以支持生成器模式
         response = self.client.chat.completions.create(
             model=self.model, messages=messages, temperature=0.3, stream=True
         )
 
+        buffer: List[str] = []
+        size = 0
+        last_flush = time.monotonic()
         for chunk in response:
             if chunk.choices and chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+                delta = chunk.choices[0].delta.content
+                buffer.append(delta)
+                size += len(delta)
+                if self._should_flush(delta, size, last_flush):
+                    yield "".join(buffer)
+                    buffer.clear()
+                    size = 0
+                    last_flush = time.monotonic()
+
+        if buffer:
+            yield "".join(buffer)
+
+    async def _astream_response(
+        self, messages: List[Dict]
+    ) -> AsyncGenerator[str, None]:
+        """流式响应 - 异步生成器模式（按句子边界合并 token）"""
+        buffer: List[str] = []
+        size = 0
+        last_flush = time.monotonic()
+        async for delta in self.astream_llm(messages, temperature=0.3):
+            buffer.append(delta)
+            size += len(delta)
+            if self._should_flush(delta, size, last_flush):
+                yield "".join(buffer)
+                buffer.clear()
+                size = 0
+                last_flush = time.monotonic()
+
+        if buffer:
+            yield "".join(buffer)
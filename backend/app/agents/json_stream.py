@@ -0,0 +1,93 @@
+"""
+流式 JSON 字段解析
+==================
+
+LLM 流式输出 JSON 时，逐块喂入文本，每当一个顶层字段完整到达即解析并返回，
+无需等待整个响应结束。
+"""
+
+from typing import Any, List, Tuple
+
+import orjson
+
+
+class JSONFieldStream:
+    """
+    增量扫描顶层 JSON 对象，按字段完成顺序产出 (key, value)
+
+    只跟踪括号深度与字符串状态，字段在遇到顶层 "," 或 "}" 时视为完整，
+    嵌套对象/数组作为整体在完成后产出。
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._escaped = False
+        self._seg_start = -1
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        喂入新的文本片段
+
+        Args:
+            text: 新到达的文本
+
+        Returns:
+            本次新完成的 (字段名, 值) 列表
+        """
+        if self.done or not text:
+            return []
+
+        self._buf += text
+        fields: List[Tuple[str, Any]] = []
+        buf = self._buf
+
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+
+            if self._in_str:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+
+            if self._depth == 0:
+                # 等待顶层对象开始
+                if ch == "{":
+                    self._depth = 1
+                    self._seg_start = i + 1
+                continue
+
+            if ch == '"':
+                self._in_str = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    fields.extend(self._parse_segment(buf[self._seg_start:i]))
+                    self.done = True
+                    break
+            elif ch == "," and self._depth == 1:
+                fields.extend(self._parse_segment(buf[self._seg_start:i]))
+                self._seg_start = i + 1
+
+        self._pos = len(buf)
+        return fields
+
+    @staticmethod
+    def _parse_segment(segment: str) -> List[Tuple[str, Any]]:
+        """解析单个 "key": value 片段，失败时忽略"""
+        segment = segment.strip()
+        if not segment:
+            return []
+        try:
+            return list(orjson.loads("{" + segment + "}").items())
+        except orjson.JSONDecodeError:
+            return []
@@ -0,0 +1,104 @@
+"""
+LLM 响应缓存
+============
+
+按 (model, temperature, messages) 的 SHA256 内容寻址缓存 LLM 响应。
+两级缓存：进程内 LRU（L1）+ Redis（L2，多个 worker 共享）；
+Redis 不可用时静默降级为仅 L1。
+"""
+
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from app.core.redis_client import get_redis
+
+CACHE_KEY_PREFIX = "llm_cache:"
+CACHE_TTL = 7 * 86400  # 7天过期
+LOCAL_CACHE_SIZE = 2048  # 进程内 LRU 容量
+
+_local_cache: "OrderedDict[str, str]" = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _local_get(key: str) -> Optional[str]:
+    with _local_lock:
+        value = _local_cache.get(key)
+        if value is not None:
+            _local_cache.move_to_end(key)
+        return value
+
+
+def _local_put(key: str, value: str):
+    with _local_lock:
+        _local_cache[key] = value
+        _local_cache.move_to_end(key)
+        if len(_local_cache) > LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def make_key(
+    model: str,
+    temperature: float,
+    messages: List[Dict[str, str]],
+    **params: Any,
+) -> str:
+    """
+    生成缓存键
+
+    Args:
+        model: 模型名称
+        temperature: 温度参数
+        messages: 消息列表
+        **params: 其它影响输出的请求参数（如 max_tokens、response_format）
+
+    Returns:
+        Redis 缓存键
+    """
+    payload = orjson.dumps(
+        {"m": model, "t": temperature, "msgs": messages, "p": params},
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return CACHE_KEY_PREFIX + hashlib.sha256(payload).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """读取缓存（先 L1 后 L2），未命中或 Redis 异常时返回 None"""
+    value = _local_get(key)
+    if value is not None:
+        return value
+    try:
+        value = get_redis().get(key)
+    except Exception as e:
+        print(f"[LLMCache] Redis 读取失败: {e}")
+        return None
+    if value is not None:
+        _local_put(key, value)
+    return value
+
+
+def put(key: str, value: str, ttl: int = CACHE_TTL):
+    """写入缓存（L1 + L2），Redis 异常时忽略"""
+    _local_put(key, value)
+    try:
+        get_redis().setex(key, ttl, value)
+    except Exception as e:
+        print(f"[LLMCache] Redis 写入失败: {e}")
+
+
+async def aget(key: str) -> Optional[str]:
+    """异步读取缓存：L1 命中直接返回，L2 查询放到线程中执行，不阻塞事件循环"""
+    value = _local_get(key)
+    if value is not None:
+        return value
+    return await asyncio.to_thread(get, key)
+
+
+async def aput(key: str, value: str, ttl: int = CACHE_TTL):
+    """异步写入缓存（Redis 写入在线程中执行）"""
+    _local_put(key, value)
+    await asyncio.to_thread(put, key, value, ttl)
@@ -0,0 +1,191 @@
+"""
+LLM 客户端与 HTTP 连接池
+========================
+
+所有 Agent 共享同一个 httpx 异步连接池（HTTP/2 多路复用 + keep-alive），
+避免每个 AsyncOpenAI 客户端各自建立 TCP/TLS 连接；同步客户端同样共享一个
+httpx.Client 连接池（线程安全，供线程池中的流式调用复用）。
+
+OpenAI / AsyncOpenAI 客户端按 (api_key, base_url) 缓存为单例，
+不同 Agent 使用同一配置时复用同一客户端及其连接池。
+
+call_with_retry / acall_with_retry 为 LLM 请求提供全局并发限流，
+并对限流、超时、5xx 等瞬时错误做指数退避重试。
+"""
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import httpx
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    APIConnectionError,
+    InternalServerError,
+    RateLimitError,
+)
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=64,
+    keepalive_expiry=60.0,
+)
+
+# SDK 内置重试关闭，统一由 call_with_retry / acall_with_retry 处理
+LLM_MAX_RETRIES = 0
+
+# 可重试的瞬时错误（APITimeoutError 是 APIConnectionError 的子类）
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+# 全局同时在途的 LLM 请求上限（低于服务商 QPS 限制）
+MAX_INFLIGHT_REQUESTS = 32
+
+T = TypeVar("T")
+
+_sync_limiter = threading.BoundedSemaphore(MAX_INFLIGHT_REQUESTS)
+# asyncio.Semaphore 绑定事件循环，按循环分别创建
+_async_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+_async_http_client: Optional[httpx.AsyncClient] = None
+_sync_http_client: Optional[httpx.Client] = None
+_sync_clients: Dict[Tuple[str, str], OpenAI] = {}
+_async_clients: Dict[Tuple[str, str], AsyncOpenAI] = {}
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """获取共享的异步 HTTP 客户端（单例）"""
+    global _async_http_client
+    if _async_http_client is None or _async_http_client.is_closed:
+        _async_http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=HTTP_LIMITS,
+        )
+    return _async_http_client
+
+
+def get_sync_http_client() -> httpx.Client:
+    """获取共享的同步 HTTP 客户端（单例）"""
+    global _sync_http_client
+    if _sync_http_client is None or _sync_http_client.is_closed:
+        _sync_http_client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            limits=HTTP_LIMITS,
+        )
+    return _sync_http_client
+
+
+def get_sync_client(api_key: str, base_url: str) -> OpenAI:
+    """获取共享的同步 OpenAI 客户端（按 api_key + base_url 单例，复用共享连接池）"""
+    key = (api_key, base_url)
+    client = _sync_clients.get(key)
+    if client is None:
+        client = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=get_sync_http_client(),
+        )
+        _sync_clients[key] = client
+    return client
+
+
+def get_async_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    """获取共享的异步 OpenAI 客户端（按 api_key + base_url 单例，复用共享连接池）"""
+    key = (api_key, base_url)
+    client = _async_clients.get(key)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=get_async_http_client(),
+        )
+        _async_clients[key] = client
+    return client
+
+
+def _retry_delay(attempt: int) -> float:
+    """指数退避时长（带随机抖动，避免重试同时到达）"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _get_async_limiter() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limiter = _async_limiters.get(loop)
+    if limiter is None:
+        limiter = asyncio.Semaphore(MAX_INFLIGHT_REQUESTS)
+        _async_limiters[loop] = limiter
+    return limiter
+
+
+def call_with_retry(fn: Callable[[], T], tag: str = "LLM") -> T:
+    """
+    同步执行 LLM 请求：全局限流 + 瞬时错误指数退避重试
+
+    Args:
+        fn: 发起请求的无参函数
+        tag: 日志标签
+
+    Returns:
+        fn 的返回值；重试耗尽或不可重试错误时抛出原异常
+    """
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            with _sync_limiter:
+                return fn()
+        except RETRYABLE_ERRORS as e:
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+            delay = _retry_delay(attempt)
+            print(f"[{tag}] LLM 瞬时错误，{delay:.1f}s 后第{attempt + 1}次重试: {e}")
+            time.sleep(delay)
+
+
+async def acall_with_retry(fn: Callable[[], Awaitable[T]], tag: str = "LLM") -> T:
+    """
+    异步执行 LLM 请求：全局限流 + 瞬时错误指数退避重试
+
+    Args:
+        fn: 返回协程的无参函数（每次重试重新调用）
+        tag: 日志标签
+
+    Returns:
+        协程结果；重试耗尽或不可重试错误时抛出原异常
+    """
+    limiter = _get_async_limiter()
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            async with limiter:
+                return await fn()
+        except RETRYABLE_ERRORS as e:
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+            delay = _retry_delay(attempt)
+            print(f"[{tag}] LLM 瞬时错误，{delay:.1f}s 后第{attempt + 1}次重试: {e}")
+            await asyncio.sleep(delay)
+
+
+async def close_async_http_client():
+    """关闭共享的异步 HTTP 客户端（应用关闭时调用）"""
+    global _async_http_client
+    # 缓存的异步客户端持有旧连接池，一并丢弃
+    _async_clients.clear()
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
@@ -15,6 +15,8 @@ from app.schemas.session_schema import NewsItem, SummarizedNewsItem
 class NewsSummaryAgent(BaseAgent):
     """新闻总结 Agent - 批量总结新闻标题和内容"""
 
+    __slots__ = ()
+
     DEFAULT_TEMPERATURE = 0.3
 
     def summarize(
@@ -6,20 +6,61 @@ Agent for analyzing change points in power supply prediction data.
 Uses Deepseek to interpret the causes of significant changes (e.g., weather, holidays, events).
 """
 
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+import asyncio
+import logging
 import os
-from openai import OpenAI
 
+import orjson
 
-class PredictionAnalysisAgent:
+from .base import BaseAgent
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionAnalysisAgent(BaseAgent):
     """
     Agent for analyzing change points in prediction data.
 
     Capabilities:
     1. Analyze the cause of a detected change point (sudden rise/drop).
     2. Context-aware analysis (considering weather, date, holidays).
+    3. Batched analysis of many change points (async).
     """
 
+    __slots__ = ()
+
+    # 温度为 0 保证相同突变点输出稳定，便于缓存复用
+    DEFAULT_TEMPERATURE = 0.0
+    MAX_TOKENS = 60
+    # 单次请求超时（秒），超时按瞬时错误重试
+    REQUEST_TIMEOUT = 30.0
+    # 批量分析时的最大并发请求数
+    MAX_CONCURRENCY = 8
+    # 单次请求合并分析的突变点数
+    BATCH_SIZE = 8
+    # 批量请求每个突变点的 token 预算：一句原因（MAX_TOKENS）+ {"idx", "reason"} JSON 包装
+    BATCH_TOKENS_PER_POINT = 80
+
+    FALLBACK_NO_KEY = "Analysis unavailable (API key missing)."
+    FALLBACK_ERROR = "Analysis failed due to service error."
+
+    # 固定指令作为 system 前缀，保持字节级一致以命中 DeepSeek 前缀缓存（勿插入动态内容）
+    CHANGE_POINT_SYSTEM_PROMPT = """你是电力负荷分析专家。根据用户给出的用电负荷突变点（日期、类型、幅度、区域、环境），用一句中文指出最可能的原因。
+考虑：气温骤变/极端天气；节假日（点明具体节日）、调休、周末；大型活动、工业复工/停工。
+要求：结合气温说明（如"气温高达35度，空调用电增加"）；客观专业；只基于该区域本地情况，不提其他地区；禁用金融术语；可依据内部知识判断当日当地真实事件；只输出一句话。"""
+
+    # 单个突变点的描述模板及字段取值映射
+    POINT_TEMPLATE = (
+        "{mode}突变点\n"
+        "日期: {date}\n"
+        "类型: {type}，幅度(Z): {magnitude:.2f}\n"
+        "区域: {region}\n"
+        "环境: {weather}"
+    )
+    CHANGE_TYPE_NAMES = {"rise": "上升", "drop": "下降"}
+    POINT_MODE_NAMES = {True: "预测", False: "历史"}
+
     def __init__(self, api_key: str = None):
         """
         Initialize the agent.
@@ -27,17 +68,17 @@ class PredictionAnalysisAgent:
         Args:
             api_key: Deepseek API key (optional, reads from env)
         """
-        self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
-        if not self.api_key:
+        api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
+        if not api_key:
             # It's better to log a warning rather than crash if key is missing,
             # as the app might run with reduced functionality.
-            print("Warning: DEEPSEEK_API_KEY not found in environment.")
+            logger.warning("DEEPSEEK_API_KEY not found in environment.")
+            self.api_key = None
+            self.client = None
+            self.async_client = None
+            return
 
-        self.client = (
-            OpenAI(api_key=self.api_key, base_url="https://api.deepseek.com")
-            if self.api_key
-            else None
-        )
+        super().__init__(api_key=api_key)
 
     def analyze_change_point(
         self, change_point: Dict, region_name: str, weather_info: Optional[str] = None
@@ -54,57 +95,170 @@ class PredictionAnalysisAgent:
         Returns:
             A short, single-sentence explanation of the cause.
         """
-        if not self.client:
-            return "Analysis unavailable (API key missing)."
-
-        date = change_point.get("date", "Unknown date")
-        change_type = change_point.get("type", "change")  # 'rise' or 'drop'
-        magnitude = change_point.get("magnitude", 0)
-
-        prompt = f"""
-        你是电力领域的专家分析师。
-        检测到了以下用电负荷的{"预测" if "未来" in (weather_info or "") else "历史"}突变点：
-        
-        日期: {date}
-        类型: {"上升" if change_type == "rise" else "下降"}
-        幅度 (Z-score): {magnitude:.2f}
-        区域: {region_name}
-        环境信息: {weather_info or "数据缺失"}
-        
-        请结合日期、区域、环境信息（气温、湿度等），分析可能导致该突变的原因。
-        重点考虑以下因素：
-        1. 气候因素：气温骤变（寒潮/高温）、湿度变化、极端天气。
-        2. 节假日因素：是否为节假日（春节、国庆等）、调休、周末效应。
-        3. 社会活动：大型活动、工业复工/停工。
-        
-        请用一句话总结最可能的原因。
-        
-        要求：
-        1. 绝对禁止使用金融术语（如"股价"、"市场"、"交易量"等）。
-        2. 必须用中文回答。
-        3. 如果是节假日，请明确指出是哪个节日。
-        4. 结合气温分析（如："气温高达35度，导致空调用电增加"）。
-        5. 语气客观专业。
-        6. 严禁提及与该区域无关的其他城市或地区。
-        7. 分析必须完全基于{region_name}本地特征。
-        8. 不需要依赖外部新闻，请调用你的内部知识库，检索该日期{region_name}发生的真实核心事件（如气候、政策、工业大事件）。
-        
-        分析结果（仅输出一句话原因）：
+        if not self.api_key:
+            return self.FALLBACK_NO_KEY
+
+        # 相同突变点（日期/区域/环境信息一致）在页面刷新时会重复分析，直接命中缓存
+        content = self.call_llm(
+            self._build_change_point_messages(change_point, region_name, weather_info),
+            fallback=self.FALLBACK_ERROR,
+            max_tokens=self.MAX_TOKENS,
+            cache=True,
+            timeout=self.REQUEST_TIMEOUT,
+        )
+        return (content or self.FALLBACK_ERROR).strip()
+
+    async def aanalyze_change_point(
+        self, change_point: Dict, region_name: str, weather_info: Optional[str] = None
+    ) -> str:
+        """Async version of analyze_change_point (does not block the event loop)."""
+        if not self.api_key:
+            return self.FALLBACK_NO_KEY
+
+        content = await self.acall_llm(
+            self._build_change_point_messages(change_point, region_name, weather_info),
+            fallback=self.FALLBACK_ERROR,
+            max_tokens=self.MAX_TOKENS,
+            cache=True,
+            timeout=self.REQUEST_TIMEOUT,
+        )
+        return (content or self.FALLBACK_ERROR).strip()
+
+    async def analyze_change_points_batched(
+        self,
+        change_points: List[Dict],
+        region_name: str,
+        weather_infos: Optional[List[Optional[str]]] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Analyze change points with up to batch_size points per LLM call.
+
+        Each batch shares one request (system prompt + network round trip) and
+        asks for a JSON array of causes; batches run concurrently. Points whose
+        cause is missing from a batch response fall back to a single-point call.
+
+        Args:
+            change_points: Change point dicts (see analyze_change_point).
+            region_name: Name of the region.
+            weather_infos: Optional weather context per change point (same order).
+            batch_size: Points per request, defaults to BATCH_SIZE.
+
+        Returns:
+            Explanations in the same order as change_points.
         """
+        if not change_points:
+            return []
+        if not self.api_key:
+            return [self.FALLBACK_NO_KEY] * len(change_points)
+        if weather_infos is None:
+            weather_infos = [None] * len(change_points)
+
+        size = batch_size or self.BATCH_SIZE
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+
+        async def _analyze_batch(start: int) -> List[str]:
+            points = change_points[start:start + size]
+            infos = weather_infos[start:start + size]
+            async with semaphore:
+                reasons = await self._request_batch(points, region_name, infos)
+            # 批量结果缺失的点逐个补分析
+            missing = [i for i, reason in enumerate(reasons) if not reason]
+            if missing:
+                filled = await asyncio.gather(*[
+                    self.aanalyze_change_point(points[i], region_name, infos[i])
+                    for i in missing
+                ])
+                for i, reason in zip(missing, filled):
+                    reasons[i] = reason
+            return reasons
+
+        batches = await asyncio.gather(
+            *[_analyze_batch(start) for start in range(0, len(change_points), size)]
+        )
+        return [reason for batch in batches for reason in batch]
+
+    async def _request_batch(
+        self,
+        change_points: List[Dict],
+        region_name: str,
+        weather_infos: List[Optional[str]],
+    ) -> List[Optional[str]]:
+        """One JSON-mode request for several points; unparsed entries are None."""
+        count = len(change_points)
+        points_text = "\n\n".join(
+            f"【{i}】\n{self._describe_point(cp, region_name, info)}"
+            for i, (cp, info) in enumerate(zip(change_points, weather_infos), 1)
+        )
+        prompt = (
+            f"以下{count}个突变点，逐个给出一句话原因。\n\n"
+            f"{points_text}\n\n"
+            '输出 JSON：{"results": [{"idx": 序号, "reason": "原因"}]}'
+        )
+        messages = self.build_messages(
+            user_content=prompt, system_prompt=self.CHANGE_POINT_SYSTEM_PROMPT
+        )
+
+        content = await self.acall_llm(
+            messages,
+            fallback="",
+            response_format={"type": "json_object"},
+            max_tokens=self.BATCH_TOKENS_PER_POINT * count + 20,
+            cache=True,
+            # 截断或无法解析的 JSON 不缓存，避免后续相同输入一直退化为逐点调用
+            cache_if=lambda text: self._parse_batch_results(text) is not None,
+            timeout=self.REQUEST_TIMEOUT,
+        )
+        if not content:
+            return [None] * count
+
+        reasons: List[Optional[str]] = [None] * count
+        results = self._parse_batch_results(content)
+        if results is None:
+            logger.warning("[%s] Batch JSON parse error", self.agent_name)
+            return reasons
+
+        for item in results:
+            try:
+                idx = int(item.get("idx", 0)) - 1
+                reason = str(item.get("reason") or "").strip()
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if 0 <= idx < count and reason:
+                reasons[idx] = reason
+
+        return reasons
+
+    @staticmethod
+    def _parse_batch_results(content: str) -> Optional[List]:
+        """Parse the batch JSON into its results list; None if malformed."""
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert power grid analyst.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=60,
-                temperature=0.3,
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"[PredictionAnalysisAgent] Error: {e}")
-            return "Analysis failed due to service error."
+            results = orjson.loads(content).get("results")
+        except (orjson.JSONDecodeError, AttributeError):
+            return None
+        return results if isinstance(results, list) else None
+
+    @classmethod
+    def _describe_point(
+        cls, change_point: Dict, region_name: str, weather_info: Optional[str]
+    ) -> str:
+        """Format the dynamic description of one change point for the prompt."""
+        weather_info = weather_info or ""
+        return cls.POINT_TEMPLATE.format(
+            mode=cls.POINT_MODE_NAMES["未来" in weather_info],
+            date=change_point.get("date", "Unknown date"),
+            type=cls.CHANGE_TYPE_NAMES.get(change_point.get("type"), "变化"),
+            magnitude=change_point.get("magnitude", 0),
+            region=region_name,
+            weather=weather_info or "数据缺失",
+        )
+
+    def _build_change_point_messages(
+        self, change_point: Dict, region_name: str, weather_info: Optional[str]
+    ) -> List[Dict[str, str]]:
+        """Build chat messages for a single change point."""
+        # 静态指令放在 system（可被服务端前缀缓存），仅突变点信息放在 user
+        return self.build_messages(
+            user_content=self._describe_point(change_point, region_name, weather_info),
+            system_prompt=self.CHANGE_POINT_SYSTEM_PROMPT,
+        )
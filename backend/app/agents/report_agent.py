@@ -5,7 +5,10 @@ Report Agent 模块
 负责生成金融分析报告
 """
 
-from typing import Dict, Any, List, Optional
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, AsyncGenerator
+
+import numpy as np
 
 from .base import BaseAgent
 
@@ -13,6 +16,8 @@ from .base import BaseAgent
 class ReportAgent(BaseAgent):
     """分析报告生成 Agent"""
 
+    __slots__ = ()
+
     DEFAULT_TEMPERATURE = 0.3
 
     SYSTEM_PROMPT = """你是资深的电力需求分析师。你的任务是生成自然段格式的分析报告，而非要点列表。
@@ -25,6 +30,81 @@ class ReportAgent(BaseAgent):
 5. 逻辑清晰，层层递进
 6. 明确风险点，给出实用建议（如供电保障措施、需求侧管理等）"""
 
+    # 报告格式要求与示例：静态内容，放在 system 中作为共享前缀（可被服务端前缀缓存），
+    # 用户消息只携带本次数据；不要在此插入任何动态内容
+    REPORT_INSTRUCTIONS = """## 报告要求
+
+**重要：请生成自然段格式的报告，不要使用要点列表。**
+
+### 示例（Question + Case）
+
+**问题：** 分析某区域下季度供电需求
+
+**要点式报告（错误示例）：**
+```
+- 历史走势：需求在8000-12000MW区间波动
+- 技术指标：趋势平稳，波动性低
+- 预测结果：预计增加5%
+- 建议：做好供电保障
+```
+
+**自然段报告（正确示例）：**
+```
+基于过去一年的数据分析，该区域供电需求呈现出**平稳增长的格局**，需求在8000-12000MW区间内波动，整体波动性较低，反映出用电模式相对稳定。从趋势分析来看，当前需求处于均值附近，趋势方向为缓慢上升，这种稳定增长状态通常与经济发展和季节性因素相关。
+
+根据Prophet模型的预测分析，预计未来90天该区域供电需求将呈现**温和上升趋势**，累计增幅约**5%**，峰值需求预计在12500-13000MW区间。这一预测基于模型的历史回测表现（MAE=250），具有一定的参考价值。然而，考虑到极端天气事件（如寒潮、高温）可能带来的需求激增，建议电力部门采取**提前准备**的策略，在需求高峰前加强供电保障措施，同时做好需求侧管理，引导用户错峰用电，以应对可能的供电压力。
+```
+
+### 你的任务
+
+请基于用户消息中的数据，生成一份自然段格式的分析报告，包含以下内容（以自然段形式呈现，不要用列表）：
+1. 历史需求与特征分析（1-2段）
+2. 影响因素评估（1段）
+3. 模型预测解读（1-2段）
+4. 供电保障建议（1段）
+5. 风险提示（1段）
+
+**要求：**
+- 总字数控制在600-800字
+- 使用自然段陈述，语气连贯
+- 关键数据和结论使用 **加粗** 标记
+- 避免使用"-"、"•"、"1."等列表符号"""
+
+    REPORT_SYSTEM_PROMPT = SYSTEM_PROMPT + "\n\n" + REPORT_INSTRUCTIONS
+
+    # 报告数据段模板（仅填充数值，格式固定）
+    PROMPT_TEMPLATE = """用户问题: {user_question}
+
+## 数据特征分析
+数据时间范围为{date_range}，共包含{data_points}个有效数据点。供电需求在{min:.2f}MW至{max:.2f}MW区间内波动，当前需求为**{latest:.2f}MW**，略{relation}均值{mean:.2f}MW（偏离幅度{deviation:.2f}%）。
+
+从趋势分析来看，趋势方向为**{trend}**，波动程度为**{volatility}**，整体呈现出相对稳定的需求特征。
+
+{sentiment_section}
+## 预测结果
+采用**{model_display}**进行预测，预测期限为{horizon}天。
+
+根据预测结果，短期（7天）内预计变化为{st_change:+.2f}MW（{st_pct:+.2f}%），长期（{horizon}天）累计变化为{lt_change:+.2f}MW（{lt_pct:+.2f}%）。
+"""
+
+    SENTIMENT_TEMPLATE = """
+## 影响因素分析
+整体影响为**{label}**，影响得分为{score:.2f}（范围-1到1，正值表示需求增加，负值表示需求减少）。{description}
+"""
+
+    # 模型展示名，未列出的模型显示为 "<MODEL>模型"
+    MODEL_DISPLAY_NAMES = {"historical_average": "电力预测模型"}
+
+    # 影响得分分档：score 落在 (thresholds[i-1], thresholds[i]] 区间取 labels[i]
+    SENTIMENT_THRESHOLDS = (-0.6, -0.3, 0.3, 0.6)
+    SENTIMENT_LABELS = (
+        "需求大幅减少",
+        "需求减少",
+        "需求稳定",
+        "需求增加",
+        "需求大幅增加",
+    )
+
     def generate_streaming(
         self,
         user_question: str,
@@ -48,6 +128,42 @@ class ReportAgent(BaseAgent):
         Returns:
             完整报告内容
         """
+        messages = self._build_report_messages(
+            user_question, features, forecast_result, sentiment_result, conversation_history
+        )
+
+        content = self.call_llm(messages, stream=True, on_chunk=on_chunk)
+        return content
+
+    async def agenerate_stream(
+        self,
+        user_question: str,
+        features: Dict[str, Any],
+        forecast_result: Dict[str, Any],
+        sentiment_result: Optional[Dict[str, Any]] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        异步流式生成分析报告（不占用线程），逐个产出增量文本
+
+        参数同 generate_streaming
+        """
+        messages = self._build_report_messages(
+            user_question, features, forecast_result, sentiment_result, conversation_history
+        )
+
+        async for delta in self.astream_llm(messages):
+            yield delta
+
+    def _build_report_messages(
+        self,
+        user_question: str,
+        features: Dict[str, Any],
+        forecast_result: Dict[str, Any],
+        sentiment_result: Optional[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]],
+    ) -> List[Dict[str, str]]:
+        """构建报告生成的消息列表"""
         try:
             prompt = self._build_prompt(
                 user_question, features, forecast_result, sentiment_result
@@ -55,16 +171,13 @@ class ReportAgent(BaseAgent):
         except (ValueError, TypeError) as e:
             prompt = f"数据分析请求: {user_question}\n数据详情: {str(features)}\n预测详情: {str(forecast_result)}"
 
-        messages = self.build_messages(
+        return self.build_messages(
             user_content=prompt,
-            system_prompt=self.SYSTEM_PROMPT,
+            system_prompt=self.REPORT_SYSTEM_PROMPT,
             conversation_history=conversation_history,
             history_window=5,
         )
 
-        content = self.call_llm(messages, stream=True, on_chunk=on_chunk)
-        return content
-
     def _build_prompt(
         self,
         user_question: str,
@@ -74,20 +187,22 @@ class ReportAgent(BaseAgent):
     ) -> str:
         """构建报告生成 prompt"""
         forecast_summary = forecast_result.get("forecast", [])
-        forecast_preview = forecast_summary[:7]
 
         # 1. 计算预测趋势
         short_term_change = long_term_change = st_pct = lt_pct = 0
         if len(forecast_summary) >= 7:
-            start_val = float(forecast_summary[0]["value"])
-            end_val_7d = float(forecast_summary[6]["value"])
-            end_val_total = float(forecast_summary[-1]["value"])
-
-            short_term_change = end_val_7d - start_val
-            long_term_change = end_val_total - start_val
+            values = np.fromiter(
+                (point["value"] for point in forecast_summary),
+                dtype=np.float64,
+                count=len(forecast_summary),
+            )
+            start_val = values[0]
+            # 短期（第7天）与长期（末日）相对起点的变化
+            short_term_change, long_term_change = (values[[6, -1]] - start_val).tolist()
 
-            st_pct = (short_term_change / start_val * 100) if start_val != 0 else 0
-            lt_pct = (long_term_change / start_val * 100) if start_val != 0 else 0
+            if start_val != 0:
+                st_pct = short_term_change / start_val * 100
+                lt_pct = long_term_change / start_val * 100
 
         # 2. 构建情绪分析块
         sentiment_section = ""
@@ -99,21 +214,11 @@ class ReportAgent(BaseAgent):
                 score = float(sentiment_result.score)
                 description = sentiment_result.description
 
-            if score > 0.6:
-                sentiment_label = "需求大幅增加"
-            elif score > 0.3:
-                sentiment_label = "需求增加"
-            elif score > -0.3:
-                sentiment_label = "需求稳定"
-            elif score > -0.6:
-                sentiment_label = "需求减少"
-            else:
-                sentiment_label = "需求大幅减少"
-
-            sentiment_section = f"""
-## 影响因素分析
-整体影响为**{sentiment_label}**，影响得分为{score:.2f}（范围-1到1，正值表示需求增加，负值表示需求减少）。{description}
-"""
+            sentiment_section = self.SENTIMENT_TEMPLATE.format(
+                label=self.SENTIMENT_LABELS[bisect_left(self.SENTIMENT_THRESHOLDS, score)],
+                score=score,
+                description=description,
+            )
 
         # 3. 构建主 Prompt
         f_latest = float(features.get("latest", 0))
@@ -121,59 +226,27 @@ class ReportAgent(BaseAgent):
         change_pct = (f_latest - f_mean) / f_mean * 100
 
         model_name_raw = str(forecast_result.get("model", "unknown"))
-        model_display = {"historical_average": "电力预测模型"}.get(
-            model_name_raw, model_name_raw.upper() + "模型"
-        )
-
-        prompt = f"""用户问题: {user_question}
-
-## 数据特征分析
-数据时间范围为{features.get("date_range", "未知")}，共包含{features.get("data_points", 0)}个有效数据点。供电需求在{float(features.get("min", 0)):.2f}MW至{float(features.get("max", 0)):.2f}MW区间内波动，当前需求为**{f_latest:.2f}MW**，略{"高于" if change_pct > 0 else "低于" if change_pct < 0 else "等于"}均值{f_mean:.2f}MW（偏离幅度{abs(change_pct):.2f}%）。
-
-从趋势分析来看，趋势方向为**{features.get("trend", "横盘")}**，波动程度为**{features.get("volatility", "低")}**，整体呈现出相对稳定的需求特征。
-
-{sentiment_section}
-## 预测结果
-采用**{model_display}**进行预测，预测期限为{len(forecast_summary)}天。
-
-根据预测结果，短期（7天）内预计变化为{short_term_change:+.2f}MW（{st_pct:+.2f}%），长期（{len(forecast_summary)}天）累计变化为{long_term_change:+.2f}MW（{lt_pct:+.2f}%）。
-
-## 报告要求
-
-**重要：请生成自然段格式的报告，不要使用要点列表。**
-
-### 示例（Question + Case）
-
-**问题：** 分析某区域下季度供电需求
-
-**要点式报告（错误示例）：**
-```
-- 历史走势：需求在8000-12000MW区间波动
-- 技术指标：趋势平稳，波动性低
-- 预测结果：预计增加5%
-- 建议：做好供电保障
-```
-
-**自然段报告（正确示例）：**
-```
-基于过去一年的数据分析，该区域供电需求呈现出**平稳增长的格局**，需求在8000-12000MW区间内波动，整体波动性较低，反映出用电模式相对稳定。从趋势分析来看，当前需求处于均值附近，趋势方向为缓慢上升，这种稳定增长状态通常与经济发展和季节性因素相关。
-
-根据Prophet模型的预测分析，预计未来90天该区域供电需求将呈现**温和上升趋势**，累计增幅约**5%**，峰值需求预计在12500-13000MW区间。这一预测基于模型的历史回测表现（MAE=250），具有一定的参考价值。然而，考虑到极端天气事件（如寒潮、高温）可能带来的需求激增，建议电力部门采取**提前准备**的策略，在需求高峰前加强供电保障措施，同时做好需求侧管理，引导用户错峰用电，以应对可能的供电压力。
-```
-
-### 你的任务
-
-请基于上述数据，生成一份自然段格式的分析报告，包含以下内容（以自然段形式呈现，不要用列表）：
-1. 历史需求与特征分析（1-2段）
-2. 影响因素评估（1段）
-3. 模型预测解读（1-2段）
-4. 供电保障建议（1段）
-5. 风险提示（1段）
-
-**要求：**
-- 总字数控制在600-800字
-- 使用自然段陈述，语气连贯
-- 关键数据和结论使用 **加粗** 标记
-- 避免使用"-"、"•"、"1."等列表符号
-"""
-        return prompt
+        model_display = self.MODEL_DISPLAY_NAMES.get(model_name_raw)
+        if model_display is None:
+            model_display = model_name_raw.upper() + "模型"
+
+        return self.PROMPT_TEMPLATE.format_map({
+            "user_question": user_question,
+            "date_range": features.get("date_range", "未知"),
+            "data_points": features.get("data_points", 0),
+            "min": float(features.get("min", 0)),
+            "max": float(features.get("max", 0)),
+            "latest": f_latest,
+            "mean": f_mean,
+            "relation": "高于" if change_pct > 0 else "低于" if change_pct < 0 else "等于",
+            "deviation": abs(change_pct),
+            "trend": features.get("trend", "横盘"),
+            "volatility": features.get("volatility", "低"),
+            "sentiment_section": sentiment_section,
+            "model_display": model_display,
+            "horizon": len(forecast_summary),
+            "st_change": short_term_change,
+            "st_pct": st_pct,
+            "lt_change": long_term_change,
+            "lt_pct": lt_pct,
+        })
@@ -13,6 +13,8 @@ from .base import BaseAgent
 class SentimentAgent(BaseAgent):
     """新闻情绪分析 Agent（流式输出）"""
 
+    __slots__ = ()
+
     DEFAULT_TEMPERATURE = 0.2
 
     SYSTEM_PROMPT = """你是电力需求影响因素分析专家。分析以下天气/电力相关新闻，给出对供电需求的影响判断和分析说明。
@@ -5,14 +5,23 @@
 根据对话上下文生成相关的快速追问建议
 """
 
-from typing import List, Dict, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 
 from .base import BaseAgent
 
+# 进程内 LRU：对话尾部窗口 -> 建议列表（前端重渲染时常以相同历史重复请求）
+SUGGESTION_CACHE_SIZE = 512
+_suggestion_cache: "OrderedDict[Tuple[Tuple[str, str], ...], List[str]]" = OrderedDict()
+_suggestion_lock = threading.Lock()
+
 
 class SuggestionAgent(BaseAgent):
     """快速追问建议生成 Agent"""
 
+    __slots__ = ()
+
     DEFAULT_TEMPERATURE = 0.7
 
     SYSTEM_PROMPT = """你是电力分析助手的快速追问建议生成器。根据对话历史，生成4个相关的快速追问建议。
@@ -37,11 +46,14 @@ class SuggestionAgent(BaseAgent):
         "生成一份供电保障分析报告",
     ]
 
-    def generate_suggestions(
+    # 参与建议生成（及缓存键）的最近消息条数
+    HISTORY_WINDOW = 6
+
+    async def agenerate_suggestions(
         self, conversation_history: Optional[List[Dict[str, str]]] = None
     ) -> List[str]:
         """
-        根据对话历史生成快速追问建议
+        根据对话历史生成快速追问建议（异步客户端，不占用线程池）
 
         Args:
             conversation_history: 对话历史，格式: [{"role": "user", "content": "..."}, ...]
@@ -49,37 +61,90 @@ class SuggestionAgent(BaseAgent):
         Returns:
             4个相关的快速追问建议列表
         """
+        # 无对话历史时输出固定，无需请求 LLM
+        if not conversation_history:
+            return list(self.DEFAULT_SUGGESTIONS)
+
+        key = self._history_key(conversation_history)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        messages = self._build_suggestion_messages(conversation_history)
+
+        content = await self.acall_llm(
+            messages, fallback="{}", response_format={"type": "json_object"}
+        )
+
+        suggestions, complete = self._parse_suggestions(content)
+        # 调用失败或输出不完整（补了默认建议）时不缓存，避免把默认建议长期固化
+        if complete:
+            self._cache_put(key, suggestions)
+        return suggestions
+
+    @classmethod
+    def _history_key(
+        cls, conversation_history: List[Dict[str, str]]
+    ) -> Tuple[Tuple[str, str], ...]:
+        """取最近 HISTORY_WINDOW 条消息作为缓存键（与 prompt 实际使用的窗口一致）"""
+        return tuple(
+            (msg["role"], msg["content"])
+            for msg in conversation_history[-cls.HISTORY_WINDOW:]
+        )
+
+    @staticmethod
+    def _cache_get(key: Tuple[Tuple[str, str], ...]) -> Optional[List[str]]:
+        with _suggestion_lock:
+            suggestions = _suggestion_cache.get(key)
+            if suggestions is None:
+                return None
+            _suggestion_cache.move_to_end(key)
+            return list(suggestions)
+
+    @staticmethod
+    def _cache_put(key: Tuple[Tuple[str, str], ...], suggestions: List[str]):
+        with _suggestion_lock:
+            _suggestion_cache[key] = list(suggestions)
+            _suggestion_cache.move_to_end(key)
+            if len(_suggestion_cache) > SUGGESTION_CACHE_SIZE:
+                _suggestion_cache.popitem(last=False)
+
+    def _build_suggestion_messages(
+        self, conversation_history: List[Dict[str, str]]
+    ) -> List[Dict[str, str]]:
+        """构建建议生成的消息列表（调用方保证对话历史非空）"""
         # 构建用户消息
-        if conversation_history:
-            context_parts = ["对话历史："]
-            recent_history = (
-                conversation_history[-6:]
-                if len(conversation_history) > 6
-                else conversation_history
-            )
-            for msg in recent_history:
-                role_name = "用户" if msg["role"] == "user" else "助手"
-                context_parts.append(f"{role_name}: {msg['content']}")
-            user_content = (
-                "\n".join(context_parts)
-                + "\n\n请根据以上对话历史，生成4个相关的快速追问建议。"
-            )
-        else:
-            user_content = "当前没有对话历史，请生成4个通用的股票分析快速追问建议。"
-
-        messages = self.build_messages(
-            user_content=user_content, system_prompt=self.SYSTEM_PROMPT
+        context_parts = ["对话历史："]
+        recent_history = conversation_history[-self.HISTORY_WINDOW:]
+        for msg in recent_history:
+            role_name = "用户" if msg["role"] == "user" else "助手"
+            context_parts.append(f"{role_name}: {msg['content']}")
+        user_content = (
+            "\n".join(context_parts)
+            + "\n\n请根据以上对话历史，生成4个相关的快速追问建议。"
         )
 
-        content = self.call_llm(
-            messages, fallback="{}", response_format={"type": "json_object"}
+        return self.build_messages(
+            user_content=user_content, system_prompt=self.SYSTEM_PROMPT
         )
 
-        result = self.parse_json_safe(content, {"suggestions": []})
-        suggestions = result.get("suggestions", [])
+    def _parse_suggestions(self, content: str) -> Tuple[List[str], bool]:
+        """
+        解析 LLM 输出，确保返回4个建议
+
+        Returns:
+            (建议列表, 是否4个建议均来自模型输出)；解析失败、格式不符或数量不足时
+            用默认建议补齐，第二项为 False
+        """
+        result = self.parse_json_safe(content, {})
+        raw = result.get("suggestions") if isinstance(result, dict) else None
+        suggestions = [
+            item.strip() for item in raw if isinstance(item, str) and item.strip()
+        ] if isinstance(raw, list) else []
+        complete = len(suggestions) >= 4
 
         # 确保返回4个建议，不足则补充默认建议
         while len(suggestions) < 4:
             suggestions.append(self.DEFAULT_SUGGESTIONS[len(suggestions)])
 
-        return suggestions[:4]
+        return suggestions[:4], complete
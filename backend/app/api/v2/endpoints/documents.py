@@ -5,19 +5,32 @@ RAG 文档代理 API
 代理转发 RAG 服务的文档获取请求
 """
 
+import time
+from collections import OrderedDict
+
 import httpx
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 
 from app.core.config import settings
+from app.services.rag_client import get_rag_http_client
 
 router = APIRouter()
 
 # RAG 服务地址
 RAG_SERVICE_URL = settings.RAG_SERVICE_URL
 
+# PDF 转发分块大小（边下载边返回，内存占用与文件大小无关）
+PDF_CHUNK_SIZE = 64 * 1024
+
+# 文档元信息缓存：doc_id -> (过期时间, 元信息, ETag)
+DOC_META_TTL = 600  # 10 分钟
+DOC_META_MAX_SIZE = 10_000
+_doc_meta_cache: "OrderedDict[str, Tuple[float, Dict[str, Any], Optional[str]]]" = OrderedDict()
+
 
 class DocumentInfo(BaseModel):
     """文档详情"""
@@ -36,6 +49,38 @@ class DocumentInfo(BaseModel):
     report_type: Optional[str] = None
 
 
+async def fetch_document_info(client: httpx.AsyncClient, doc_id: str) -> Dict[str, Any]:
+    """
+    获取文档元信息（带 TTL 缓存）
+
+    缓存未过期直接返回；过期后携带 ETag 发起条件请求，RAG 服务返回 304 时沿用缓存。
+
+    Raises:
+        httpx.HTTPStatusError / httpx.RequestError: RAG 服务请求失败
+    """
+    now = time.monotonic()
+    cached = _doc_meta_cache.get(doc_id)
+    if cached and cached[0] > now:
+        _doc_meta_cache.move_to_end(doc_id)
+        return cached[1]
+
+    headers = {"If-None-Match": cached[2]} if cached and cached[2] else None
+    response = await client.get(
+        f"{RAG_SERVICE_URL}/api/v1/documents/{doc_id}", headers=headers
+    )
+    if response.status_code == 304 and cached:
+        doc_info, etag = cached[1], cached[2]
+    else:
+        response.raise_for_status()
+        doc_info, etag = response.json(), response.headers.get("etag")
+
+    _doc_meta_cache[doc_id] = (now + DOC_META_TTL, doc_info, etag)
+    _doc_meta_cache.move_to_end(doc_id)
+    if len(_doc_meta_cache) > DOC_META_MAX_SIZE:
+        _doc_meta_cache.popitem(last=False)
+    return doc_info
+
+
 @router.get("/documents/{doc_id}", response_model=DocumentInfo)
 async def get_document_info(doc_id: str):
     """
@@ -46,17 +91,16 @@ async def get_document_info(doc_id: str):
     if not RAG_SERVICE_URL:
         raise HTTPException(status_code=503, detail="RAG 服务未配置")
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.get(f"{RAG_SERVICE_URL}/api/v1/documents/{doc_id}")
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                raise HTTPException(status_code=404, detail="文档不存在")
-            raise HTTPException(status_code=502, detail=f"RAG 服务错误: {e.response.status_code}")
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail=f"无法连接 RAG 服务: {str(e)}")
+    # 复用共享连接池，避免每次请求重新建立 TCP/TLS 连接
+    client = get_rag_http_client()
+    try:
+        return await fetch_document_info(client, doc_id)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise HTTPException(status_code=404, detail="文档不存在")
+        raise HTTPException(status_code=502, detail=f"RAG 服务错误: {e.response.status_code}")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"无法连接 RAG 服务: {str(e)}")
 
 
 @router.get("/documents/{doc_id}/pdf")
@@ -69,48 +113,57 @@ async def get_document_pdf(doc_id: str, page: Optional[int] = None):
     if not RAG_SERVICE_URL:
         raise HTTPException(status_code=503, detail="RAG 服务未配置")
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    client = get_rag_http_client()
+    try:
+        # 先获取文档详情以获得 file_path（通常已被详情接口缓存，无需再请求）
+        doc_info = await fetch_document_info(client, doc_id)
+        file_path = doc_info.get("file_path")
+
+        if not file_path:
+            raise HTTPException(status_code=404, detail="文档路径不存在")
+
+        # 尝试通过 RAG 服务下载 PDF
+        # 假设 RAG 服务提供 /api/v1/documents/{doc_id}/download 端点
+        pdf_response = await client.send(
+            client.build_request(
+                "GET",
+                f"{RAG_SERVICE_URL}/api/v1/documents/{doc_id}/download",
+                timeout=60.0
+            ),
+            stream=True
+        )
         try:
-            # 先获取文档详情以获得 file_path
-            response = await client.get(f"{RAG_SERVICE_URL}/api/v1/documents/{doc_id}")
-            response.raise_for_status()
-            doc_info = response.json()
-            file_path = doc_info.get("file_path")
-
-            if not file_path:
-                raise HTTPException(status_code=404, detail="文档路径不存在")
-
-            # 尝试通过 RAG 服务下载 PDF
-            # 假设 RAG 服务提供 /api/v1/documents/{doc_id}/download 端点
-            try:
-                pdf_response = await client.get(
-                    f"{RAG_SERVICE_URL}/api/v1/documents/{doc_id}/download",
-                    timeout=60.0
-                )
-                pdf_response.raise_for_status()
-
-                # 返回 PDF 文件流
-                return StreamingResponse(
-                    iter([pdf_response.content]),
-                    media_type="application/pdf",
-                    headers={
-                        "Content-Disposition": f'inline; filename="{doc_info.get("file_name", "document.pdf")}"',
-                        "X-Page": str(page) if page else "1"
-                    }
-                )
-            except httpx.HTTPStatusError:
-                # 如果没有下载端点，返回文件路径让前端处理
-                return {
-                    "doc_id": doc_id,
-                    "file_path": file_path,
-                    "file_name": doc_info.get("file_name"),
-                    "page": page or 1,
-                    "message": "PDF 下载端点不可用，请使用 file_path 访问"
-                }
-
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                raise HTTPException(status_code=404, detail="文档不存在")
-            raise HTTPException(status_code=502, detail=f"RAG 服务错误: {e.response.status_code}")
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail=f"无法连接 RAG 服务: {str(e)}")
+            pdf_response.raise_for_status()
+        except httpx.HTTPStatusError:
+            await pdf_response.aclose()
+            # 如果没有下载端点，返回文件路径让前端处理
+            return {
+                "doc_id": doc_id,
+                "file_path": file_path,
+                "file_name": doc_info.get("file_name"),
+                "page": page or 1,
+                "message": "PDF 下载端点不可用，请使用 file_path 访问"
+            }
+
+        headers = {
+            "Content-Disposition": f'inline; filename="{doc_info.get("file_name", "document.pdf")}"',
+            "X-Page": str(page) if page else "1"
+        }
+        # 上游未压缩时才透传长度（aiter_bytes 会解压，长度会变化）
+        if "content-length" in pdf_response.headers and "content-encoding" not in pdf_response.headers:
+            headers["Content-Length"] = pdf_response.headers["content-length"]
+
+        # 分块转发 PDF 文件流，响应结束后释放上游连接
+        return StreamingResponse(
+            pdf_response.aiter_bytes(PDF_CHUNK_SIZE),
+            media_type="application/pdf",
+            headers=headers,
+            background=BackgroundTask(pdf_response.aclose)
+        )
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise HTTPException(status_code=404, detail="文档不存在")
+        raise HTTPException(status_code=502, detail=f"RAG 服务错误: {e.response.status_code}")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"无法连接 RAG 服务: {str(e)}")
@@ -43,7 +43,7 @@ router = APIRouter()
 
 
 @router.post("/sessions", response_model=CreateSessionResponse)
-async def create_session(request: CreateSessionRequest = None):
+def create_session(request: CreateSessionRequest = None):
     """
     创建新会话
 
@@ -63,17 +63,17 @@ async def create_session(request: CreateSessionRequest = None):
     if req.title:
         session.update_title(req.title)
 
-    data = session.get()
+    data = session.get_summary()
 
     return CreateSessionResponse(
         session_id=session.session_id,
-        title=data.title if data else "新对话",
-        created_at=data.created_at if data else ""
+        title=data["title"] if data else "新对话",
+        created_at=data["created_at"] if data else ""
     )
 
 
 @router.get("/sessions", response_model=List[SessionListItem])
-async def list_sessions():
+def list_sessions():
     """
     获取所有会话列表
     
@@ -91,17 +91,13 @@ async def list_sessions():
         if isinstance(key, bytes):
             key = key.decode('utf-8')
         session_id = key.split(':', 1)[1]
+        if ':' in session_id:
+            continue  # 附属 key（如 session:<id>:history）
         session = Session(session_id)
-        data = session.get()
+        data = session.get_summary()
         
         if data:
-            sessions.append(SessionListItem(
-                session_id=data.session_id,
-                title=data.title,
-                created_at=data.created_at,
-                updated_at=data.updated_at,
-                message_count=len(data.message_ids)
-            ))
+            sessions.append(SessionListItem(session_id=session_id, **data))
     
     # 按更新时间倒序排序
     sessions.sort(key=lambda x: x.updated_at, reverse=True)
@@ -110,7 +106,7 @@ async def list_sessions():
 
 
 @router.patch("/sessions/{session_id}")
-async def update_session(session_id: str, request: UpdateSessionRequest):
+def update_session(session_id: str, request: UpdateSessionRequest):
     """
     更新会话信息（如标题）
     
@@ -121,11 +117,9 @@ async def update_session(session_id: str, request: UpdateSessionRequest):
     Returns:
         {"success": true, "session_id": "...", "title": "..."}
     """
-    if not Session.exists(session_id):
-        raise HTTPException(status_code=404, detail="会话不存在")
-    
     session = Session(session_id)
-    session.update_title(request.title)
+    if not session.update_title(request.title):
+        raise HTTPException(status_code=404, detail="会话不存在")
     
     return {
         "success": True,
@@ -135,7 +129,7 @@ async def update_session(session_id: str, request: UpdateSessionRequest):
 
 
 @router.delete("/sessions/{session_id}")
-async def delete_session(session_id: str):
+def delete_session(session_id: str):
     """
     删除会话及其所有消息
     
@@ -145,11 +139,9 @@ async def delete_session(session_id: str):
     Returns:
         {"success": true, "deleted_session_id": "..."}
     """
-    if not Session.exists(session_id):
-        raise HTTPException(status_code=404, detail="会话不存在")
-    
     session = Session(session_id)
-    session.delete()
+    if not session.delete():
+        raise HTTPException(status_code=404, detail="会话不存在")
     
     return {
         "success": True,
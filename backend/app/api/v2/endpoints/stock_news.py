@@ -1,10 +1,13 @@
 import os
-import json
 from datetime import datetime, timedelta
 from typing import List, Optional, Any
+
+import orjson
+import pandas as pd
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from app.core.redis_client import get_redis
+from app.core.redis_client import get_redis_raw
+from app.services.stock_signal_service import StockSignalService
 from app.data.stock_db import (
     MONGO_CONFIG,
     get_mongo_client,
@@ -26,10 +29,11 @@ def make_redis_key(key_type: str, ticker: str, **kwargs) -> str:
 
 def cache_get(key: str) -> Optional[Any]:
     try:
-        redis_client = get_redis()
+        # 不解码的客户端直接返回 bytes，由 orjson 解析
+        redis_client = get_redis_raw()
         data = redis_client.get(key)
         if data:
-            return json.loads(data)
+            return orjson.loads(data)
     except Exception as e:
         print(f"Redis get error: {e}")
     return None
@@ -37,8 +41,10 @@ def cache_get(key: str) -> Optional[Any]:
 
 def cache_set(key: str, data: Any, ttl: int = 3600) -> bool:
     try:
-        redis_client = get_redis()
-        redis_client.setex(key, ttl, json.dumps(data, ensure_ascii=False))
+        redis_client = get_redis_raw()
+        redis_client.setex(
+            key, ttl, orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+        )
         return True
     except Exception as e:
         print(f"Redis set error: {e}")
@@ -161,6 +167,11 @@ def classify_turn_type(prices: List[float], index: int) -> str:
         return "波动"
 
 
+def zone_date_strings(start: str, end: str) -> List[str]:
+    """区间内逐日的日期字符串（含首尾，YYYY-MM-DD）"""
+    return pd.date_range(start, end, freq="D").strftime("%Y-%m-%d").tolist()
+
+
 def merge_adjacent_zones(zones: List[dict], dates: List[str]) -> List[dict]:
     if not zones:
         return []
@@ -275,17 +286,12 @@ async def get_stock_events(
         # But I'm writing this file now. I will try to use the new service name assuming I will create it momentarily.
 
         try:
-            import pandas as pd
-
-            # from app.services.significant_points import SignificantPointService # OLD
-            from app.services.stock_signal_service import StockSignalService  # NEW
-
-            # 构建 DataFrame
+            # 构建 DataFrame（close/volume 成对追加，长度一致，无需默认成交量）
             df = pd.DataFrame(
                 {
                     "date": dates,
                     "close": close_prices,
-                    "volume": volumes if volumes else [1] * len(close_prices),
+                    "volume": volumes,
                 }
             )
 
@@ -336,17 +342,11 @@ async def get_stock_events(
 
             zone_titles = []
             try:
-                zone_start = datetime.strptime(zone["startDate"], "%Y-%m-%d")
-                zone_end = datetime.strptime(zone["endDate"], "%Y-%m-%d")
-
-                current = zone_start
-                while current <= zone_end:
-                    date_str = current.strftime("%Y-%m-%d")
+                for date_str in zone_date_strings(zone["startDate"], zone["endDate"]):
                     if date_str in news_by_date:
                         for news in news_by_date[date_str][:3]:
                             if news.get("title"):
                                 zone_titles.append(news["title"])
-                    current += timedelta(days=1)
             except Exception as e:
                 print(f"[Zone Summary] Error: {e}")
 
@@ -584,17 +584,11 @@ async def get_anomaly_zones(
 
         for zone in anomaly_zones:
             zone_titles = []
-            zone_start = datetime.strptime(zone["startDate"], "%Y-%m-%d")
-            zone_end = datetime.strptime(zone["endDate"], "%Y-%m-%d")
-
-            current = zone_start
-            while current <= zone_end:
-                date_str = current.strftime("%Y-%m-%d")
+            for date_str in zone_date_strings(zone["startDate"], zone["endDate"]):
                 if date_str in news_by_date:
                     for news in news_by_date[date_str][:2]:
                         if news.get("title"):
                             zone_titles.append(news["title"])
-                current += timedelta(days=1)
 
             zone["summary"] = (
                 " | ".join(zone_titles[:3])
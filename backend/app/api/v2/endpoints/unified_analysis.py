@@ -15,18 +15,19 @@
 """
 
 import asyncio
-import json
 import math
 import time
-from typing import Optional
+from typing import List, Optional
 
+import orjson
 import pandas as pd
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from app.core.session import Session, Message
 from app.core.streaming_task_processor import get_streaming_processor
+from app.core.task_queue import get_task_queue
 from app.core.workflows import run_forecast
 from app.core.redis_client import get_redis, get_async_redis
 from app.schemas.session_schema import (
@@ -46,6 +47,9 @@ class SuggestionsRequest(BaseModel):
 
 router = APIRouter()
 
+# 任务仍在进行（排队或执行中）的 stream_status，断点续传时走 SSE 监听
+LIVE_STREAM_STATUSES = ("queued", "streaming", None, "")
+
 
 async def run_background_analysis(session_id: str, message_id: str, user_input: str, model_name: Optional[str]):
     """后台运行分析任务（独立于 SSE 连接）"""
@@ -55,15 +59,19 @@ async def run_background_analysis(session_id: str, message_id: str, user_input:
     )
 
 
+def cancel_background_analysis(session_id: str, message_id: str, user_input: str, model_name: Optional[str]):
+    """后台任务因服务停止未完成时标记为失败（参数同 run_background_analysis）"""
+    message = Message(message_id, session_id)
+    message.mark_error("服务重启，分析任务已中断，请重新提问")
+    message.save_stream_status("error")
+
+
 @router.post("/create")
-async def create_analysis(
-    request: CreateAnalysisRequest,
-    background_tasks: BackgroundTasks
-):
+async def create_analysis(request: CreateAnalysisRequest):
     """
     创建分析任务（后台独立运行）
 
-    任务通过 BackgroundTasks 独立运行，不依赖 SSE 连接。
+    任务投递到后台任务队列，由固定数量的 worker 执行，不依赖 SSE 连接。
     前端刷新后，后端任务不受影响。
 
     Args:
@@ -77,32 +85,19 @@ async def create_analysis(
         - message_id: 消息 ID
         - status: "created"
     """
-    # 获取或创建 Session
-    if request.session_id and Session.exists(request.session_id):
-        session = Session(request.session_id)
-    else:
-        session = Session.create()
-
-    # 检查是否是首条消息（用于自动生成标题）
-    session_data = session.get()
-    is_first_message = session_data and len(session_data.message_ids) == 0
-
-    # 创建 Message
-    message = session.create_message(request.message)
-
-    # 如果是首条消息，自动生成标题
-    if is_first_message:
-        session.auto_generate_title(request.message)
-
-    session.add_conversation_message("user", request.message)
+    # 获取或创建 Session，创建 Message 并记录用户消息（首条消息自动生成标题）
+    session, message = await asyncio.to_thread(
+        Session.open_for_query, request.session_id, request.message
+    )
 
-    # 后台任务独立运行
-    background_tasks.add_task(
+    # 投递到后台任务队列（worker 数固定，突发请求排队执行）
+    get_task_queue().submit(
         run_background_analysis,
         session.session_id,
         message.message_id,
         request.message,
-        request.model  # None 表示自动选择
+        request.model,  # None 表示自动选择
+        on_cancel=cancel_background_analysis,
     )
 
     return {
@@ -139,14 +134,24 @@ async def get_session_history(session_id: str):
             ]
         }
     """
-    if not Session.exists(session_id):
+    messages = await asyncio.to_thread(_load_session_messages, session_id)
+    if messages is None:
         raise HTTPException(status_code=404, detail="会话不存在")
 
-    session = Session(session_id)
-    all_messages = session.get_all_messages()
+    return {
+        "session_id": session_id,
+        "messages": messages
+    }
+
+
+def _load_session_messages(session_id: str) -> Optional[List[dict]]:
+    """读取会话的全部消息（同步 Redis I/O，在线程中执行），会话不存在时返回 None"""
+    session_messages = Session(session_id).get_all_messages()
+    if session_messages is None:
+        return None
 
     messages = []
-    for msg in all_messages:
+    for msg in session_messages:
         data = msg.get()
         if data:
             messages.append({
@@ -155,11 +160,7 @@ async def get_session_history(session_id: str):
                 "status": data.status,
                 "data": data
             })
-
-    return {
-        "session_id": session_id,
-        "messages": messages
-    }
+    return messages
 
 
 @router.post("/suggestions")
@@ -177,7 +178,7 @@ async def get_suggestions(request: SuggestionsRequest):
     session_id = request.session_id
 
     # 如果没有提供 session_id，返回默认建议
-    if not session_id or not Session.exists(session_id):
+    if not session_id or not await asyncio.to_thread(Session.exists, session_id):
         default_suggestions = [
             "帮我分析一下茅台，预测下个季度走势",
             "查看最近的市场趋势",
@@ -188,14 +189,11 @@ async def get_suggestions(request: SuggestionsRequest):
 
     # 获取对话历史
     session = Session(session_id)
-    conversation_history = session.get_conversation_history()
+    conversation_history = await asyncio.to_thread(session.get_conversation_history)
 
     # 生成建议
     suggestion_agent = SuggestionAgent()
-    suggestions = await asyncio.to_thread(
-        suggestion_agent.generate_suggestions,
-        conversation_history
-    )
+    suggestions = await suggestion_agent.agenerate_suggestions(conversation_history)
 
     return {"suggestions": suggestions}
 
@@ -217,22 +215,22 @@ async def stream_resume(
     Returns:
         SSE 流
     """
-    if not Session.exists(session_id):
+    if not await asyncio.to_thread(Session.exists, session_id):
         raise HTTPException(status_code=404, detail="会话不存在")
 
     message_obj = Message(message_id, session_id)
-    data = message_obj.get()
+    data = await asyncio.to_thread(message_obj.get)
 
     if not data:
         raise HTTPException(status_code=404, detail="消息不存在")
 
     stream_key = f"stream-events:{message_id}"
 
-    # 如果任务已完成，直接返回 JSON
-    if data.stream_status not in ("streaming", None, ""):
+    # 如果任务已完成，直接返回 JSON（排队中的任务仍按进行中处理）
+    if data.stream_status not in LIVE_STREAM_STATUSES:
         return {
             "status": data.stream_status,
-            "message_status": data.status.value,
+            "message_status": data.status,
             "data": data.model_dump()
         }
 
@@ -244,7 +242,8 @@ async def stream_resume(
 
         try:
             # 先发送当前状态
-            yield f"data: {json.dumps({'type': 'resume', 'current_data': data.model_dump()})}\n\n"
+            # MessageData 由 pydantic 直接序列化为 JSON（不经中间 dict）
+            yield f'data: {{"type":"resume","current_data":{data.model_dump_json()}}}\n\n'
 
             while True:
                 try:
@@ -255,15 +254,15 @@ async def stream_resume(
                         block=2000  # 阻塞 2 秒
                     )
                 except Exception as e:
-                    yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+                    yield f"data: {orjson.dumps({'type': 'error', 'message': str(e)}).decode()}\n\n"
                     break
 
                 # 超时没有新数据
                 if not events:
                     # 检查任务是否已结束
-                    check_data = message_obj.get()
-                    if check_data and check_data.stream_status not in ("streaming", None, ""):
-                        yield f"data: {json.dumps({'type': 'done', 'completed': True})}\n\n"
+                    stream_status = await asyncio.to_thread(message_obj.get_stream_status)
+                    if stream_status not in LIVE_STREAM_STATUSES:
+                        yield f"data: {orjson.dumps({'type': 'done', 'completed': True}).decode()}\n\n"
                         break
                     continue
 
@@ -278,11 +277,11 @@ async def stream_resume(
 
                             # 检查是否结束
                             try:
-                                payload = json.loads(event_data)
+                                payload = orjson.loads(event_data)
                                 if payload.get("type") in ("done", "error"):
                                     await r.aclose()
                                     return
-                            except json.JSONDecodeError:
+                            except orjson.JSONDecodeError:
                                 pass
 
         except asyncio.CancelledError:
@@ -320,11 +319,11 @@ async def backtest_prediction(request: "BacktestRequest"):
     start_time = time.time()
     
     # 1. 验证会话和消息
-    if not Session.exists(request.session_id):
+    if not await asyncio.to_thread(Session.exists, request.session_id):
         raise HTTPException(404, "会话不存在")
     
     message = Message(request.message_id, request.session_id)
-    data = message.get()
+    data = await asyncio.to_thread(message.get)
     
     if not data:
         raise HTTPException(404, "消息不存在")
@@ -28,32 +28,63 @@ class RedisClient:
     """Redis 客户端单例（同步）"""
 
     _instance: Optional[Redis] = None
+    _pool: Optional[redis.BlockingConnectionPool] = None
+    # 不解码响应的客户端（值为 bytes，供 JSON / 二进制数据直接解析）
+    _raw_instance: Optional[Redis] = None
+    _raw_pool: Optional[redis.BlockingConnectionPool] = None
+
+    # 连接池上限：后台任务并发访问 Redis 时复用连接，超出上限时排队等待而不是新建连接
+    POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX", 64))
+    # 连接池耗尽时的最长等待时间（秒）
+    POOL_TIMEOUT = 5
+
+    @classmethod
+    def _create_pool(cls, decode_responses: bool) -> redis.BlockingConnectionPool:
+        password = os.getenv("REDIS_PASSWORD", "")
+        return redis.BlockingConnectionPool(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6380)),
+            password=password if password else None,
+            db=int(os.getenv("REDIS_DB", 0)),
+            max_connections=cls.POOL_MAX_CONNECTIONS,
+            timeout=cls.POOL_TIMEOUT,
+            decode_responses=decode_responses,
+            socket_connect_timeout=30,  # 增加到 30 秒（远程服务器）
+            socket_timeout=30,          # 增加到 30 秒
+            socket_keepalive=True,       # 启用 keepalive
+            retry_on_timeout=True,       # 超时自动重试
+            health_check_interval=30     # health check 间隔
+        )
 
     @classmethod
     def get_client(cls) -> Redis:
         """获取 Redis 客户端实例"""
         if cls._instance is None:
-            password = os.getenv("REDIS_PASSWORD", "")
-            cls._instance = redis.Redis(
-                host=os.getenv("REDIS_HOST", "localhost"),
-                port=int(os.getenv("REDIS_PORT", 6380)),
-                password=password if password else None,
-                db=int(os.getenv("REDIS_DB", 0)),
-                decode_responses=True,
-                socket_connect_timeout=30,  # 增加到 30 秒（远程服务器）
-                socket_timeout=30,          # 增加到 30 秒
-                socket_keepalive=True,       # 启用 keepalive
-                retry_on_timeout=True,       # 超时自动重试
-                health_check_interval=30     # health check 间隔
-            )
+            cls._pool = cls._create_pool(decode_responses=True)
+            cls._instance = redis.Redis(connection_pool=cls._pool)
         return cls._instance
 
+    @classmethod
+    def get_raw_client(cls) -> Redis:
+        """获取不解码响应的 Redis 客户端实例（返回 bytes）"""
+        if cls._raw_instance is None:
+            cls._raw_pool = cls._create_pool(decode_responses=False)
+            cls._raw_instance = redis.Redis(connection_pool=cls._raw_pool)
+        return cls._raw_instance
+
     @classmethod
     def close(cls):
         """关闭 Redis 连接"""
-        if cls._instance:
-            cls._instance.close()
-            cls._instance = None
+        for client, pool in (
+            (cls._instance, cls._pool),
+            (cls._raw_instance, cls._raw_pool),
+        ):
+            if client:
+                client.close()
+            if pool:
+                pool.disconnect()
+        cls._instance = cls._pool = None
+        cls._raw_instance = cls._raw_pool = None
 
 
 def get_redis() -> Redis:
@@ -61,6 +92,11 @@ def get_redis() -> Redis:
     return RedisClient.get_client()
 
 
+def get_redis_raw() -> Redis:
+    """获取同步 Redis 客户端（不解码，值为 bytes）"""
+    return RedisClient.get_raw_client()
+
+
 def get_async_redis() -> aioredis.Redis:
     """获取异步 Redis 客户端（每次调用创建新连接，使用后需关闭）"""
     return aioredis.from_url(
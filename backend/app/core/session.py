@@ -5,22 +5,41 @@ Session 管理模块
 基于 Redis 的会话状态管理
 
 架构:
-- Session: 一整个多轮对话 (存储 session_id, conversation_history, message_ids)
+- Session: 一整个多轮对话 (存储 session_id, message_ids；对话历史单独存储)
 - Message: 一轮 QA (存储所有分析结果数据)
+
+存储:
+- 每个文档是一个 Redis Hash，顶层字段各占一个 hash field（值为 JSON）
+- 更新只写入改动的字段（HSET），不再整体读出 -> 修改 -> 写回整个文档
+- 时序字段按列存储：日期列表 + float64/bool 打包缓冲区（base64），避免逐点对象
+- 对话历史存于 Redis List（session:<id>:history），追加为 RPUSH + LTRIM
 """
 
+import base64
+import functools
+import logging
+import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Any, Iterator, Optional, List, Dict, Tuple, Type, get_args
+
+import numpy as np
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
 from redis import Redis
+from redis.client import Pipeline
+from redis.commands.core import Script
+from redis.exceptions import ResponseError
 
-from app.core.redis_client import get_redis
+from app.core.redis_client import get_redis_raw
 from app.schemas.session_schema import (
     SessionData,
     MessageData,
     MessageStatus,
     StepStatus,
-    StepDetail,
+    StepStatusValue,
     ThinkingLogEntry,
     UnifiedIntent,
     ResolvedKeywords,
@@ -30,32 +49,326 @@ from app.schemas.session_schema import (
     SummarizedNewsItem,
     ReportItem,
 )
-from app.core.step_definitions import get_steps_for_intent
+from app.core.step_definitions import get_step_details
+
+logger = logging.getLogger(__name__)
+
+
+# 仅当文档存在时写入字段并刷新过期时间，避免对已过期/删除的文档写出残缺的 hash
+# KEYS[1] = key, ARGV = [ttl, field1, value1, field2, value2, ...]，ttl 为 0 时不刷新过期时间
+_PATCH_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+if tonumber(ARGV[1]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+# 原子更新单个步骤：在服务端修改 step_details 中第 ARGV[1] 步的状态与说明，
+# 同时写入 steps / status / updated_at。返回 total_steps（JSON 文本 bytes），未更新时返回 0
+# KEYS[1] = key, ARGV = [step, status, message, status_json, updated_at, ttl]
+_UPDATE_STEP_SCRIPT = """
+local raw = redis.call('HGET', KEYS[1], 'step_details')
+if not raw then
+    return 0
+end
+local details = cjson.decode(raw)
+local detail = details[tonumber(ARGV[1])]
+if type(detail) ~= 'table' then
+    return 0
+end
+detail.status = ARGV[2]
+detail.message = ARGV[3]
+redis.call('HSET', KEYS[1], 'step_details', cjson.encode(details),
+    'steps', ARGV[1], 'status', ARGV[4], 'updated_at', ARGV[5])
+if tonumber(ARGV[6]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[6])
+end
+return redis.call('HGET', KEYS[1], 'total_steps') or '0'
+"""
+
+
+# 会话存在时追加一条对话历史并截断到最近 N 条
+# KEYS = [session_key, history_key], ARGV = [ttl, max_history, entry]
+_PUSH_HISTORY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('RPUSH', KEYS[2], ARGV[3])
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _register_script(redis: Redis, source: str) -> Script:
+    """注册 Lua 脚本（EVALSHA 调用，服务端缓存脚本）"""
+    return redis.register_script(source)
+
+
+@functools.lru_cache(maxsize=None)
+def _field_adapter(model: Type[BaseModel], name: str) -> TypeAdapter:
+    """单个字段的校验器（按字段读取时使用）"""
+    return TypeAdapter(model.model_fields[name].annotation)
+
+
+def _encode_field(value: Any) -> bytes:
+    """
+    序列化单个字段值（NaN/Inf 写为 null，与 model_dump_json 一致）
+
+    直接走 pydantic-core 的 Rust 序列化器，模型对象无需先 model_dump 成 dict；
+    读取端用 orjson 解析。
+    """
+    return to_json(value, inf_nan_mode="null")
+
+
+def _pack_points(points: List[TimeSeriesPoint]) -> bytes:
+    """时序数据点 -> 列式 JSON（value / is_prediction 为打包的 numpy 缓冲区）"""
+    count = len(points)
+    values = np.fromiter((p.value for p in points), dtype=np.float64, count=count)
+    flags = np.fromiter((p.is_prediction for p in points), dtype=np.bool_, count=count)
+    return orjson.dumps({
+        "date": [p.date for p in points],
+        "value": base64.b64encode(values.tobytes()).decode("ascii"),
+        "is_prediction": base64.b64encode(flags.tobytes()).decode("ascii"),
+    })
+
+
+def _unpack_points(columns: Any) -> List[Dict[str, Any]]:
+    """列式 JSON -> 数据点字典列表（兼容按行存储的旧数据）"""
+    if isinstance(columns, list):
+        return columns
+    values = np.frombuffer(base64.b64decode(columns["value"]), dtype=np.float64)
+    flags = np.frombuffer(base64.b64decode(columns["is_prediction"]), dtype=np.bool_)
+    return [
+        {"date": date, "value": value, "is_prediction": flag}
+        for date, value, flag in zip(columns["date"], values.tolist(), flags.tolist())
+    ]
+
+
+class _HashDocument:
+    """
+    Redis Hash 文档基类
+
+    子类需设置 model（Pydantic 模型）和 KEY_PREFIX，并在 __init__ 中设置 redis / key。
+    """
+
+    model: Type[BaseModel]
+    redis: Redis
+    key: str
+
+    KEY_PREFIX: str = ""
+    ttl: int = 86400  # 24小时过期
+    # 距上次刷新过期时间不足该秒数时，更新字段不再重复 EXPIRE
+    TTL_REFRESH_INTERVAL = 60
 
+    # 本实例上次刷新过期时间的时刻（time.monotonic）
+    _ttl_refreshed_at: float = float("-inf")
+
+    # 按列打包存储的 List[TimeSeriesPoint] 字段
+    POINT_FIELDS: frozenset = frozenset()
+
+    # batch() 期间暂存的字段（None 表示不在批量模式）
+    _pending: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def exists(cls, doc_id: str) -> bool:
+        """检查文档是否存在"""
+        return get_redis_raw().exists(f"{cls.KEY_PREFIX}{doc_id}") > 0
+
+    @contextmanager
+    def batch(self) -> Iterator["_HashDocument"]:
+        """
+        合并多次字段更新
+
+        with 块内的 _patch 只暂存到本地，读取暂存过的字段直接使用本地值（不访问 Redis），
+        退出时一次性写入。已在批量模式中时嵌套调用并入外层。
+        """
+        if self._pending is not None:
+            yield self
+            return
+        self._pending = {}
+        try:
+            yield self
+        finally:
+            pending, self._pending = self._pending, None
+            if pending:
+                self._patch(**pending)
+
+    def get(self) -> Optional[BaseModel]:
+        """读取完整文档"""
+        try:
+            raw = self.redis.hgetall(self.key)
+        except ResponseError:
+            raw = self._migrate_legacy()
+        if not raw:
+            return None
+        data = {name.decode(): self._decode(name.decode(), value) for name, value in raw.items()}
+        if self._pending:
+            data.update(self._pending)
+        return self.model.model_validate(data)
+
+    def _get_fields(self, *names: str) -> Optional[Dict[str, Any]]:
+        """只读取指定字段（HMGET），文档不存在时返回 None"""
+        pending = self._pending or {}
+        missing = [name for name in names if name not in pending]
+        fields = self._read_fields(missing) if missing else {}
+        if fields is None:
+            return None
+        for name in names:
+            if name in pending:
+                fields[name] = pending[name]
+        return fields
+
+    def _read_fields(self, names: List[str]) -> Optional[Dict[str, Any]]:
+        """从 Redis 读取字段并校验"""
+        try:
+            raw = self.redis.hmget(self.key, names)
+        except ResponseError:
+            data = self.get()  # 旧格式：读取时迁移
+            return {name: getattr(data, name) for name in names} if data else None
+        if all(value is None for value in raw):
+            return None
 
-class Message:
+        fields = {}
+        for name, value in zip(names, raw):
+            if value is None:
+                fields[name] = self.model.model_fields[name].get_default(
+                    call_default_factory=True
+                )
+            else:
+                fields[name] = _field_adapter(self.model, name).validate_python(
+                    self._decode(name, value)
+                )
+        return fields
+
+    def _save(self, data: BaseModel, pipe: Optional[Pipeline] = None):
+        """整体写入文档（仅创建时使用，更新请用 _patch）"""
+        mapping = {name: self._encode(name, value) for name, value in data}
+        mapping["updated_at"] = time.time_ns()
+        self._write(mapping, pipe)
+
+    def _patch(self, pipe: Optional[Pipeline] = None, **fields: Any) -> bool:
+        """
+        只写入指定字段（同时刷新 updated_at 和过期时间）
+
+        文档不存在时不写入。直接执行时返回是否写入；传入 pipe 或处于 batch() 中时
+        只排入/暂存，返回 True。
+        """
+        if pipe is None and self._pending is not None:
+            self._pending.update(fields)
+            return True
+
+        refresh_ttl = self._ttl_due()
+        # updated_at 直接存整数纳秒时间戳，读取时再格式化
+        args = [self.ttl if refresh_ttl else 0, "updated_at", time.time_ns()]
+        for name, value in fields.items():
+            args += (name, self._encode(name, value))
+
+        script = _register_script(self.redis, _PATCH_SCRIPT)
+        if pipe is not None:
+            script(keys=[self.key], args=args, client=pipe)
+            saved = True
+        else:
+            try:
+                saved = bool(script(keys=[self.key], args=args))
+            except ResponseError:
+                # 旧格式文档（整文档字符串）：迁移为 Hash 后重试一次
+                if not self._migrate_legacy():
+                    raise
+                saved = bool(script(keys=[self.key], args=args))
+        if saved and refresh_ttl:
+            self._ttl_refreshed_at = time.monotonic()
+        return saved
+
+    def _ttl_due(self) -> bool:
+        """是否需要随本次写入刷新过期时间"""
+        return time.monotonic() - self._ttl_refreshed_at >= self.TTL_REFRESH_INTERVAL
+
+    def _encode(self, name: str, value: Any) -> bytes:
+        if name in self.POINT_FIELDS:
+            return _pack_points(value)
+        return _encode_field(value)
+
+    def _decode(self, name: str, raw: bytes) -> Any:
+        value = orjson.loads(raw)
+        if name in self.POINT_FIELDS:
+            return _unpack_points(value)
+        if name == "updated_at" and isinstance(value, int):
+            return datetime.fromtimestamp(value / 1e9).isoformat()
+        return value
+
+    def _write(self, mapping: Dict[str, bytes], pipe: Optional[Pipeline] = None):
+        """写入字段；传入 pipe 时只排入命令，由调用方统一 execute"""
+        target = pipe if pipe is not None else self.redis.pipeline()
+        target.hset(self.key, mapping=mapping)
+        target.expire(self.key, self.ttl)
+        if pipe is None:
+            target.execute()
+        self._ttl_refreshed_at = time.monotonic()
+
+    def _migrate_legacy(self) -> Dict[bytes, bytes]:
+        """旧版整文档 JSON 字符串 -> Hash（升级前创建的 key）"""
+        try:
+            legacy = self.redis.get(self.key)
+        except ResponseError:
+            return {}  # 已是 Hash 或其他类型，无需迁移
+        if not legacy:
+            return {}
+        raw = orjson.loads(legacy)
+        pipe = self.redis.pipeline()
+        self._migrate_legacy_extra(raw, pipe)
+        data = self.model.model_validate(raw)
+        mapping = {name: self._encode(name, value) for name, value in data}
+        pipe.delete(self.key)
+        pipe.hset(self.key, mapping=mapping)
+        pipe.expire(self.key, self.ttl)
+        pipe.execute()
+        logger.info("[%s] Migrated legacy document: %s", type(self).__name__, self.key)
+        return {name.encode(): value for name, value in mapping.items()}
+
+    def _migrate_legacy_extra(self, raw: Dict[str, Any], pipe: Pipeline):
+        """迁移旧文档中已拆分到其他 key 的字段（子类覆盖，命令排入 pipe）"""
+
+
+class Message(_HashDocument):
     """
     单轮 QA 管理器
 
     存储单轮对话的所有分析结果数据
     """
 
+    model = MessageData
+    KEY_PREFIX = "message:"
+    POINT_FIELDS = frozenset({"time_series_original", "time_series_full"})
+
     def __init__(
         self, message_id: str, session_id: str, redis_client: Optional[Redis] = None
     ):
         self.message_id = message_id
         self.session_id = session_id
-        self.redis = redis_client or get_redis()
-        self.key = f"message:{message_id}"
-        self.ttl = 86400  # 24小时过期
+        self.redis = redis_client or get_redis_raw()
+        self.key = f"{self.KEY_PREFIX}{message_id}"
 
     @classmethod
-    def create(cls, session_id: str, user_query: str) -> "Message":
-        """创建新消息"""
+    def create(
+        cls,
+        session_id: str,
+        user_query: str,
+        pipe: Optional[Pipeline] = None,
+        now: Optional[str] = None,
+        stream_status: str = "idle",
+    ) -> "Message":
+        """创建新消息（传入 pipe 时写入命令排入该 pipeline；now 为共用的 ISO 时间戳）"""
         message_id = str(uuid.uuid4())
         message = cls(message_id, session_id)
 
-        now = datetime.now().isoformat()
+        now = now or datetime.now().isoformat()
         initial_data = MessageData(
             message_id=message_id,
             session_id=session_id,
@@ -63,178 +376,161 @@ class Message:
             status=MessageStatus.PENDING,
             created_at=now,
             updated_at=now,
+            stream_status=stream_status,
         )
 
-        message._save(initial_data)
-        print(f"[Message] Created: {message_id} for session {session_id}")
+        message._save(initial_data, pipe)
+        logger.debug("[Message] Created: %s for session %s", message_id, session_id)
         return message
 
-    @classmethod
-    def exists(cls, message_id: str) -> bool:
-        """检查消息是否存在"""
-        redis = get_redis()
-        return redis.exists(f"message:{message_id}") > 0
-
     def get(self) -> Optional[MessageData]:
         """获取消息数据"""
-        data = self.redis.get(self.key)
-        if not data:
-            return None
-        return MessageData.model_validate_json(data)
-
-    def _save(self, data: MessageData):
-        """保存消息数据"""
-        data.updated_at = datetime.now().isoformat()
-        json_data = data.model_dump_json()
-        self.redis.setex(self.key, self.ttl, json_data)
+        return super().get()
 
     def delete(self):
         """删除消息"""
         self.redis.delete(self.key)
-        print(f"[Message] Deleted: {self.message_id}")
+        logger.debug("[Message] Deleted: %s", self.message_id)
 
     # ========== 意图相关 ==========
 
     def save_unified_intent(self, intent: UnifiedIntent):
         """保存统一意图识别结果"""
-        data = self.get()
-        if data:
-            data.unified_intent = intent
-
-            # 简化意图分类（仅用于日志/调试）
-            if not intent.is_in_scope:
-                data.intent = "out_of_scope"
-            elif intent.is_forecast:
-                data.intent = "forecast"
-            else:
-                data.intent = "chat"
-
-            # 根据实际流程选择步骤
-            has_stock = bool(intent.stock_mention)
-            steps = get_steps_for_intent(
-                is_forecast=intent.is_forecast,
-                is_in_scope=intent.is_in_scope,
-                has_stock=has_stock,
-            )
-
-            data.total_steps = len(steps)
-            data.step_details = [
-                StepDetail(
-                    id=s["id"], name=s["name"], status=StepStatus.PENDING, message=""
-                )
-                for s in steps
-            ]
+        # 简化意图分类（仅用于日志/调试）
+        if not intent.is_in_scope:
+            intent_name = "out_of_scope"
+        elif intent.is_forecast:
+            intent_name = "forecast"
+        else:
+            intent_name = "chat"
+
+        # 根据实际流程选择步骤
+        has_stock = bool(intent.stock_mention)
+        steps = get_step_details(
+            is_forecast=intent.is_forecast,
+            is_in_scope=intent.is_in_scope,
+            has_stock=has_stock,
+        )
 
-            self._save(data)
-            print(
-                f"[Message] Intent: {data.intent}, has_stock={has_stock}, steps={len(steps)}"
+        saved = self._patch(
+            unified_intent=intent,
+            intent=intent_name,
+            total_steps=len(steps),
+            step_details=steps,
+        )
+        if saved:
+            logger.debug(
+                "[Message] Intent: %s, has_stock=%s, steps=%d", intent_name, has_stock, len(steps)
             )
 
     # ========== 股票相关 ==========
 
     def save_stock_match(self, result: StockMatchResult):
         """保存股票匹配结果"""
-        data = self.get()
-        if data:
-            data.stock_match = result
-            self._save(data)
-            print(f"[Message] Stock match: {result.success}")
+        if self._patch(stock_match=result):
+            logger.debug("[Message] Stock match: %s", result.success)
 
     def save_resolved_keywords(self, keywords: ResolvedKeywords):
         """保存最终关键词"""
-        data = self.get()
-        if data:
-            data.resolved_keywords = keywords
-            self._save(data)
+        self._patch(resolved_keywords=keywords)
 
     # ========== 步骤管理 ==========
 
     def update_step_detail(self, step: int, status: str, message: str = ""):
-        """更新步骤详情"""
-        data = self.get()
-        if data and 0 < step <= len(data.step_details):
-            data.steps = step
-            data.status = MessageStatus.PROCESSING
-            data.step_details[step - 1].status = StepStatus(status)
-            data.step_details[step - 1].message = message
-            self._save(data)
-            print(f"[Message] Step {step}/{data.total_steps} [{status}]: {message}")
+        """更新步骤详情（非 batch 时由 Lua 脚本原子完成读改写）"""
+        if status not in get_args(StepStatusValue):
+            raise ValueError(f"Invalid step status: {status}")
+        if self._pending is None:
+            refresh_ttl = self._ttl_due()
+            script = _register_script(self.redis, _UPDATE_STEP_SCRIPT)
+            try:
+                total_steps = script(
+                    keys=[self.key],
+                    args=[
+                        step,
+                        status,
+                        message,
+                        _encode_field(MessageStatus.PROCESSING),
+                        time.time_ns(),
+                        self.ttl if refresh_ttl else 0,
+                    ],
+                )
+            except ResponseError:
+                pass  # 旧格式文档：走下方读改写（读取时迁移）
+            else:
+                if total_steps:
+                    total_steps = total_steps.decode()
+                    if refresh_ttl:
+                        self._ttl_refreshed_at = time.monotonic()
+                    logger.debug(
+                        "[Message] Step %d/%s [%s]: %s", step, total_steps, status, message
+                    )
+                return
+
+        fields = self._get_fields("step_details", "total_steps")
+        if fields and 0 < step <= len(fields["step_details"]):
+            step_details = fields["step_details"]
+            step_details[step - 1].status = status
+            step_details[step - 1].message = message
+            self._patch(
+                steps=step,
+                status=MessageStatus.PROCESSING,
+                step_details=step_details,
+            )
+            logger.debug(
+                "[Message] Step %d/%s [%s]: %s",
+                step, fields["total_steps"], status, message,
+            )
 
     # ========== 数据保存 ==========
 
     def save_time_series_original(self, points: List[TimeSeriesPoint]):
         """保存原始时序数据"""
-        data = self.get()
-        if data:
-            data.time_series_original = points
-            self._save(data)
+        self._patch(time_series_original=points)
 
     def save_time_series_full(
         self, points: List[TimeSeriesPoint], prediction_start: str
     ):
         """保存完整时序数据（含预测）"""
-        data = self.get()
-        if data:
-            data.time_series_full = points
-            data.prediction_start_day = prediction_start
-            data.prediction_done = True
-            self._save(data)
+        self._patch(
+            time_series_full=points,
+            prediction_start_day=prediction_start,
+            prediction_done=True,
+        )
 
     def save_news(self, news: List[SummarizedNewsItem]):
         """保存新闻列表"""
-        data = self.get()
-        if data:
-            data.news_list = news
-            self._save(data)
+        self._patch(news_list=news)
 
     def save_reports(self, reports: List[ReportItem]):
         """保存研报列表"""
-        data = self.get()
-        if data:
-            data.report_list = reports
-            self._save(data)
+        self._patch(report_list=reports)
 
     def save_rag_sources(self, sources: List[RAGSource]):
         """保存 RAG 来源"""
-        data = self.get()
-        if data:
-            data.rag_sources = sources
-            self._save(data)
+        self._patch(rag_sources=sources)
 
     def save_emotion(self, score: float, description: str):
         """保存情绪分析"""
-        data = self.get()
-        if data:
-            data.emotion = score
-            data.emotion_des = description
-            self._save(data)
+        self._patch(emotion=score, emotion_des=description)
     
     def save_influence_analysis(self, influence_result: Dict):
         """保存多因素影响力分析结果"""
-        data = self.get()
-        if data:
-            data.influence_analysis = influence_result
-            self._save(data)
-            print(f"[Message] Saved influence analysis: {len(influence_result.get('ranking', []))} factors")
+        if self._patch(influence_analysis=influence_result):
+            logger.debug(
+                "[Message] Saved influence analysis: %d factors",
+                len(influence_result.get("ranking", [])),
+            )
 
     def save_anomaly_zones(self, zones: List[Dict], ticker: str):
         """保存异常区域数据"""
-        data = self.get()
-        if data:
-            data.anomaly_zones = zones
-            data.anomaly_zones_ticker = ticker
-            self._save(data)
-            data.anomaly_zones_ticker = ticker
-            self._save(data)
-            print(f"[Message] Saved {len(zones)} anomaly zones for ticker {ticker}")
+        if self._patch(anomaly_zones=zones, anomaly_zones_ticker=ticker):
+            logger.debug("[Message] Saved %d anomaly zones for ticker %s", len(zones), ticker)
 
     def save_change_points(self, change_points: List[Dict]):
         """保存变点检测数据"""
-        data = self.get()
-        if data:
-            data.change_points = change_points
-            self._save(data)
-            print(f"[Message] Saved {len(change_points)} change points")
+        if self._patch(change_points=change_points):
+            logger.debug("[Message] Saved %d change points", len(change_points))
 
     def save_zone_ticker_news(self, ticker: str, date: str, news: List[Dict]):
         """保存zone-ticker特定日期的新闻缓存"""
@@ -244,21 +540,13 @@ class Message:
             if not isinstance(data.zone_ticker_news, dict):
                 data.zone_ticker_news = {}
             data.zone_ticker_news[cache_key] = news
-            self._save(data)
-            print(f"[Message] Cached {len(news)} news for {cache_key}")
+            self._patch(zone_ticker_news=data.zone_ticker_news)
+            logger.debug("[Message] Cached %d news for %s", len(news), cache_key)
 
     def save_conclusion(self, conclusion: str):
-        """保存综合报告 - 保留现有数据"""
-        data = self.get()
-        if data:
-            # 更新existing data，保留zones等字段
-            data.conclusion = conclusion
-            self._save(data)
-            print(
-                f"[Message] Updated conclusion, preserved zones: {len(data.anomaly_zones)}, news: {len(data.news_list)}"
-            )
-        else:
-            print("[Message] WARNING: No existing data to update conclusion!")
+        """保存综合报告（只更新 conclusion 字段，zones 等字段不受影响）"""
+        if not self._patch(conclusion=conclusion):
+            logger.warning("[Message] No existing data to update conclusion: %s", self.message_id)
 
     def save_model_selection(
         self,
@@ -267,160 +555,235 @@ class Message:
         is_better_than_baseline: bool,
     ):
         """保存模型选择信息"""
-        data = self.get()
-        if data:
-            # 将模型选择信息存储在 MessageData 中
-            # 由于 MessageData 可能没有专门的字段，我们通过 step_details 或思考日志保存
-            # 或者可以通过扩展 MessageData schema 来添加字段
-            # 目前先通过思考日志保存，以便后续可以查看
-            import json
-
-            selection_info = {
-                "selected_model": selected_model,
-                "model_comparison": model_comparison,
-                "is_better_than_baseline": is_better_than_baseline,
-            }
-            self.append_thinking_log(
-                "model_selection",
-                "模型选择",
-                f"选择的模型: {selected_model}, 模型比较: {json.dumps(model_comparison, ensure_ascii=False)}, 优于baseline: {is_better_than_baseline}",
-            )
+        # 将模型选择信息存储在 MessageData 中
+        # 由于 MessageData 可能没有专门的字段，我们通过 step_details 或思考日志保存
+        # 或者可以通过扩展 MessageData schema 来添加字段
+        # 目前先通过思考日志保存，以便后续可以查看
+        comparison = orjson.dumps(model_comparison).decode()
+        self.append_thinking_log(
+            "model_selection",
+            "模型选择",
+            f"选择的模型: {selected_model}, 模型比较: {comparison}, 优于baseline: {is_better_than_baseline}",
+        )
 
     def save_model_selection_reason(self, reason: str):
         """保存模型选择原因"""
-        data = self.get()
-        if data:
-            data.model_selection_reason = reason
-            self._save(data)
+        self._patch(model_selection_reason=reason)
 
     def save_model_name(self, model_name: str):
         """保存模型名称"""
-        data = self.get()
-        if data:
-            data.model_name = model_name
-            self._save(data)
+        self._patch(model_name=model_name)
 
     # ========== 状态管理 ==========
 
     def mark_completed(self):
         """标记为完成"""
-        data = self.get()
-        if data:
-            data.status = MessageStatus.COMPLETED
-            data.steps = data.total_steps
-            for step in data.step_details:
+        fields = self._get_fields("step_details", "total_steps")
+        if fields:
+            for step in fields["step_details"]:
                 if step.status != StepStatus.ERROR:
                     step.status = StepStatus.COMPLETED
-            self._save(data)
-            print(f"[Message] Completed: {self.message_id}")
+            self._patch(
+                status=MessageStatus.COMPLETED,
+                steps=fields["total_steps"],
+                step_details=fields["step_details"],
+            )
+            logger.debug("[Message] Completed: %s", self.message_id)
 
     def mark_error(self, error_message: str):
         """标记为错误"""
-        data = self.get()
-        if data:
-            data.status = MessageStatus.ERROR
-            data.error_message = error_message
-            self._save(data)
-            print(f"[Message] Error: {error_message}")
+        if self._patch(status=MessageStatus.ERROR, error_message=error_message):
+            logger.warning("[Message] Error: %s", error_message)
+
+    def get_conclusion(self) -> Optional[str]:
+        """读取综合报告（只读该字段），消息不存在时返回 None"""
+        fields = self._get_fields("conclusion")
+        return fields["conclusion"] if fields else None
+
+    def get_unified_intent(self) -> Optional[UnifiedIntent]:
+        """读取统一意图识别结果（只读该字段）"""
+        fields = self._get_fields("unified_intent")
+        return fields["unified_intent"] if fields else None
+
+    def get_stream_status(self) -> Optional[str]:
+        """读取流式状态（只读该字段），消息不存在时返回 None"""
+        fields = self._get_fields("stream_status")
+        return fields["stream_status"] if fields else None
+
+    def save_stream_status(self, stream_status: str):
+        """更新流式状态（idle | queued | streaming | completed | error）"""
+        self._patch(stream_status=stream_status)
 
     # ========== 思考日志 ==========
 
     def append_thinking_log(self, step_id: str, step_name: str, content: str):
         """追加思考日志条目（累积显示）"""
-        data = self.get()
-        if data:
-            entry = ThinkingLogEntry(
-                step_id=step_id,
-                step_name=step_name,
-                content=content,
-                timestamp=datetime.now().isoformat(),
+        fields = self._get_fields("thinking_logs")
+        if fields:
+            thinking_logs = fields["thinking_logs"]
+            thinking_logs.append(
+                ThinkingLogEntry(
+                    step_id=step_id,
+                    step_name=step_name,
+                    content=content,
+                    timestamp=datetime.now().isoformat(),
+                )
             )
-            data.thinking_logs.append(entry)
-            self._save(data)
-            print(f"[Message] Thinking log: {step_id} - {len(content)} chars")
+            self._patch(thinking_logs=thinking_logs)
+            logger.debug("[Message] Thinking log: %s - %d chars", step_id, len(content))
 
 
-class Session:
+class Session(_HashDocument):
     """
     会话管理器 (多轮对话容器)
 
     存储全局信息和消息列表，每个消息的详细数据在 Message 中
     """
 
+    model = SessionData
+    KEY_PREFIX = "session:"
+
+    DEFAULT_TITLE = "New Chat"
+    MAX_TITLE_CHARS = 50
+    MAX_HISTORY = 20  # 保留的对话历史条数
+
     def __init__(self, session_id: str, redis_client: Optional[Redis] = None):
         self.session_id = session_id
-        self.redis = redis_client or get_redis()
-        self.key = f"session:{session_id}"
-        self.ttl = 86400  # 24小时过期
+        self.redis = redis_client or get_redis_raw()
+        self.key = f"{self.KEY_PREFIX}{session_id}"
+        self.history_key = f"{self.key}:history"
 
     @classmethod
     def create(cls) -> "Session":
         """创建新会话"""
-        session_id = str(uuid.uuid4())
-        session = cls(session_id)
+        initial_data = cls._new_data()
+        session = cls(initial_data.session_id)
+        session._save(initial_data)
+        logger.debug("[Session] Created: %s", session.session_id)
+        return session
 
-        now = datetime.now().isoformat()
-        initial_data = SessionData(
-            session_id=session_id, created_at=now, updated_at=now
+    @classmethod
+    def open_for_query(
+        cls, session_id: Optional[str], user_query: str
+    ) -> Tuple["Session", Message]:
+        """
+        打开会话并开始新一轮提问（会话不存在时新建）
+
+        创建 Message（stream_status 为 "queued"，等待后台 worker 执行），
+        并更新 message_ids / current_message_id / 对话历史，首条消息时自动生成标题。已有会话只读取 message_ids / 标题两个字段，
+        所有写入合并为一次 pipeline。
+
+        Args:
+            session_id: 会话 ID（可选）
+            user_query: 用户问题
+
+        Returns:
+            (session, message)
+        """
+        # 已有会话只读取需要追加/判断的字段，不加载整个文档
+        fields = (
+            cls(session_id)._get_fields("message_ids", "title") if session_id else None
         )
+        # 新会话与新消息共用一个创建时间
+        now = datetime.now().isoformat()
 
-        session._save(initial_data)
-        print(f"[Session] Created: {session_id}")
-        return session
+        if fields is None:
+            data = cls._new_data(now)
+            session = cls(data.session_id)
+            pipe = session.redis.pipeline()
+            message = Message.create(
+                session.session_id, user_query, pipe=pipe, now=now, stream_status="queued"
+            )
+
+            data.message_ids.append(message.message_id)
+            data.current_message_id = message.message_id
+            data.title = cls._make_title(user_query)
+            session._save(data, pipe)
+            logger.debug("[Session] Created: %s", session.session_id)
+        else:
+            session = cls(session_id)
+            pipe = session.redis.pipeline()
+            message = Message.create(
+                session.session_id, user_query, pipe=pipe, now=now, stream_status="queued"
+            )
+
+            updates = {
+                "message_ids": fields["message_ids"] + [message.message_id],
+                "current_message_id": message.message_id,
+            }
+            if not fields["message_ids"] and fields["title"] == cls.DEFAULT_TITLE:
+                updates["title"] = cls._make_title(user_query)
+            session._patch(pipe, **updates)
+
+        session._push_history("user", user_query, pipe)
+        pipe.execute()
+        return session, message
+
+    @staticmethod
+    def _new_data(now: Optional[str] = None) -> SessionData:
+        """构建新会话的初始数据（不写入 Redis）"""
+        now = now or datetime.now().isoformat()
+        return SessionData(session_id=str(uuid.uuid4()), created_at=now, updated_at=now)
 
     @classmethod
-    def exists(cls, session_id: str) -> bool:
-        """检查会话是否存在"""
-        redis = get_redis()
-        return redis.exists(f"session:{session_id}") > 0
+    def _make_title(cls, first_message: str) -> str:
+        """从首条消息生成标题（截断到 MAX_TITLE_CHARS 字符）"""
+        title = first_message[: cls.MAX_TITLE_CHARS]
+        if len(first_message) > cls.MAX_TITLE_CHARS:
+            title += "..."
+        return title
 
     def get(self) -> Optional[SessionData]:
         """获取会话数据"""
-        data = self.redis.get(self.key)
-        if not data:
-            return None
-        return SessionData.model_validate_json(data)
+        return super().get()
 
-    def _save(self, data: SessionData):
-        """保存会话数据"""
-        data.updated_at = datetime.now().isoformat()
-        json_data = data.model_dump_json()
-        self.redis.setex(self.key, self.ttl, json_data)
+    def get_summary(self) -> Optional[Dict[str, Any]]:
+        """
+        读取会话列表所需的元数据（不读取对话历史），会话不存在时返回 None
 
-    def delete(self):
-        """删除会话及其所有消息"""
-        data = self.get()
-        if data:
-            # 删除所有关联的消息
-            for message_id in data.message_ids:
-                msg = Message(message_id, self.session_id)
-                msg.delete()
-        self.redis.delete(self.key)
-        print(f"[Session] Deleted: {self.session_id}")
+        Returns:
+            {"title", "created_at", "updated_at", "message_count"}
+        """
+        fields = self._get_fields("title", "created_at", "updated_at", "message_ids")
+        if not fields:
+            return None
+        fields["message_count"] = len(fields.pop("message_ids"))
+        return fields
+
+    def delete(self) -> bool:
+        """删除会话及其所有消息（一次 DEL），返回会话是否存在"""
+        fields = self._get_fields("message_ids")
+        if not fields:
+            return False
+        message_keys = [f"{Message.KEY_PREFIX}{mid}" for mid in fields["message_ids"]]
+        self.redis.delete(self.key, self.history_key, *message_keys)
+        logger.debug("[Session] Deleted: %s (%d messages)", self.session_id, len(message_keys))
+        return True
 
     # ========== 消息管理 ==========
 
     def create_message(self, user_query: str) -> Message:
         """创建新消息"""
-        data = self.get()
-        if not data:
+        fields = self._get_fields("message_ids")
+        if not fields:
             raise ValueError(f"Session {self.session_id} not found")
 
         # 创建消息
         message = Message.create(session_id=self.session_id, user_query=user_query)
 
         # 添加到 session
-        data.message_ids.append(message.message_id)
-        data.current_message_id = message.message_id
-        self._save(data)
+        self._patch(
+            message_ids=fields["message_ids"] + [message.message_id],
+            current_message_id=message.message_id,
+        )
 
         return message
 
     def get_current_message(self) -> Optional[Message]:
         """获取当前正在处理的消息"""
-        data = self.get()
-        if data and data.current_message_id:
-            return Message(data.current_message_id, self.session_id)
+        fields = self._get_fields("current_message_id")
+        if fields and fields["current_message_id"]:
+            return Message(fields["current_message_id"], self.session_id)
         return None
 
     def get_message(self, message_id: str) -> Optional[Message]:
@@ -429,50 +792,77 @@ class Session:
             return Message(message_id, self.session_id)
         return None
 
-    def get_all_messages(self) -> List[Message]:
-        """获取所有消息"""
-        data = self.get()
-        if not data:
-            return []
+    def get_all_messages(self) -> Optional[List[Message]]:
+        """获取所有仍存在的消息（存在性检查合并为一次 pipeline），会话不存在时返回 None"""
+        fields = self._get_fields("message_ids")
+        if not fields:
+            return None
+        message_ids = fields["message_ids"]
+        pipe = self.redis.pipeline(transaction=False)
+        for mid in message_ids:
+            pipe.exists(f"{Message.KEY_PREFIX}{mid}")
         return [
             Message(mid, self.session_id)
-            for mid in data.message_ids
-            if Message.exists(mid)
+            for mid, found in zip(message_ids, pipe.execute())
+            if found
         ]
 
     # ========== 对话历史 ==========
 
+    def _migrate_legacy_extra(self, raw: Dict[str, Any], pipe: Pipeline):
+        """旧文档中的 conversation_history 迁移到独立 List（排在已追加的新记录之前）"""
+        legacy_history = raw.pop("conversation_history", None) or []
+        if not legacy_history:
+            return
+        entries = [
+            orjson.dumps({"role": entry.get("role", ""), "content": entry.get("content", "")})
+            for entry in legacy_history
+        ]
+        # 迁移前可能已有新追加的记录（_push_history 不会因旧格式报错）
+        entries += self.redis.lrange(self.history_key, 0, -1)
+        pipe.delete(self.history_key)
+        pipe.rpush(self.history_key, *entries)
+        pipe.ltrim(self.history_key, -self.MAX_HISTORY, -1)
+        pipe.expire(self.history_key, self.ttl)
+
     def get_conversation_history(self) -> List[Dict[str, str]]:
-        """获取对话历史"""
-        data = self.get()
-        return data.conversation_history if data else []
+        """获取对话历史（按时间顺序）"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.type(self.key)
+        pipe.lrange(self.history_key, 0, -1)
+        key_type, entries = pipe.execute()
+        if key_type == b"string":
+            # 旧格式会话：历史还在文档内，迁移后重新读取
+            self._migrate_legacy()
+            entries = self.redis.lrange(self.history_key, 0, -1)
+        return [orjson.loads(entry) for entry in entries]
 
     def add_conversation_message(self, role: str, content: str):
-        """添加对话消息"""
-        data = self.get()
-        if data:
-            data.conversation_history.append({"role": role, "content": content})
-            if len(data.conversation_history) > 20:
-                data.conversation_history = data.conversation_history[-20:]
-            self._save(data)
+        """添加对话消息（会话不存在时不写入）"""
+        self._push_history(role, content)
+
+    def _push_history(self, role: str, content: str, pipe: Optional[Pipeline] = None):
+        """追加一条对话历史（传入 pipe 时只排入命令）"""
+        script = _register_script(self.redis, _PUSH_HISTORY_SCRIPT)
+        script(
+            keys=[self.key, self.history_key],
+            args=[self.ttl, self.MAX_HISTORY, orjson.dumps({"role": role, "content": content})],
+            client=pipe if pipe is not None else self.redis,
+        )
 
     # ========== Session 元数据管理 ==========
 
-    def update_title(self, new_title: str):
-        """更新会话标题"""
-        data = self.get()
-        if data:
-            data.title = new_title
-            self._save(data)
-            print(f"[Session] Title updated: {new_title}")
+    def update_title(self, new_title: str) -> bool:
+        """更新会话标题，返回会话是否存在"""
+        updated = self._patch(title=new_title)
+        if updated:
+            logger.debug("[Session] Title updated: %s", new_title)
+        return updated
 
     def auto_generate_title(self, first_message: str):
         """从首条消息自动生成标题（截断到50字符）"""
-        data = self.get()
-        if data and data.title == "New Chat":  # 只在默认标题时自动生成
-            title = first_message[:50]
-            if len(first_message) > 50:
-                title += "..."
-            data.title = title
-            self._save(data)
-            print(f"[Session] Auto-generated title: {title}")
+        fields = self._get_fields("title")
+        if fields and fields["title"] == self.DEFAULT_TITLE:  # 只在默认标题时自动生成
+            title = self._make_title(first_message)
+            self._patch(title=title)
+            logger.debug("[Session] Auto-generated title: %s", title)
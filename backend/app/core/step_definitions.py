@@ -10,40 +10,82 @@
 - 超出范围: 1 个阶段
 """
 
-from typing import List, Dict
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
+
+from app.schemas.session_schema import StepDetail, StepStatus
+
+# 单个步骤定义（只读）
+StepDef = Mapping[str, str]
+
+
+def _freeze(*steps: Dict[str, str]) -> Tuple[StepDef, ...]:
+    """步骤定义冻结为只读元组，防止调用方误改共享常量"""
+    return tuple(MappingProxyType(step) for step in steps)
+
 
 # 预测分析流程 (6步)
-FORECAST_STEPS = [
+FORECAST_STEPS = _freeze(
     {"id": "1", "name": "意图识别"},
     {"id": "2", "name": "股票验证"},
     {"id": "3", "name": "数据获取"},
     {"id": "4", "name": "分析处理"},
     {"id": "5", "name": "模型预测"},
     {"id": "6", "name": "报告生成"},
-]
+)
 
 # 非预测流程 - 有股票 (4步)
-CHAT_WITH_STOCK_STEPS = [
+CHAT_WITH_STOCK_STEPS = _freeze(
     {"id": "1", "name": "意图识别"},
     {"id": "2", "name": "股票验证"},
     {"id": "3", "name": "信息检索"},
     {"id": "4", "name": "生成回答"},
-]
+)
 
 # 非预测流程 - 无股票 (3步)
-CHAT_WITHOUT_STOCK_STEPS = [
+CHAT_WITHOUT_STOCK_STEPS = _freeze(
     {"id": "1", "name": "意图识别"},
     {"id": "2", "name": "信息检索"},
     {"id": "3", "name": "生成回答"},
-]
+)
 
 # 超出范围流程 (1步)
-OUT_OF_SCOPE_STEPS = [
+OUT_OF_SCOPE_STEPS = _freeze(
     {"id": "1", "name": "意图识别"},
-]
+)
+
+
+def _pending_details(steps: Tuple[StepDef, ...]) -> Tuple[StepDetail, ...]:
+    """由步骤定义构建初始（pending）步骤详情模板"""
+    return tuple(
+        StepDetail(id=s["id"], name=s["name"], status=StepStatus.PENDING, message="")
+        for s in steps
+    )
+
+
+# 各流程的步骤详情模板（导入时构建一次，使用时复制，不要直接修改）
+FORECAST_STEP_DETAILS = _pending_details(FORECAST_STEPS)
+CHAT_WITH_STOCK_STEP_DETAILS = _pending_details(CHAT_WITH_STOCK_STEPS)
+CHAT_WITHOUT_STOCK_STEP_DETAILS = _pending_details(CHAT_WITHOUT_STOCK_STEPS)
+OUT_OF_SCOPE_STEP_DETAILS = _pending_details(OUT_OF_SCOPE_STEPS)
+
+_FORECAST = (FORECAST_STEPS, FORECAST_STEP_DETAILS)
+_OUT_OF_SCOPE = (OUT_OF_SCOPE_STEPS, OUT_OF_SCOPE_STEP_DETAILS)
+
+# (is_in_scope, is_forecast, has_stock) -> (步骤定义, 步骤详情模板)
+_FLOWS: Dict[Tuple[bool, bool, bool], Tuple[Tuple[StepDef, ...], Tuple[StepDetail, ...]]] = {
+    (True, True, True): _FORECAST,
+    (True, True, False): _FORECAST,
+    (True, False, True): (CHAT_WITH_STOCK_STEPS, CHAT_WITH_STOCK_STEP_DETAILS),
+    (True, False, False): (CHAT_WITHOUT_STOCK_STEPS, CHAT_WITHOUT_STOCK_STEP_DETAILS),
+    (False, True, True): _OUT_OF_SCOPE,
+    (False, True, False): _OUT_OF_SCOPE,
+    (False, False, True): _OUT_OF_SCOPE,
+    (False, False, False): _OUT_OF_SCOPE,
+}
 
 
-def get_steps_for_intent(is_forecast: bool, is_in_scope: bool, has_stock: bool) -> List[Dict[str, str]]:
+def get_steps_for_intent(is_forecast: bool, is_in_scope: bool, has_stock: bool) -> Tuple[StepDef, ...]:
     """
     根据意图获取对应的步骤列表
 
@@ -53,16 +95,25 @@ def get_steps_for_intent(is_forecast: bool, is_in_scope: bool, has_stock: bool)
         has_stock: 是否涉及股票
 
     Returns:
-        步骤列表
+        步骤列表（只读）
+    """
+    return _FLOWS[bool(is_in_scope), bool(is_forecast), bool(has_stock)][0]
+
+
+def get_step_details(is_forecast: bool, is_in_scope: bool, has_stock: bool) -> List[StepDetail]:
+    """
+    根据意图获取初始步骤详情（模板副本，可直接修改）
+
+    Args:
+        is_forecast: 是否为预测任务
+        is_in_scope: 是否在服务范围内
+        has_stock: 是否涉及股票
+
+    Returns:
+        步骤详情列表
     """
-    if not is_in_scope:
-        return OUT_OF_SCOPE_STEPS
-    elif is_forecast:
-        return FORECAST_STEPS
-    elif has_stock:
-        return CHAT_WITH_STOCK_STEPS
-    else:
-        return CHAT_WITHOUT_STOCK_STEPS
+    templates = _FLOWS[bool(is_in_scope), bool(is_forecast), bool(has_stock)][1]
+    return [detail.model_copy() for detail in templates]
 
 
 def get_step_count(is_forecast: bool, is_in_scope: bool, has_stock: bool) -> int:
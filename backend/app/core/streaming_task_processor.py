@@ -7,14 +7,18 @@
 """
 
 import asyncio
+import hashlib
+import math
 import os  # 用于读取环境变量
-import json
 import traceback
+from itertools import chain
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from typing import Optional, List, Dict, Any, Callable, Awaitable
+import orjson
 import pandas as pd
 import numpy as np
+from pydantic import TypeAdapter
 
 from app.core.session import Session, Message
 from app.core.redis_client import get_redis
@@ -25,6 +29,7 @@ from app.schemas.session_schema import (
     StockMatchResult,  # 保留以兼容
     RegionMatchResult,
     SummarizedNewsItem,
+    RAGSource,
 )
 
 # Services
@@ -43,7 +48,10 @@ from app.agents import (
     SentimentAgent,
     NewsSummaryAgent,
     PredictionAnalysisAgent,
+    EventSummaryAgent,
 )
+from app.agents.llm_client import get_async_client, acall_with_retry
+from app.core.config import settings
 from app.services.trend_service import TrendService
 
 # Data clients
@@ -60,7 +68,7 @@ from app.core.workflows import (
     fetch_news_all,
     fetch_rag_reports,
     search_web,
-    search_news_around_date,
+    search_news_around_dates,
     fetch_domain_news,
     run_forecast,
     df_to_points,
@@ -87,6 +95,31 @@ class StreamingTaskProcessor:
     # False: 禁用惩罚机制，即使最佳模型不如 baseline 也使用最佳模型
     ENABLE_BASELINE_PENALTY = False
 
+    # 意图 JSON 流式到达这些字段后即可确定预测流程的数据获取参数，提前启动数据预取
+    PREFETCH_FIELDS = frozenset(
+        ("is_in_scope", "is_forecast", "region_mention", "region_name", "history_days")
+    )
+
+    # 变点新闻搜索的固定关键词（区域名之外）
+    CHANGE_POINT_SEARCH_KEYWORDS = ("供电", "天气", "工业")
+
+    # 异常区间事件摘要生成失败时的降级文案（参数为区间变化百分比）
+    ZONE_SUMMARY_FALLBACK = "供电量波动%+.1f%%"
+
+    # 推送列表数据时整体 dump（一次遍历），不逐个调用 model_dump
+    POINTS_ADAPTER = TypeAdapter(List[TimeSeriesPoint])
+    NEWS_ADAPTER = TypeAdapter(List[SummarizedNewsItem])
+    RAG_ADAPTER = TypeAdapter(List[RAGSource])
+
+    # 事件 Stream 保留条数：流式文本按增量下发，断点续传需从头重放全部增量
+    STREAM_MAXLEN = 10000
+    # 事件 Stream 过期时间（秒），每条 Stream 只在首个事件时设置一次
+    STREAM_TTL = 86400
+    # 结束事件：Stream 不再追加，释放 TTL 记录
+    TERMINAL_EVENT_TYPES = frozenset(("done", "error"))
+    # 事件序列化选项：支持 NumPy 标量/数组，非字符串键按字符串输出（与 json.dumps 一致）
+    EVENT_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
     def __init__(self):
         self.intent_agent = IntentAgent()
         self.rag_searcher = RAGSearcher()
@@ -97,7 +130,13 @@ class StreamingTaskProcessor:
         self.stock_matcher = get_stock_matcher()  # 保留以兼容
         self.region_matcher = get_region_matcher()
         self.prediction_analysis_agent = PredictionAnalysisAgent()
+        self.event_agent = EventSummaryAgent()
+        # 异常区域计算服务（无状态，复用同一实例）
+        self.trend_service = TrendService()
+        self.clustering_service = StockSignalService(lookback=60, max_zone_days=10)
         self.redis = get_redis()
+        # 已设置过 TTL 的 Stream key，避免每个事件都重复 EXPIRE
+        self._ttl_streams: set = set()
 
     async def execute_streaming(
         self,
@@ -123,6 +162,16 @@ class StreamingTaskProcessor:
         # 设置流式状态
         self._update_stream_status(message, "streaming")
 
+        # 意图识别阶段预取的预测数据任务（见 _start_forecast_prefetch）
+        prefetch: Dict[str, Any] = {}
+        intent_fields: Dict[str, Any] = {}
+
+        def on_intent_field(key: str, value: Any):
+            """意图 JSON 字段逐个到达：预测参数齐备时立即开始获取数据"""
+            intent_fields[key] = value
+            if not prefetch and self.PREFETCH_FIELDS <= intent_fields.keys():
+                prefetch.update(self._start_forecast_prefetch(intent_fields, session))
+
         try:
             conversation_history = session.get_conversation_history()
 
@@ -136,7 +185,7 @@ class StreamingTaskProcessor:
             message.update_step_detail(1, "running", "分析用户意图...")
 
             intent, thinking_content = await self._step_intent_streaming(
-                user_input, conversation_history, event_queue, message
+                user_input, conversation_history, event_queue, message, on_intent_field
             )
 
             if not intent:
@@ -176,14 +225,15 @@ class StreamingTaskProcessor:
                     intent.out_of_scope_reply
                     or "抱歉，我是金融时序分析助手，暂不支持此类问题。"
                 )
-                message.save_conclusion(reply)
-                message.update_step_detail(1, "completed", "超出服务范围")
-                message.mark_completed()
+                with message.batch():
+                    message.save_conclusion(reply)
+                    message.update_step_detail(1, "completed", "超出服务范围")
+                    message.mark_completed()
                 self._update_stream_status(message, "completed")
                 await self._emit_event(
                     event_queue,
                     message,
-                    {"type": "chat_chunk", "content": reply, "is_complete": True},
+                    {"type": "chat_chunk", "delta": reply, "is_complete": True},
                 )
                 await self._emit_done(event_queue, message)
                 return
@@ -221,15 +271,15 @@ class StreamingTaskProcessor:
                 )
                 message.update_step_detail(2, "running", f"验证区域: {query_name}")
 
-                region_match_result = await asyncio.to_thread(
-                    self.region_matcher.match, query_name
-                )
+                # 纯内存匹配（标准化结果已缓存），无需线程池
+                region_match_result = self.region_matcher.match(query_name)
 
                 if not region_match_result or not region_match_result.matched:
                     error_msg = f"未找到区域「{query_name}」，请检查区域名称是否正确。支持的区域: 北京、上海、广州、深圳、杭州、成都、武汉、西安、南京、天津"
-                    message.save_conclusion(error_msg)
-                    message.update_step_detail(2, "error", error_msg)
-                    message.mark_completed()
+                    with message.batch():
+                        message.save_conclusion(error_msg)
+                        message.update_step_detail(2, "error", error_msg)
+                        message.mark_completed()
                     self._update_stream_status(message, "error")
                     await self._emit_error(event_queue, message, error_msg)
                     return
@@ -266,11 +316,7 @@ class StreamingTaskProcessor:
                     else "无匹配",
                 )
             else:
-                resolved_keywords = ResolvedKeywords(
-                    search_keywords=intent.raw_search_keywords,
-                    rag_keywords=intent.raw_rag_keywords,
-                    domain_keywords=intent.raw_domain_keywords,
-                )
+                resolved_keywords = self.intent_agent.resolve_keywords(intent)
 
             # === 根据意图执行不同流程 ===
             if intent.is_forecast:
@@ -283,6 +329,7 @@ class StreamingTaskProcessor:
                     resolved_keywords,
                     conversation_history,
                     event_queue,
+                    prefetch,
                 )
             else:
                 await self._execute_chat_streaming(
@@ -301,9 +348,9 @@ class StreamingTaskProcessor:
             self._update_stream_status(message, "completed")
 
             # 添加助手回复到对话历史
-            data = message.get()
-            if data and data.conclusion:
-                session.add_conversation_message("assistant", data.conclusion)
+            conclusion = message.get_conclusion()
+            if conclusion:
+                session.add_conversation_message("assistant", conclusion)
 
             await self._emit_done(event_queue, message)
 
@@ -312,6 +359,11 @@ class StreamingTaskProcessor:
             message.mark_error(str(e))
             self._update_stream_status(message, "error")
             await self._emit_error(event_queue, message, str(e))
+        finally:
+            # 未被预测流程使用（超出范围/区域验证失败/参数不一致）的预取任务直接取消
+            for task in (prefetch.get("power"), prefetch.get("news")):
+                if task:
+                    task.cancel()  # 已完成的任务上为空操作
 
     # ========== 流式意图识别 ==========
 
@@ -321,58 +373,57 @@ class StreamingTaskProcessor:
         conversation_history: List[dict],
         event_queue: asyncio.Queue | None,
         message: Message,
+        on_field: Optional[Callable[[str, Any], None]] = None,
     ) -> tuple:
-        """流式意图识别"""
-        import queue as thread_queue
+        """
+        流式意图识别
 
-        chunk_queue: thread_queue.Queue = thread_queue.Queue()
+        on_field 在事件循环中按到达顺序接收意图 JSON 的顶层字段 (key, value)
+        """
+        loop = asyncio.get_running_loop()
+        chunk_queue: asyncio.Queue = asyncio.Queue()
 
         def on_chunk(chunk: str):
-            """同步回调 - 放入线程安全队列"""
-            chunk_queue.put(chunk)
+            """同步回调（工作线程）- 投递到事件循环的队列"""
+            loop.call_soon_threadsafe(chunk_queue.put_nowait, chunk)
+
+        def on_intent_field(key: str, value: Any):
+            """同步回调（工作线程）- 字段以元组形式投递到同一队列"""
+            loop.call_soon_threadsafe(chunk_queue.put_nowait, (key, value))
 
         def run_intent():
             """在线程中运行意图识别"""
-            result = self.intent_agent.recognize_intent_streaming(
-                user_input, conversation_history, on_chunk
-            )
-            chunk_queue.put(None)  # 结束标记
-            return result
+            try:
+                return self.intent_agent.recognize_intent_streaming(
+                    user_input,
+                    conversation_history,
+                    on_chunk,
+                    on_intent_field if on_field else None,
+                )
+            finally:
+                loop.call_soon_threadsafe(chunk_queue.put_nowait, None)  # 结束标记
 
         # 启动线程任务
-        loop = asyncio.get_running_loop()
         future = loop.run_in_executor(None, run_intent)
 
-        # 轮询队列，通过 _emit_event 发送事件
-        thinking_content = ""
+        # 逐个等待 chunk，只下发增量（客户端自行累积），避免每次重发全文
+        chunks: List[str] = []
         while True:
-            try:
-                chunk = chunk_queue.get_nowait()
-                if chunk is None:
-                    break
-                thinking_content += chunk
-                await self._emit_event(
-                    event_queue,
-                    message,
-                    {"type": "thinking", "content": thinking_content},
-                )
-            except thread_queue.Empty:
-                if future.done():
-                    # 处理剩余的 chunks
-                    while not chunk_queue.empty():
-                        chunk = chunk_queue.get_nowait()
-                        if chunk is not None:
-                            thinking_content += chunk
-                            await self._emit_event(
-                                event_queue,
-                                message,
-                                {"type": "thinking", "content": thinking_content},
-                            )
-                    break
-                await asyncio.sleep(0.01)
+            chunk = await chunk_queue.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, tuple):
+                on_field(*chunk)
+                continue
+            chunks.append(chunk)
+            await self._emit_event(
+                event_queue,
+                message,
+                {"type": "thinking", "delta": chunk},
+            )
 
         intent, final_thinking = await future
-        return intent, final_thinking or thinking_content
+        return intent, final_thinking or "".join(chunks)
 
     # ========== 预测流程（流式） ==========
 
@@ -386,8 +437,9 @@ class StreamingTaskProcessor:
         keywords: ResolvedKeywords,
         conversation_history: List[dict],
         event_queue: asyncio.Queue | None,
+        prefetch: Optional[Dict[str, Any]] = None,
     ):
-        """流式预测流程"""
+        """流式预测流程（prefetch 为意图识别阶段预取的数据任务，参数一致时复用）"""
         region_info = region_match.region_info if region_match else None
         region_code = region_info.region_code if region_info else ""
 
@@ -411,23 +463,19 @@ class StreamingTaskProcessor:
         )
         message.update_step_detail(3, "running", "获取历史数据和新闻...")
 
-        # 历史天数：默认365天，使用 Archive API 支持超过92天的历史数据
-        effective_history_days = min(intent.history_days, 730)  # 最多2年
-        effective_history_days = max(effective_history_days, 30)  # 至少30天
-
-        # 使用北京时区确保一致性
-        BEIJING_TZ = ZoneInfo("Asia/Shanghai")
-        now = datetime.now(BEIJING_TZ)
-        end_date = now.strftime("%Y%m%d")
-        start_date = (now - timedelta(days=effective_history_days)).strftime("%Y%m%d")
-
-        # 并行获取数据
-        power_data_task = asyncio.create_task(
-            fetch_power_data(region_name, start_date, end_date, effective_history_days)
-        )
-        news_task = asyncio.create_task(
-            fetch_news_all(region_name, intent.history_days)
+        effective_history_days, start_date, end_date = self._history_window(
+            intent.history_days
         )
+
+        # 并行获取数据：意图识别阶段已按相同参数预取时直接复用
+        prefetch_key = (region_name, start_date, end_date, intent.history_days)
+        if prefetch and prefetch["key"] == prefetch_key:
+            print(f"[Forecast] 复用意图识别阶段预取的数据: {region_name}")
+            power_data_task, news_task = prefetch["power"], prefetch["news"]
+        else:
+            power_data_task, news_task = self._create_fetch_tasks(
+                region_name, start_date, end_date, effective_history_days, intent.history_days
+            )
         # forecast 模式下强制启用 RAG（UI 始终显示研报来源区域）
         effective_enable_rag = intent.enable_rag or intent.is_forecast
         rag_available = await check_rag_availability() if effective_enable_rag else False
@@ -443,75 +491,75 @@ class StreamingTaskProcessor:
             else None
         )
 
-        # 优先获取供电需求数据和天气数据
+        # 新闻/RAG 与供电数据并发获取；离开本阶段（提前返回或异常）时取消仍未完成的任务
+        pending_tasks = [news_task]
+        if rag_task:
+            pending_tasks.append(rag_task)
         try:
-            power_result = await power_data_task
-        except Exception as e:
-            power_result = e
-
-        # 处理供电需求数据
-        df = None
-        weather_df = None
-        if isinstance(power_result, DataFetchError):
-            error_explanation = await asyncio.to_thread(
-                self.error_explainer.explain_data_fetch_error, power_result, user_input
-            )
-            message.save_conclusion(error_explanation)
-            message.update_step_detail(3, "error", "数据获取失败")
-            news_task.cancel()
-            if rag_task:
-                rag_task.cancel()
-            await self._emit_error(event_queue, message, error_explanation)
-            return
-        elif isinstance(power_result, Exception):
-            error_msg = f"获取数据时发生错误: {str(power_result)}"
-            message.save_conclusion(error_msg)
-            message.update_step_detail(3, "error", "数据获取失败")
-            news_task.cancel()
-            if rag_task:
-                rag_task.cancel()
-            await self._emit_error(event_queue, message, error_msg)
-            return
-        else:
-            # 处理返回的元组 (供电数据, 天气数据)
-            if isinstance(power_result, tuple):
-                df, weather_df = power_result
+            # 优先获取供电需求数据和天气数据
+            try:
+                power_result = await power_data_task
+            except Exception as e:
+                power_result = e
+
+            # 处理供电需求数据
+            df = None
+            weather_df = None
+            if isinstance(power_result, DataFetchError):
+                error_explanation = await asyncio.to_thread(
+                    self.error_explainer.explain_data_fetch_error,
+                    power_result,
+                    user_input,
+                )
+                with message.batch():
+                    message.save_conclusion(error_explanation)
+                    message.update_step_detail(3, "error", "数据获取失败")
+                await self._emit_error(event_queue, message, error_explanation)
+                return
+            elif isinstance(power_result, Exception):
+                error_msg = f"获取数据时发生错误: {str(power_result)}"
+                with message.batch():
+                    message.save_conclusion(error_msg)
+                    message.update_step_detail(3, "error", "数据获取失败")
+                await self._emit_error(event_queue, message, error_msg)
+                return
             else:
-                df = power_result
-                weather_df = None
+                # 处理返回的元组 (供电数据, 天气数据)
+                if isinstance(power_result, tuple):
+                    df, weather_df = power_result
+                else:
+                    df = power_result
+                    weather_df = None
 
-        if df is None or df.empty:
-            error_msg = (
-                f"无法获取 {region_name} 的历史供电需求数据，请检查区域名称是否正确。"
-            )
-            message.save_conclusion(error_msg)
-            message.update_step_detail(3, "error", "数据获取失败")
-            news_task.cancel()
-            if rag_task:
-                rag_task.cancel()
-            await self._emit_error(event_queue, message, error_msg)
-            return
-
-        # 立即保存并发送供电需求数据
-        original_points = df_to_points(df, is_prediction=False)
-        message.save_time_series_original(original_points)
+            if df is None or df.empty:
+                error_msg = (
+                    f"无法获取 {region_name} 的历史供电需求数据，请检查区域名称是否正确。"
+                )
+                with message.batch():
+                    message.save_conclusion(error_msg)
+                    message.update_step_detail(3, "error", "数据获取失败")
+                await self._emit_error(event_queue, message, error_msg)
+                return
 
-        await self._emit_event(
-            event_queue,
-            message,
-            {
-                "type": "data",
-                "data_type": "time_series_original",
-                "data": [p.model_dump() for p in original_points],
-            },
-        )
+            # 立即保存并发送供电需求数据
+            original_points = df_to_points(df, is_prediction=False)
+            message.save_time_series_original(original_points)
 
-        # 等待新闻和 RAG
-        pending_tasks = [news_task]
-        if rag_task:
-            pending_tasks.append(rag_task)
+            await self._emit_event(
+                event_queue,
+                message,
+                {
+                    "type": "data",
+                    "data_type": "time_series_original",
+                    "data": self.POINTS_ADAPTER.dump_python(original_points),
+                },
+            )
 
-        other_results = await asyncio.gather(*pending_tasks, return_exceptions=True)
+            # 等待新闻和 RAG
+            other_results = await asyncio.gather(*pending_tasks, return_exceptions=True)
+        finally:
+            for task in pending_tasks:
+                task.cancel()  # 已完成的任务上为空操作
 
         news_result = (
             other_results[0]
@@ -546,7 +594,7 @@ class StreamingTaskProcessor:
                 {
                     "type": "data",
                     "data_type": "news",
-                    "data": [n.model_dump() for n in summarized_news],
+                    "data": self.NEWS_ADAPTER.dump_python(summarized_news),
                 },
             )
 
@@ -561,7 +609,7 @@ class StreamingTaskProcessor:
                 {
                     "type": "data",
                     "data_type": "rag_sources",
-                    "data": [s.model_dump() for s in rag_sources],
+                    "data": self.RAG_ADAPTER.dump_python(rag_sources),
                 },
             )
         else:
@@ -572,36 +620,41 @@ class StreamingTaskProcessor:
             f"[AnomalyZones] Starting dynamic clustering for message {message.message_id}"
         )
         try:
-            import pandas as pd
-            from app.services.stock_signal_service import StockSignalService
-            from app.agents.event_summary_agent import EventSummaryAgent
-
             # 从 df 提取日期、收盘价、成交量
+            # 电力数据无成交量列时以常数 1 填充（NumPy 数组，不构造 Python 列表）
+            volume = (
+                df["volume"].to_numpy()
+                if "volume" in df.columns
+                else np.ones(len(df), dtype=np.int64)
+            )
             sig_df = pd.DataFrame(
                 {
-                    "date": df["ds"].dt.strftime("%Y-%m-%d"),
-                    "close": df["y"],
-                    "volume": df.get("volume", [1] * len(df)),
-                }
+                    "date": df["ds"].dt.strftime("%Y-%m-%d").to_numpy(),
+                    "close": df["y"].to_numpy(),
+                    "volume": volume,
+                },
+                copy=False,
             )
 
-            # === 改动：不依赖新闻接口 ===
-            # 构建新闻计数字典（强制为空，不使用 summarise_news）
-            # The user requested to remove news interface dependency for detection.
-            news_counts = {}
-            # for news_item in summarized_news or []: ... (Removed)
+            # 异常区域检测不依赖新闻接口：聚类不传 news_counts（新闻密度为 0）
 
             # === Redis 全局缓存检查 ===
+            # key 含序列内容指纹：数据更新（新的一天、不同历史窗口）后自动失效
             redis_client = get_redis()
-            cache_key = f"power_zones_v3:{region_code}"
+            fingerprint = hashlib.blake2b(
+                pd.util.hash_pandas_object(df[["ds", "y"]], index=False)
+                .to_numpy()
+                .tobytes(),
+                digest_size=8,
+            ).hexdigest()
+            cache_key = f"power_zones_v4:{region_code}:{fingerprint}"
             cached_zones_json = None
 
             try:
-                cached_zones_json = redis_client.get(cache_key)
+                # 同步客户端放到线程池执行，避免网络往返阻塞事件循环
+                cached_zones_json = await asyncio.to_thread(redis_client.get, cache_key)
                 if cached_zones_json:
-                    import json
-
-                    anomaly_zones = json.loads(cached_zones_json)
+                    anomaly_zones = orjson.loads(cached_zones_json)
                     print(
                         f"[AnomalyZones] ✓ Using Redis cached {len(anomaly_zones)} zones for {region_code}"
                     )
@@ -610,10 +663,26 @@ class StreamingTaskProcessor:
 
             # 如果缓存不存在，计算并保存
             if not cached_zones_json:
-                # 1. Trend Analysis (Regime Segmentation)
-                trend_service = TrendService()
-                # Use all methods but prefer PLR for visual zones
-                trend_results = trend_service.analyze_trend(sig_df, method="plr")
+                trend_service = self.trend_service
+
+                def run_trend():
+                    # Use all methods but prefer PLR for visual zones
+                    results = trend_service.analyze_trend(sig_df, method="plr")
+                    # Generate Semantic Broad Regimes (Merged PLR)
+                    # This creates broad "Event Flow" phases
+                    semantic = trend_service.process_semantic_regimes(
+                        results.get("plr", []), min_duration_days=7
+                    )
+                    return results, semantic
+
+                # 1. Trend Analysis (PLR + 语义合并) 与 2. Clustering 互不依赖，
+                # 放到线程池并发计算，避免数值计算阻塞事件循环
+                (trend_results, semantic_raw), clustering_zones = await asyncio.gather(
+                    asyncio.to_thread(run_trend),
+                    asyncio.to_thread(
+                        self.clustering_service.generate_zones, sig_df
+                    ),
+                )
 
                 # Debug Prints for Trend Algorithms
                 print("\n" + "=" * 50)
@@ -630,110 +699,70 @@ class StreamingTaskProcessor:
                 # Map PLR segments to anomaly_zones format expected by frontend
                 plr_segments = trend_results.get("plr", [])
 
-                # Combine all segments for frontend selection
-                all_segments = []
-                all_segments.extend(plr_segments)
-
-                # NEW: Generate Semantic Broad Regimes (Merged PLR)
-                # This creates broad "Event Flow" phases
-                semantic_raw = trend_service.process_semantic_regimes(
-                    plr_segments, min_duration_days=7
+                # Process raw segments (trend_segment)
+                change_pcts, sentiments, directions, seg_types = self._classify_segments(
+                    plr_segments, price_fallback="avgPrice", price_default=1.0
                 )
-
-                # Process semantic zones
-                semantic_zones = []
-                for seg in semantic_raw:
-                    # Determine sentiment/color
-                    sentiment = "neutral"
-                    direction = seg.get("direction", "").lower()
-                    seg_type = seg.get("type", "").lower()
-
-                    if direction == "up" or seg_type == "bull":
-                        sentiment = "positive"
-                    elif direction == "down" or seg_type == "bear":
-                        sentiment = "negative"
-
-                    # Calculate return
-                    try:
-                        start_p = float(seg.get("startPrice", 0))
-                        end_p = float(seg.get("endPrice", 0))
-                        change_pct = (end_p - start_p) / start_p if start_p else 0
-                    except:
-                        change_pct = 0
-
-                    semantic_zones.append(
-                        {
-                            "startDate": seg["startDate"],
-                            "endDate": seg["endDate"],
-                            "avg_return": change_pct,
-                            "avg_score": abs(change_pct) * 10,
-                            "zone_type": "semantic_regime",
-                            "method": "plr_merged",
-                            "sentiment": sentiment,
-                            "summary": f"{seg.get('direction', seg.get('type', 'Phase')).title()} ({change_pct * 100:.1f}%)",
-                            "description": f"Phase from {seg['startDate']} to {seg['endDate']}. Return: {change_pct * 100:.1f}%",
-                            "type": seg_type,
-                            "normalizedType": seg_type,
-                            "direction": direction,
-                            "events": [],  # Placeholder for events
-                        }
+                trend_zones = (
+                    {
+                        "startDate": seg["startDate"],
+                        "endDate": seg["endDate"],
+                        "avg_return": change_pct,
+                        "avg_score": abs(change_pct) * 10,
+                        "zone_type": "trend_segment",
+                        "method": seg.get("method", "plr"),
+                        "sentiment": sentiment,
+                        "summary": f"{seg.get('direction', seg.get('type', 'Trend')).title()} ({change_pct * 100:.1f}%)",
+                        "description": f"Trend detected from {seg['startDate']} to {seg['endDate']}. Return: {change_pct * 100:.1f}%",
+                        "type": seg_type,
+                        "normalizedType": seg_type,
+                        "direction": direction,
+                    }
+                    for seg, change_pct, sentiment, direction, seg_type in zip(
+                        plr_segments, change_pcts, sentiments, directions, seg_types
                     )
+                )
 
-                # Process raw segments (anomaly_zones)
-                anomaly_zones = []
-                for seg in all_segments:
-                    # Determine sentiment/color
-                    sentiment = "neutral"
-                    direction = seg.get("direction", "").lower()
-                    seg_type = seg.get("type", "").lower()
-
-                    if direction == "up" or seg_type == "bull":
-                        sentiment = "positive"
-                    elif direction == "down" or seg_type == "bear":
-                        sentiment = "negative"
-
-                    # Calculate simple impact/score
-                    start_p = seg.get("startPrice", seg.get("avgPrice", 1.0))
-                    end_p = seg.get("endPrice", seg.get("avgPrice", 1.0))
-                    change_pct = (end_p - start_p) / start_p if start_p else 0
-
-                    anomaly_zones.append(
-                        {
-                            "startDate": seg["startDate"],
-                            "endDate": seg["endDate"],
-                            "avg_return": change_pct,
-                            "avg_score": abs(change_pct) * 10,
-                            "zone_type": "trend_segment",
-                            "method": seg.get("method", "plr"),
-                            "sentiment": sentiment,
-                            "summary": f"{seg.get('direction', seg.get('type', 'Trend')).title()} ({change_pct * 100:.1f}%)",
-                            "description": f"Trend detected from {seg['startDate']} to {seg['endDate']}. Return: {change_pct * 100:.1f}%",
-                            "type": seg_type,
-                            "normalizedType": seg_type,
-                            "direction": direction,
-                        }
+                # Process semantic zones
+                (
+                    sem_change_pcts,
+                    sem_sentiments,
+                    sem_directions,
+                    sem_seg_types,
+                ) = self._classify_segments(
+                    semantic_raw, price_fallback=None, price_default=0.0
+                )
+                semantic_zones = (
+                    {
+                        "startDate": seg["startDate"],
+                        "endDate": seg["endDate"],
+                        "avg_return": change_pct,
+                        "avg_score": abs(change_pct) * 10,
+                        "zone_type": "semantic_regime",
+                        "method": "plr_merged",
+                        "sentiment": sentiment,
+                        "summary": f"{seg.get('direction', seg.get('type', 'Phase')).title()} ({change_pct * 100:.1f}%)",
+                        "description": f"Phase from {seg['startDate']} to {seg['endDate']}. Return: {change_pct * 100:.1f}%",
+                        "type": seg_type,
+                        "normalizedType": seg_type,
+                        "direction": direction,
+                        "events": [],  # Placeholder for events
+                    }
+                    for seg, change_pct, sentiment, direction, seg_type in zip(
+                        semantic_raw,
+                        sem_change_pcts,
+                        sem_sentiments,
+                        sem_directions,
+                        sem_seg_types,
                     )
-
-                # Merge semantic zones into anomaly_zones
-                anomaly_zones.extend(semantic_zones)
-
-                # Also keep StockSignalService for consistency if needed, but for now we replace the main logic
-                # or we can append significant points differently.
-                # For this task, we focus on TrendService, but let's keep the existing generated zones logic as specific method 'clustering'?
-                # Actually, the user wants to REPLACE/MIGRATE features.
-                # Let's keep the old one as "clustering" method if desired, but here we just use TrendService results.
-                # However, to avoid losing functionality, we might want to run ClusteringService too?
-                # The Plan says "Combine these with existing StockSignalService results or structure them".
-
-                # Let's run StockSignalService as well for 'clustering' method
-                clustering_service = StockSignalService(lookback=60, max_zone_days=10)
-                clustering_zones = clustering_service.generate_zones(
-                    sig_df, news_counts
                 )
+
+                # StockSignalService results (computed above) as 'clustering' method
                 for z in clustering_zones:
                     z["method"] = "clustering"
 
-                anomaly_zones.extend(clustering_zones)
+                # 顺序：趋势段 -> 语义阶段 -> 聚类区间，一次性构建最终列表
+                anomaly_zones = list(chain(trend_zones, semantic_zones, clustering_zones))
 
                 print(
                     f"[AnomalyZones] ⚙️ Generated {len(anomaly_zones)} zones (PLR + Semantic + Clustering)"
@@ -742,65 +771,58 @@ class StreamingTaskProcessor:
             # 为每个区域生成事件摘要（即使是从缓存读取的也可以重新生成，或者仅当未缓存时生成）
             if anomaly_zones and not cached_zones_json:
                 try:
-                    event_agent = EventSummaryAgent()
-
-                    # 并发处理每个Zone的搜索总结 (Search REMOVED as per user request)
-                    async def process_zone(zone):
-                        start = zone["startDate"]
-                        end = zone["endDate"]
-
-                        zone_dates = []
-                        curr = datetime.strptime(start, "%Y-%m-%d")
-                        while curr <= datetime.strptime(end, "%Y-%m-%d"):
-                            zone_dates.append(curr.strftime("%Y-%m-%d"))
-                            curr += timedelta(days=1)
+                    # 并发处理每个Zone的总结 (Search REMOVED as per user request)
+                    def zone_request(zone):
+                        zone_dates = (
+                            pd.date_range(zone["startDate"], zone["endDate"], freq="D")
+                            .strftime("%Y-%m-%d")
+                            .tolist()
+                        )
 
                         # 改动：不再调用 Tavily 搜索新闻供摘要使用
+                        return {
+                            "zone_dates": zone_dates,
+                            "price_change": zone.get("avg_return", 0) * 100,
+                            "news_items": [],  # EMPTY
+                            "region_name": region_name,
+                        }
 
-                        # 生成摘要
-                        event_summary = event_agent.summarize_zone(
-                            zone_dates=zone_dates,
-                            price_change=zone.get("avg_return", 0) * 100,
-                            news_items=[],  # EMPTY
-                            region_name=region_name,
-                        )
+                    # 并发执行（AsyncOpenAI + Semaphore 限流，不阻塞事件循环）
+                    summaries = await self.event_agent.summarize_zones(
+                        [zone_request(z) for z in anomaly_zones]
+                    )
 
+                    for zone, event_summary in zip(anomaly_zones, summaries):
                         zone["event_summary"] = event_summary
                         # 改动：不在 anomaly zones 中保存 url，因为不获取新闻了
                         zone["news_links"] = []
-
                         print(
-                            f"[AnomalyZones] Zone {start}-{end} (Internal Analysis): {event_summary}"
+                            f"[AnomalyZones] Zone {zone['startDate']}-{zone['endDate']} (Internal Analysis): {event_summary}"
                         )
-                        return zone
-
-                    # 并发执行
-                    tasks = [process_zone(z) for z in anomaly_zones]
-                    anomaly_zones = await asyncio.gather(*tasks)
 
                 except Exception as e:
-                    import traceback
-
                     print(f"[AnomalyZones] Error generating event summaries: {e}")
                     print(traceback.format_exc())
-                    # Fallback
+                    # Fallback：仅为缺少摘要的区间生成降级文案
+                    fallback = self.ZONE_SUMMARY_FALLBACK
                     for zone in anomaly_zones:
                         if "event_summary" not in zone:
-                            zone["event_summary"] = (
-                                f"供电量波动{zone.get('avg_return', 0) * 100:+.1f}%"
+                            zone["event_summary"] = fallback % (
+                                zone.get("avg_return", 0) * 100
                             )
 
             # ⚠️ 不再过滤无新闻的 zones，保留所有检测到的异常区间
             anomaly_zones_with_news = anomaly_zones
             print(f"[AnomalyZones] Final zones: {len(anomaly_zones)}")
 
-            # === 保存到Redis全局缓存 ===
-            if anomaly_zones:
+            # === 保存到Redis全局缓存（命中缓存时无需重写）===
+            if anomaly_zones and not cached_zones_json:
                 try:
-                    import json
-
-                    zones_json = json.dumps(anomaly_zones, ensure_ascii=False)
-                    redis_client.setex(
+                    zones_json = orjson.dumps(
+                        anomaly_zones, option=orjson.OPT_SERIALIZE_NUMPY
+                    )
+                    await asyncio.to_thread(
+                        redis_client.setex,
                         cache_key,
                         12 * 60 * 60,  # 12小时TTL
                         zones_json,
@@ -813,7 +835,9 @@ class StreamingTaskProcessor:
 
             # 保存并发送异常区域数据
             if anomaly_zones:
-                message.save_anomaly_zones(anomaly_zones, region_code)
+                await asyncio.to_thread(
+                    message.save_anomaly_zones, anomaly_zones, region_code
+                )
 
                 await self._emit_event(
                     event_queue,
@@ -827,8 +851,6 @@ class StreamingTaskProcessor:
                 print(f"[AnomalyZones] Successfully saved and emitted")
 
         except Exception as e:
-            import traceback
-
             print(f"[AnomalyZones] Error: {e}")
             print(f"[AnomalyZones] Traceback:\n{traceback.format_exc()}")
 
@@ -853,21 +875,25 @@ class StreamingTaskProcessor:
         )
         message.update_step_detail(4, "running", "分析时序特征和多因素影响力...")
 
-        # 时序特征分析
-        features = await asyncio.to_thread(TimeSeriesAnalyzer.analyze_features, df)
-
-        # 多因素影响力分析（替代情绪分析）
+        # 时序特征分析与多因素影响力分析（替代情绪分析）输入互不依赖，并发执行
         print(
             f"[Influence] 准备分析影响因子，供电数据: {len(df) if df is not None else 0} 条，天气数据: {len(weather_df) if weather_df is not None else 0} 条"
         )
-        influence_result = await self._step_influence_analysis(
-            df,
-            weather_df,
-            event_queue,
-            message,
-            region_match.region_info if region_match else None,
+        features, influence_result = await asyncio.gather(
+            asyncio.to_thread(TimeSeriesAnalyzer.analyze_features, df),
+            self._step_influence_analysis(
+                df,
+                weather_df,
+                event_queue,
+                message,
+                region_match.region_info if region_match else None,
+            ),
+            return_exceptions=True,
         )
-        # print(f"[Influence] 影响因子分析完成，结果: {influence_result}")
+        # 两者都结束后再抛出错误，避免失败时另一项仍在后台写入/推送
+        for result in (features, influence_result):
+            if isinstance(result, BaseException):
+                raise result
 
         # 保存影响因子数据（兼容原有emotion字段）
         message.save_emotion(
@@ -969,13 +995,17 @@ class StreamingTaskProcessor:
         )
         message.save_time_series_full(full_points, prediction_start)
 
+        # 一次 dump 为 dict 列表，推送、突变点检测与报告数据共用，不再逐点重建
+        full_records = self.POINTS_ADAPTER.dump_python(full_points)
+        forecast_records = full_records[len(original_points):]
+
         await self._emit_event(
             event_queue,
             message,
             {
                 "type": "data",
                 "data_type": "time_series_full",
-                "data": [p.model_dump() for p in full_points],
+                "data": full_records,
                 "prediction_start_day": prediction_start,
             },
         )
@@ -992,51 +1022,48 @@ class StreamingTaskProcessor:
             message,
             {"type": "step_complete", "step": 5, "data": {"metrics": metrics_dict}},
         )
-        message.update_step_detail(5, "completed", f"{display_model_name} 预测完成 ({metrics_info})")
+        with message.batch():
+            message.update_step_detail(5, "completed", f"{display_model_name} 预测完成 ({metrics_info})")
 
-        # 保存模型名称到 MessageData（使用最终选定的模型）
-        message.save_model_name(final_model)
+            # 保存模型名称到 MessageData（使用最终选定的模型）
+            message.save_model_name(final_model)
 
         # === Change Point Detection & Analysis (Separated History / Forecast) ===
         try:
             # 1. 准备数据：分离历史和预测
-            hist_points = [p for p in full_points if not p.is_prediction]
-            pred_points = [p for p in full_points if p.is_prediction]
-
-            # 如果预测点不足，可能是纯历史分析或预测未开始
-            if not pred_points and len(hist_points) > 0:
-                # 假设最后一部分是其实是未来预测（针对某些特殊case），或者干脆不检测未来
-                pass
-
-            import pandas as pd
+            # 单次遍历按 is_prediction 划分，同时收集数值与日期列
+            hist_values, hist_dates, pred_values, pred_dates = [], [], [], []
+            for record in full_records:
+                if record["is_prediction"]:
+                    pred_values.append(record["value"])
+                    pred_dates.append(record["date"])
+                else:
+                    hist_values.append(record["value"])
+                    hist_dates.append(record["date"])
+            hist_points = (np.array(hist_values, dtype=np.float64), hist_dates)
+            pred_points = (np.array(pred_values, dtype=np.float64), pred_dates)
 
-            # 定义检测函数，方便复用
+            # 定义检测函数，方便复用（直接传数组，不构造 DataFrame）
             def run_detection(points, label, threshold):
-                if not points:
+                point_values, point_dates = points
+                if not len(point_values):
                     return []
-                df = pd.DataFrame(
-                    [
-                        {"date": p.date, "y": p.value, "is_prediction": p.is_prediction}
-                        for p in points
-                    ]
-                )
                 print(
-                    f"[ChangePoints] Starting detection for {region_name} on {label} data ({len(df)} rows)"
+                    f"[ChangePoints] Starting detection for {region_name} on {label} data ({len(point_values)} rows)"
                 )
-                # 必须重新索引，否则索引会不连续影响检测逻辑（如果detect内部依赖索引连续性）
-                df = df.reset_index(drop=True)
-
                 srv = StockSignalService()
-                return srv.detect_change_points(df, threshold=threshold)
+                return srv.detect_change_points_arr(
+                    point_values, point_dates, threshold=threshold
+                )
 
-            # 分别检测
-            # 历史数据通常噪声较大，可以使用稍高阈值；或者保持一致
-            hist_cps = run_detection(hist_points, "HISTORY", threshold=1.3)
+            # 历史与预测分别检测，两者互不依赖，放到线程池并行执行（不阻塞事件循环）
+            # 历史数据通常噪声较大，使用稍高阈值；预测数据较平滑，阈值低一点以敏感捕捉
+            hist_cps, pred_cps = await asyncio.gather(
+                asyncio.to_thread(run_detection, hist_points, "HISTORY", 1.3),
+                asyncio.to_thread(run_detection, pred_points, "FORECAST", 1.2),
+            )
             for cp in hist_cps:
                 cp["is_prediction"] = False
-
-            # 预测数据通常较平滑，阈值可低一点以敏感捕捉
-            pred_cps = run_detection(pred_points, "FORECAST", threshold=1.2)
             for cp in pred_cps:
                 cp["is_prediction"] = True
 
@@ -1052,77 +1079,49 @@ class StreamingTaskProcessor:
                 weather_lookup = {}
                 if weather_df is not None and not weather_df.empty:
                     try:
-                        weather_df["date_str"] = (
-                            weather_df["date"].astype(str).str.slice(0, 10)
+                        # 整列拼接字符串，不逐行构造 Series；缺列/缺值显示 N/A
+                        def weather_text(column):
+                            if column not in weather_df.columns:
+                                return pd.Series("N/A", index=weather_df.index)
+                            values = weather_df[column]
+                            return values.astype(str).mask(values.isna(), "N/A")
+
+                        date_str = weather_df["date"].astype(str).str.slice(0, 10)
+                        text = (
+                            weather_text("temperature")
+                            + "°C, 湿度"
+                            + weather_text("humidity")
+                            + "%"
                         )
-                        for _, row in weather_df.iterrows():
-                            temp = f"{row.get('temperature', 'N/A')}°C"
-                            hum = f"湿度{row.get('humidity', 'N/A')}%"
-                            weather_lookup[row["date_str"]] = f"{temp}, {hum}"
+                        weather_lookup = dict(zip(date_str.to_numpy(), text.to_numpy()))
                     except Exception as e:
                         print(f"[ChangePoints] Weather lookup build error: {e}")
 
-                # 异步搜索工具函数
-                async def enrich_point(cp):
-                    cp_date = cp.get("date")
-                    is_pred = cp.get("is_prediction", False)
-
-                    # 2. 上下文构建
+                # 突变点上下文（天气 + 历史/预测标记）
+                def build_weather_info(cp):
                     context_info = []
-                    w_info = weather_lookup.get(cp_date)
+                    w_info = weather_lookup.get(cp.get("date"))
                     if w_info:
                         context_info.append(f"天气: {w_info}")
 
-                    if is_pred:
+                    if cp.get("is_prediction", False):
                         context_info.append("(未来预测)")
                     else:
                         context_info.append("(历史数据)")
 
-                    weather_info_str = " ".join(context_info)
-
-                    # 3. 并行执行：LLM分析 + Tavily搜索
+                    return " ".join(context_info)
 
-                    # LLM 分析任务
-                    llm_task = asyncio.to_thread(
-                        self.prediction_analysis_agent.analyze_change_point,
-                        cp,
-                        region_name,
-                        weather_info_str,
-                    )
-
-                    # Tavily 搜索任务 (仅对历史点或近期未来点更有意义)
-                    search_task = None
-                    if not is_pred:  # 历史数据才搜索新闻
-                        keywords = [region_name, "供电", "天气", "工业"]
-                        # 使用特定日期的搜索
-                        search_task = search_news_around_date(
-                            keywords, target_date=cp_date, days=3, max_results=3
-                        )
-
-                    # 执行任务
-                    analysis_res, search_res = await asyncio.gather(
-                        llm_task,
-                        search_task if search_task else asyncio.sleep(0),
-                        return_exceptions=True,
-                    )
-
-                    # 处理结果
-                    cp["reason"] = (
-                        analysis_res if isinstance(analysis_res, str) else "分析失败"
-                    )
-
-                    # 处理搜索结果
-                    news_links = []
-                    if isinstance(search_res, list):
-                        for item in search_res:
-                            news_links.append(
-                                {
-                                    "title": item.get("title", f"相关新闻 ({cp_date})"),
-                                    "url": item.get("url", "#"),
-                                    "source": extract_domain(item.get("url", "")),
-                                }
-                            )
-                    cp["news_links"] = news_links
+                # 附加新闻与天气链接（原地写入突变点）
+                def attach_links(cp, search_res):
+                    cp_date = cp.get("date")
+                    cp["news_links"] = [
+                        {
+                            "title": item.get("title", f"相关新闻 ({cp_date})"),
+                            "url": item.get("url", "#"),
+                            "source": extract_domain(item.get("url", "")),
+                        }
+                        for item in search_res
+                    ]
 
                     # 构建天气链接 (通用搜索链接)
                     weather_query = f"{region_name} {cp_date} 天气"
@@ -1130,22 +1129,41 @@ class StreamingTaskProcessor:
                         f"https://www.bing.com/search?q={weather_query}"
                     )
 
-                    return cp
-
-                    cp["is_prediction"] = is_pred
-
-                    return cp
-
-                # 并发处理所有点
-                # 限制并发数以防触发API速率限制
-                limit = asyncio.Semaphore(5)
-
-                async def sem_task(cp):
-                    async with limit:
-                        return await enrich_point(cp)
-
-                tasks = [sem_task(cp) for cp in all_change_points]
-                analyzed_points = await asyncio.gather(*tasks)
+                async def enrich_all():
+                    # Tavily 搜索仅对历史点有意义；日期窗口重叠的突变点合并为一次搜索
+                    hist_dates = [
+                        cp.get("date")
+                        for cp in all_change_points
+                        if not cp.get("is_prediction", False)
+                    ]
+                    news_by_date = {}
+                    if hist_dates:
+                        keywords = [region_name, *self.CHANGE_POINT_SEARCH_KEYWORDS]
+                        try:
+                            news_by_date = await search_news_around_dates(
+                                keywords, hist_dates, days=3, max_results=3
+                            )
+                        except Exception as e:
+                            print(f"[ChangePoints] News search error: {e}")
+
+                    for cp in all_change_points:
+                        if cp.get("is_prediction", False):
+                            attach_links(cp, [])
+                        else:
+                            attach_links(cp, news_by_date.get(cp.get("date"), []))
+                    return all_change_points
+
+                # LLM 合并批量分析与新闻搜索同时进行（LLM 并发由 Agent 自行限流）
+                reasons, analyzed_points = await asyncio.gather(
+                    self.prediction_analysis_agent.analyze_change_points_batched(
+                        all_change_points,
+                        region_name,
+                        [build_weather_info(cp) for cp in all_change_points],
+                    ),
+                    enrich_all(),
+                )
+                for cp, reason in zip(analyzed_points, reasons):
+                    cp["reason"] = reason
 
                 # Emit event
                 await self._emit_event(
@@ -1161,8 +1179,6 @@ class StreamingTaskProcessor:
 
         except Exception as e:
             print(f"❌ Change Point Analysis Error: {e}")
-            import traceback
-
             print(traceback.format_exc())
 
         # === Step 6: 报告生成（流式） ===
@@ -1175,9 +1191,7 @@ class StreamingTaskProcessor:
 
         # 将 ForecastResult 转换为字典格式供报告生成使用
         forecast_dict = {
-            "forecast": [
-                {"date": p.date, "value": p.value} for p in forecast_result.points
-            ],
+            "forecast": forecast_records,
             "metrics": metrics_dict,
             "model": forecast_result.model,
         }
@@ -1227,7 +1241,8 @@ class StreamingTaskProcessor:
         tasks = []
         task_names = []
 
-        if intent.enable_rag:
+        # 无 RAG 关键词时不检索，也不做可用性检查（省一次健康检查往返）
+        if intent.enable_rag and keywords.rag_keywords:
             rag_available = await check_rag_availability()
             if rag_available:
                 tasks.append(
@@ -1323,7 +1338,7 @@ class StreamingTaskProcessor:
                 {
                     "type": "data",
                     "data_type": "rag_sources",
-                    "data": [s.model_dump() for s in results["rag"]],
+                    "data": self.RAG_ADAPTER.dump_python(results["rag"]),
                 },
             )
 
@@ -1346,49 +1361,23 @@ class StreamingTaskProcessor:
         event_queue: asyncio.Queue | None,
         message: Message,
     ) -> str:
-        """流式报告生成"""
-        loop = asyncio.get_running_loop()
-        content_queue: asyncio.Queue = asyncio.Queue()
-
-        def run_in_thread():
-            def on_chunk(chunk: str):
-                loop.call_soon_threadsafe(content_queue.put_nowait, ("chunk", chunk))
-
-            content = self.report_agent.generate_streaming(
-                user_input,
-                features,
-                forecast_result,
-                emotion_result,
-                conversation_history,
-                on_chunk,
+        """流式报告生成（异步客户端直接流式，首 token 即下发）"""
+        chunks: List[str] = []
+        async for delta in self.report_agent.agenerate_stream(
+            user_input,
+            features,
+            forecast_result,
+            emotion_result,
+            conversation_history,
+        ):
+            chunks.append(delta)
+            await self._emit_event(
+                event_queue,
+                message,
+                {"type": "report_chunk", "delta": delta},
             )
-            loop.call_soon_threadsafe(content_queue.put_nowait, ("done", content))
 
-        future = loop.run_in_executor(None, run_in_thread)
-
-        full_content = ""
-        while True:
-            try:
-                event_type, data = await asyncio.wait_for(
-                    content_queue.get(), timeout=120.0
-                )
-
-                if event_type == "chunk":
-                    full_content += data
-                    await self._emit_event(
-                        event_queue,
-                        message,
-                        {"type": "report_chunk", "content": full_content},
-                    )
-                elif event_type == "done":
-                    full_content = data
-                    break
-            except asyncio.TimeoutError:
-                break
-
-        await future
-
-        return full_content
+        return "".join(chunks)
 
     # ========== 多因素影响力分析 ==========
 
@@ -1439,11 +1428,15 @@ class StreamingTaskProcessor:
         if region_info and region_info.region_name:
             industry_structure_client = get_industry_structure_client()
             try:
-                # 调用LLM获取城市工业结构数据（非async函数，使用线程执行）
-                structure_data = await asyncio.to_thread(
-                    industry_structure_client.fetch_industry_structure_data,
-                    region_info.region_name,
+                # 进程内缓存命中时直接使用；否则查 Redis / 调用 LLM（同步，使用线程执行）
+                structure_data = industry_structure_client.get_cached(
+                    region_info.region_name
                 )
+                if structure_data is None:
+                    structure_data = await asyncio.to_thread(
+                        industry_structure_client.fetch_industry_structure_data,
+                        region_info.region_name,
+                    )
                 industry_structure_ratio = structure_data.get(
                     "second_industry_ratio", 0.3
                 )
@@ -1469,17 +1462,14 @@ class StreamingTaskProcessor:
             valid_scores = [
                 factor["influence_score"]
                 for factor in influence_result["ranking"]
-                if not (
-                    np.isnan(factor.get("influence_score", np.nan))
-                    or np.isinf(factor.get("influence_score", np.nan))
-                )
+                if math.isfinite(factor.get("influence_score", math.nan))
             ]
             overall_score = np.mean(valid_scores) if valid_scores else 0.0
         else:
             overall_score = 0.0
 
         # 确保overall_score不是NaN
-        if np.isnan(overall_score) or np.isinf(overall_score):
+        if not math.isfinite(overall_score):
             overall_score = 0.0
 
         influence_result["overall_score"] = round(float(overall_score), 4)
@@ -1614,44 +1604,22 @@ class StreamingTaskProcessor:
         event_queue: asyncio.Queue | None,
         message: Message,
     ) -> str:
-        """流式聊天生成"""
-        loop = asyncio.get_running_loop()
-        content_queue: asyncio.Queue = asyncio.Queue()
+        """流式聊天生成（异步客户端直接流式，不经线程池与中转队列）"""
+        stream = await self.intent_agent.agenerate_chat_response(
+            user_input, conversation_history, context, stream=True
+        )
 
-        def run_in_thread():
-            gen = self.intent_agent.generate_chat_response(
-                user_input, conversation_history, context, stream=True
+        # 只下发增量文本，完整内容在本地拼接一次（前端按 delta 累加）
+        chunks: List[str] = []
+        async for delta in stream:
+            chunks.append(delta)
+            await self._emit_event(
+                event_queue,
+                message,
+                {"type": "chat_chunk", "delta": delta},
             )
-            full = ""
-            for chunk in gen:
-                full += chunk
-                loop.call_soon_threadsafe(content_queue.put_nowait, ("chunk", full))
-            loop.call_soon_threadsafe(content_queue.put_nowait, ("done", full))
 
-        future = loop.run_in_executor(None, run_in_thread)
-
-        full_content = ""
-        while True:
-            try:
-                event_type, data = await asyncio.wait_for(
-                    content_queue.get(), timeout=120.0
-                )
-
-                if event_type == "chunk":
-                    full_content = data
-                    await self._emit_event(
-                        event_queue,
-                        message,
-                        {"type": "chat_chunk", "content": full_content},
-                    )
-                elif event_type == "done":
-                    full_content = data
-                    break
-            except asyncio.TimeoutError:
-                break
-
-        await future
-        return full_content
+        return "".join(chunks)
 
     # ========== 辅助方法 ==========
 
@@ -1678,14 +1646,10 @@ class StreamingTaskProcessor:
 ..."""
 
         try:
-            from openai import OpenAI
-            from app.core.config import settings
-
-            client = OpenAI(
-                api_key=settings.DEEPSEEK_API_KEY,
-                base_url="https://api.deepseek.com",
+            client = get_async_client(
+                settings.DEEPSEEK_API_KEY, "https://api.deepseek.com"
             )
-            response = await asyncio.to_thread(
+            response = await acall_with_retry(
                 lambda: client.chat.completions.create(
                     model="deepseek-chat",
                     messages=[
@@ -1697,7 +1661,8 @@ class StreamingTaskProcessor:
                     ],
                     temperature=0.2,
                     max_tokens=1000,
-                )
+                ),
+                "RAG摘要",
             )
 
             result = response.choices[0].message.content.strip()
@@ -1720,15 +1685,94 @@ class StreamingTaskProcessor:
 
         return rag_sources
 
+    @staticmethod
+    def _history_window(history_days: int) -> tuple:
+        """
+        历史数据窗口：(有效天数, 开始日期, 结束日期)，日期为 YYYYMMDD
+
+        默认365天，使用 Archive API 支持超过92天的历史数据；最多2年，至少30天
+        """
+        effective_history_days = max(min(history_days, 730), 30)
+
+        # 使用北京时区确保一致性
+        now = datetime.now(ZoneInfo("Asia/Shanghai"))
+        end_date = now.strftime("%Y%m%d")
+        start_date = (now - timedelta(days=effective_history_days)).strftime("%Y%m%d")
+        return effective_history_days, start_date, end_date
+
+    @staticmethod
+    def _create_fetch_tasks(
+        region_name: str,
+        start_date: str,
+        end_date: str,
+        effective_history_days: int,
+        history_days: int,
+    ) -> tuple:
+        """并发启动供电数据与新闻获取，返回 (power_task, news_task)"""
+        power_task = asyncio.create_task(
+            fetch_power_data(region_name, start_date, end_date, effective_history_days)
+        )
+        news_task = asyncio.create_task(fetch_news_all(region_name, history_days))
+        return power_task, news_task
+
+    def _start_forecast_prefetch(
+        self, fields: Dict[str, Any], session: Session
+    ) -> Dict[str, Any]:
+        """
+        意图 JSON 流式到达预测参数（PREFETCH_FIELDS）时提前启动数据获取，
+        与 reason / out_of_scope_reply 等剩余字段的生成重叠
+
+        区域按第 2 步相同规则确定；区域无法匹配或参数不合法时不预取。
+
+        Returns:
+            {"key": 参数键, "power": 供电数据任务, "news": 新闻任务}，不预取时为空字典
+        """
+        history_days = fields["history_days"]
+        if (
+            fields["is_in_scope"] is not True
+            or fields["is_forecast"] is not True
+            or not isinstance(history_days, int)
+            or isinstance(history_days, bool)
+        ):
+            return {}
+
+        region_mention = fields["region_mention"]
+        if region_mention:
+            region_match = self.region_matcher.match(fields["region_name"] or region_mention)
+            if not region_match or not region_match.matched:
+                return {}  # 第 2 步会报区域错误，无需预取
+            region_info = region_match.region_info
+        else:
+            region_info = None
+        region_name = (
+            region_info.region_name
+            if region_info
+            else self._find_last_region(session) or "北京"
+        )
+
+        effective_history_days, start_date, end_date = self._history_window(history_days)
+        power_task, news_task = self._create_fetch_tasks(
+            region_name, start_date, end_date, effective_history_days, history_days
+        )
+        # 未被使用时任务会被取消；提前失败的结果在此取走，避免“未获取的异常”告警
+        for task in (power_task, news_task):
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        print(f"[Forecast] 意图识别未结束，预取数据: {region_name}, {history_days}天")
+        return {
+            "key": (region_name, start_date, end_date, history_days),
+            "power": power_task,
+            "news": news_task,
+        }
+
     def _find_last_region(self, session: Session) -> Optional[str]:
         """从历史消息中查找上次使用的城市名称"""
         try:
-            messages = session.get_all_messages()
+            messages = session.get_all_messages() or []
             # 从最新到最旧遍历
             for msg in reversed(messages):
-                msg_data = msg.get()
-                if msg_data and msg_data.unified_intent:
-                    region = msg_data.unified_intent.region_name
+                intent = msg.get_unified_intent()
+                if intent:
+                    region = intent.region_name
                     if region:
                         return region
         except Exception as e:
@@ -1736,59 +1780,102 @@ class StreamingTaskProcessor:
         return None
 
     def _update_stream_status(self, message: Message, status: str):
-        """更新流式状态"""
-        data = message.get()
-        if data:
-            data.stream_status = status
-            message._save(data)
-
-    def _clean_nan_values(self, obj):
-        """递归清理字典和列表中的NaN值，转换为None"""
-        if isinstance(obj, dict):
-            return {k: self._clean_nan_values(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._clean_nan_values(item) for item in obj]
-        elif isinstance(obj, float):
-            if np.isnan(obj) or np.isinf(obj):
-                return None
-            return obj
-        elif isinstance(obj, np.floating):
-            if np.isnan(obj) or np.isinf(obj):
-                return None
-            return float(obj)
-        elif isinstance(obj, np.integer):
-            return int(obj)
-        else:
-            return obj
+        """更新流式状态（消息不存在时不写入）"""
+        message.save_stream_status(status)
+
+    @staticmethod
+    def _classify_segments(
+        segments: List[dict], price_fallback: Optional[str], price_default: float
+    ) -> tuple:
+        """
+        批量计算趋势区段的收益率与情绪
+
+        Args:
+            segments: 区段列表（startPrice / endPrice / direction / type）
+            price_fallback: 缺少起止价格时回退使用的列（如 avgPrice），None 表示不回退
+            price_default: 仍缺失或无法解析时的默认价格
+
+        Returns:
+            (change_pcts, sentiments, directions, seg_types) 四个等长列表
+        """
+        if not segments:
+            return [], [], [], []
+
+        seg_df = pd.DataFrame(segments)
+        missing = pd.Series(np.nan, index=seg_df.index)
+
+        def prices(column: str) -> np.ndarray:
+            values = pd.to_numeric(seg_df.get(column, missing), errors="coerce")
+            if price_fallback:
+                values = values.fillna(
+                    pd.to_numeric(seg_df.get(price_fallback, missing), errors="coerce")
+                )
+            return values.fillna(price_default).to_numpy(dtype=np.float64)
+
+        start_p, end_p = prices("startPrice"), prices("endPrice")
+        safe_start = np.where(start_p != 0, start_p, 1.0)
+        change_pct = np.where(start_p != 0, (end_p - start_p) / safe_start, 0.0)
+
+        def lowered(column: str) -> pd.Series:
+            return seg_df.get(column, missing).fillna("").astype(str).str.lower()
+
+        direction, seg_type = lowered("direction"), lowered("type")
+        sentiment = np.select(
+            [
+                (direction == "up") | (seg_type == "bull"),
+                (direction == "down") | (seg_type == "bear"),
+            ],
+            ["positive", "negative"],
+            default="neutral",
+        )
+        return change_pct.tolist(), sentiment.tolist(), direction.tolist(), seg_type.tolist()
 
     async def _emit_event(
         self, event_queue: asyncio.Queue | None, message: Message, event: Dict
     ):
         """发送事件到队列、PubSub 和 Stream"""
 
-        # 清理NaN值以便JSON序列化
-        event_clean = self._clean_nan_values(event)
-
-        # 1. 发送到本地队列（如果存在）
+        # 1. 发送到本地队列（如果存在）：原样交给消费方，NaN/NumPy 类型由其序列化时处理
         if event_queue:
-            await event_queue.put(event_clean)
+            await event_queue.put(event)
 
         try:
-            # 2. 即时发布到 PubSub
-            channel = f"stream:{message.message_id}"
-            json_payload = json.dumps(event_clean, ensure_ascii=False)
-            self.redis.publish(channel, json_payload)
-
-            # 3. 持久化到 Stream（供断点续传使用）
-            stream_key = f"stream-events:{message.message_id}"
-            self.redis.xadd(
-                stream_key, {"data": json_payload}, maxlen=1000, approximate=True
+            # 序列化与 Redis 往返一起放到线程中执行（大事件如 time_series_full 序列化
+            # 同样耗时），不阻塞事件循环；同一消息的事件依次 await，顺序不变
+            await asyncio.to_thread(
+                self._publish_event,
+                message,
+                event,
+                event.get("type") in self.TERMINAL_EVENT_TYPES,
             )
-            self.redis.expire(stream_key, 86400)  # 24小时 TTL
-
         except Exception as e:
             print(f"[StreamingTask] Event storage error: {e}")
 
+    def _publish_event(self, message: Message, event: Dict, is_last: bool = False):
+        """序列化并发布事件：PubSub 即时推送 + Stream 持久化（一次往返）"""
+        # orjson 一次序列化为 bytes（NaN/Inf 输出为 null，直接支持 NumPy 类型），
+        # 无需先递归清理整个事件；PubSub 与 Stream 共用同一份 payload
+        payload = orjson.dumps(event, option=self.EVENT_JSON_OPTIONS)
+        stream_key = f"stream-events:{message.message_id}"
+        pipe = self.redis.pipeline(transaction=False)
+        # 2. 即时发布到 PubSub
+        pipe.publish(f"stream:{message.message_id}", payload)
+        # 3. 持久化到 Stream（供断点续传使用）
+        pipe.xadd(
+            stream_key,
+            {"data": payload},
+            maxlen=self.STREAM_MAXLEN,
+            approximate=True,
+        )
+        # 首个事件设置 TTL 即可；结束事件再续期一次，保证从最后一个事件起保留 24 小时
+        if is_last:
+            self._ttl_streams.discard(stream_key)
+            pipe.expire(stream_key, self.STREAM_TTL)
+        elif stream_key not in self._ttl_streams:
+            self._ttl_streams.add(stream_key)
+            pipe.expire(stream_key, self.STREAM_TTL)
+        pipe.execute()
+
     async def _emit_error(
         self, event_queue: asyncio.Queue | None, message: Message, error_msg: str
     ):
@@ -0,0 +1,114 @@
+"""
+分析任务队列
+============
+
+后台分析任务统一投递到 asyncio.Queue，由固定数量的 worker 协程消费，
+在途任务数与 HTTP 请求数解耦：突发请求只会排队，不会同时打满 LLM 连接。
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# 同时执行的分析任务数（每个任务内部还会并发多次 LLM 调用）
+MAX_WORKERS = int(os.getenv("ANALYSIS_WORKERS", 16))
+
+TaskFn = Callable[..., Awaitable[Any]]
+CancelFn = Callable[..., Any]
+TaskItem = Tuple[TaskFn, tuple, Optional[CancelFn]]
+
+
+class AnalysisTaskQueue:
+    """固定 worker 数的后台任务队列"""
+
+    def __init__(self, workers: int = MAX_WORKERS):
+        self.workers = workers
+        self._queue: Optional["asyncio.Queue[TaskItem]"] = None
+        self._tasks: List[asyncio.Task] = []
+        # worker 编号 -> 正在执行的任务（停止时用于回调 on_cancel）
+        self._running: Dict[int, TaskItem] = {}
+
+    def start(self):
+        """启动 worker（需在事件循环中调用，重复调用无副作用）"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        print(f"[TaskQueue] 已启动 {self.workers} 个 worker")
+
+    async def stop(self):
+        """
+        取消所有 worker
+
+        执行中被中断的任务与排队中未开始的任务都会调用其 on_cancel，
+        由调用方把对应状态标记为失败，避免停留在排队/执行中
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        dropped = list(self._running.values())
+        while self._queue is not None and not self._queue.empty():
+            dropped.append(self._queue.get_nowait())
+        for _, args, on_cancel in dropped:
+            if on_cancel is None:
+                continue
+            try:
+                await asyncio.to_thread(on_cancel, *args)
+            except Exception as e:
+                print(f"[TaskQueue] 取消回调异常: {e}")
+        if dropped:
+            print(f"[TaskQueue] 已停止，{len(dropped)} 个未完成任务被取消")
+
+        self._tasks = []
+        self._running = {}
+        self._queue = None
+
+    def submit(self, fn: TaskFn, *args: Any, on_cancel: Optional[CancelFn] = None):
+        """
+        投递任务，立即返回
+
+        Args:
+            fn: 异步任务函数
+            *args: 任务参数
+            on_cancel: 任务因队列停止而未完成时的同步回调（参数同 fn）
+        """
+        # 未经 lifespan 启动时（如测试直接挂载路由）按需启动
+        self.start()
+        self._queue.put_nowait((fn, args, on_cancel))
+
+    @property
+    def pending(self) -> int:
+        """排队中的任务数"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self, worker_id: int):
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            fn, args, _ = item
+            self._running[worker_id] = item
+            try:
+                await fn(*args)
+            except Exception as e:
+                # 任务内部已记录错误状态，这里只防止 worker 退出
+                print(f"[TaskQueue] worker {worker_id} 任务异常: {e}")
+            finally:
+                # 被取消时保留记录，由 stop() 回调 on_cancel
+                if not asyncio.current_task().cancelling():
+                    self._running.pop(worker_id, None)
+                queue.task_done()
+
+
+# 单例
+_task_queue: Optional[AnalysisTaskQueue] = None
+
+
+def get_task_queue() -> AnalysisTaskQueue:
+    """获取后台任务队列单例"""
+    global _task_queue
+    if _task_queue is None:
+        _task_queue = AnalysisTaskQueue()
+    return _task_queue
@@ -16,6 +16,7 @@ from .news import (
     search_web,
     fetch_domain_news,
     search_news_around_date,
+    search_news_around_dates,
 )
 # fetch_akshare_news 已移除，不再需要
 
@@ -40,6 +41,7 @@ __all__ = [
     "search_web",
     "fetch_domain_news",
     "search_news_around_date",
+    "search_news_around_dates",
     # analysis.py
     "recommend_forecast_params",
     # forecast.py
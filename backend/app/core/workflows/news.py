@@ -7,7 +7,7 @@
 
 import asyncio
 from datetime import datetime, timedelta
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 import pandas as pd
 
 from app.core.config import settings
@@ -231,6 +231,10 @@ async def fetch_domain_news(region_name: str, keywords: List[str]) -> List[dict]
         return []
 
 
+# Tavily 单次搜索的 max_results 上限
+TAVILY_MAX_RESULTS = 20
+
+
 async def search_news_around_date(
     keywords: List[str], target_date: str, days: int = 3, max_results: int = 3
 ) -> List[dict]:
@@ -251,8 +255,110 @@ async def search_news_around_date(
 
     try:
         dt = datetime.strptime(target_date, "%Y-%m-%d")
-        start_date = (dt - timedelta(days=days)).strftime("%Y-%m-%d")
-        end_date = (dt + timedelta(days=days)).strftime("%Y-%m-%d")
+    except ValueError as e:
+        print(f"[Search] Historical search failed: {e}")
+        return []
+    return await _search_news_between(
+        keywords, dt - timedelta(days=days), dt + timedelta(days=days), max_results
+    )
+
+
+async def search_news_around_dates(
+    keywords: List[str], target_dates: List[str], days: int = 3, max_results: int = 3
+) -> Dict[str, List[dict]]:
+    """
+    Search for news around several historical dates with coalesced requests.
+
+    Dates within 2*days of a cluster's first date are merged into that
+    cluster (so a cluster spans at most 4*days+1 days) and searched once;
+    clusters run concurrently. Each date then gets the dated results inside
+    its own window (nearest first); undated results of the cluster are dealt
+    out round-robin, each to at most one date.
+
+    Args:
+        keywords: Search keywords
+        target_dates: Target date strings (YYYY-MM-DD)
+        days: Window size in days (target_date +/- days)
+        max_results: Max results per date
+
+    Returns:
+        Mapping of target date -> list of result dicts
+    """
+    if not keywords:
+        return {}
+
+    parsed = []
+    for target_date in sorted(set(target_dates)):
+        try:
+            parsed.append((target_date, datetime.strptime(target_date, "%Y-%m-%d")))
+        except (TypeError, ValueError):
+            continue
+    if not parsed:
+        return {}
+
+    # 与簇首日期间隔 <= 2*days 时归入同一簇（按簇首而非相邻日期比较，簇跨度有上限）
+    clusters = [[parsed[0]]]
+    for item in parsed[1:]:
+        if (item[1] - clusters[-1][0][1]).days <= 2 * days:
+            clusters[-1].append(item)
+        else:
+            clusters.append([item])
+
+    results = await asyncio.gather(
+        *[
+            _search_news_between(
+                keywords,
+                cluster[0][1] - timedelta(days=days),
+                cluster[-1][1] + timedelta(days=days),
+                min(max_results * len(cluster), TAVILY_MAX_RESULTS),
+            )
+            for cluster in clusters
+        ]
+    )
+
+    news_by_date: Dict[str, List[dict]] = {}
+    for cluster, items in zip(clusters, results):
+        if len(cluster) == 1:
+            news_by_date[cluster[0][0]] = items[:max_results]
+            continue
+
+        published = pd.to_datetime(
+            [item.get("published_date") or None for item in items],
+            errors="coerce",
+            utc=True,
+            format="mixed",
+        ).tz_localize(None).normalize()
+        for target_date, dt in cluster:
+            distance = [
+                (abs((pub - dt).days), i)
+                for i, pub in enumerate(published)
+                if not pd.isna(pub) and abs((pub - dt).days) <= days
+            ]
+            news_by_date[target_date] = [items[i] for _, i in sorted(distance)][:max_results]
+
+        # 无发布日期的结果无法判断归属：轮流补给仍有空位的日期，每条只用一次
+        undated = iter(item for item, pub in zip(items, published) if pd.isna(pub))
+        open_dates = [d for d, _ in cluster if len(news_by_date[d]) < max_results]
+        while open_dates:
+            for target_date in list(open_dates):
+                item = next(undated, None)
+                if item is None:
+                    open_dates = []
+                    break
+                news_by_date[target_date].append(item)
+                if len(news_by_date[target_date]) >= max_results:
+                    open_dates.remove(target_date)
+
+    return news_by_date
+
+
+async def _search_news_between(
+    keywords: List[str], start: datetime, end: datetime, max_results: int
+) -> List[dict]:
+    """Run one Tavily search restricted to [start, end]."""
+    try:
+        start_date = start.strftime("%Y-%m-%d")
+        end_date = end.strftime("%Y-%m-%d")
 
         client = TavilyNewsClient(settings.tavily_api_key)
         query = " ".join(keywords[:3])
@@ -266,7 +372,7 @@ async def search_news_around_date(
             max_results=max_results,
             country="china",  # 限制为中国地区
         )
-        print(f"[Search] Historical search for {target_date} ({start_date}~{end_date})")
+        print(f"[Search] Historical search for {start_date}~{end_date}")
         return result.get("results", [])
     except Exception as e:
         print(f"[Search] Historical search failed: {e}")
@@ -22,6 +22,19 @@ import pandas as pd
 # 北京时区
 BEIJING_TZ = ZoneInfo("Asia/Shanghai")
 
+# 错误分类关键词（按优先级排列），编译为单个多模式正则，一次扫描即可命中所有类别
+ERROR_KEYWORDS = {
+    "invalid_code": ("not found", "不存在", "无", "代码错误", "invalid"),
+    "network": ("timeout", "network", "连接", "timed out"),
+    "permission": ("permission", "403", "401", "权限", "forbidden"),
+}
+_ERROR_KEYWORD_PATTERN = re.compile(
+    "|".join(
+        f"(?P<{error_type}>{'|'.join(re.escape(kw) for kw in keywords)})"
+        for error_type, keywords in ERROR_KEYWORDS.items()
+    )
+)
+
 
 def format_datetime(dt_str: str) -> str:
     """
@@ -233,13 +246,11 @@ class DataFetcher:
         if isinstance(e, (ConnectionError, TimeoutError)):
             return "network"
 
-        # 回退到关键词匹配
-        if any(kw in error_msg for kw in ["not found", "不存在", "无", "代码错误", "invalid"]):
-            return "invalid_code"
-        if any(kw in error_msg for kw in ["timeout", "network", "连接", "timed out"]):
-            return "network"
-        if any(kw in error_msg for kw in ["permission", "403", "401", "权限", "forbidden"]):
-            return "permission"
+        # 回退到关键词匹配（单次扫描收集命中类别，再按优先级返回）
+        matched = {m.lastgroup for m in _ERROR_KEYWORD_PATTERN.finditer(error_msg)}
+        for error_type in ERROR_KEYWORDS:
+            if error_type in matched:
+                return error_type
 
         return "unknown"
 
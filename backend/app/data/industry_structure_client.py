@@ -5,19 +5,63 @@
 使用LLM获取城市GDP和第二产业增加值数据，计算工业结构比例
 """
 
-from typing import Dict, Optional
-import json
+import time
+from typing import Dict, Optional, Tuple
+
+import orjson
+
 from app.agents.base import BaseAgent
+from app.core.redis_client import get_redis_raw
 
 
 class IndustryStructureClient(BaseAgent):
     """城市工业结构数据客户端"""
 
+    __slots__ = ("_cache",)
+
     DEFAULT_TEMPERATURE = 0.1
 
+    # 工业结构比例按年变化，结果缓存 24 小时（进程内 + Redis 跨进程共享）
+    CACHE_TTL = 24 * 60 * 60
+    # 失败/默认值只在进程内短暂缓存，避免故障期间反复调用，恢复后可重新获取
+    ERROR_CACHE_TTL = 5 * 60
+    REDIS_KEY_PREFIX = "industry_structure:"
+
     def __init__(self):
         super().__init__()
-        self._cache: Dict[str, Dict[str, float]] = {}
+        # 城市 -> (过期时间戳, 结果)
+        self._cache: Dict[str, Tuple[float, Dict[str, float]]] = {}
+
+    def get_cached(self, city_name: str) -> Optional[Dict[str, float]]:
+        """进程内缓存命中时直接返回（不访问网络），否则返回 None"""
+        entry = self._cache.get(city_name)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._cache[city_name]
+            return None
+        return result
+
+    def _remember(self, city_name: str, result: Dict[str, float], ttl: int):
+        self._cache[city_name] = (time.monotonic() + ttl, result)
+
+    def _load_shared(self, city_name: str) -> Optional[Dict[str, float]]:
+        """读取 Redis 中的共享缓存（Redis 不可用时视为未命中）"""
+        try:
+            raw = get_redis_raw().get(self.REDIS_KEY_PREFIX + city_name)
+            return orjson.loads(raw) if raw else None
+        except Exception as e:
+            print(f"[IndustryStructure] Redis 缓存读取失败: {e}")
+            return None
+
+    def _save_shared(self, city_name: str, result: Dict[str, float]):
+        try:
+            get_redis_raw().setex(
+                self.REDIS_KEY_PREFIX + city_name, self.CACHE_TTL, orjson.dumps(result)
+            )
+        except Exception as e:
+            print(f"[IndustryStructure] Redis 缓存写入失败: {e}")
 
     def fetch_industry_structure_data(self, city_name: str) -> Dict[str, float]:
         """
@@ -32,10 +76,17 @@ class IndustryStructureClient(BaseAgent):
             - year: 数据年份
             - source: 数据来源说明
         """
-        # 检查缓存
-        if city_name in self._cache:
+        # 检查缓存（进程内 -> Redis）
+        cached = self.get_cached(city_name)
+        if cached is not None:
             print(f"[IndustryStructure] 使用缓存数据: {city_name}")
-            return self._cache[city_name]
+            return cached
+
+        cached = self._load_shared(city_name)
+        if cached is not None:
+            print(f"[IndustryStructure] 使用 Redis 缓存数据: {city_name}")
+            self._remember(city_name, cached, self.CACHE_TTL)
+            return cached
 
         # 使用LLM获取数据
         system_prompt = """你是一个经济数据查询助手。根据给定的中国城市名称，查询该城市在2020-2025年之间任意一年的以下数据：
@@ -81,13 +132,14 @@ class IndustryStructureClient(BaseAgent):
             )
 
             # 解析JSON响应
-            data = json.loads(response)
+            data = orjson.loads(response)
 
             # 验证数据
             year = data.get("year")
             gdp = data.get("gdp")
             industry2 = data.get("industry2")
             source = data.get("source", "未知来源")
+            valid = False
 
             if year is None or gdp is None or industry2 is None:
                 print(f"[IndustryStructure] 无法获取 {city_name} 的数据，使用默认值")
@@ -116,11 +168,16 @@ class IndustryStructureClient(BaseAgent):
                         "year": year,
                         "source": source
                     }
+                    valid = True
 
                     print(f"[IndustryStructure] {city_name} ({year}年): GDP={gdp:.2f}亿元, 第二产业={industry2:.2f}亿元, 比例={ratio:.2%}")
 
-            # 缓存结果
-            self._cache[city_name] = result
+            # 缓存结果：仅真实数据写入 Redis 长期缓存，默认值只在进程内短暂缓存
+            if valid:
+                self._remember(city_name, result, self.CACHE_TTL)
+                self._save_shared(city_name, result)
+            else:
+                self._remember(city_name, result, self.ERROR_CACHE_TTL)
             return result
 
         except Exception as e:
@@ -130,8 +187,8 @@ class IndustryStructureClient(BaseAgent):
                 "year": None,
                 "source": f"错误: {str(e)}"
             }
-            # 即使出错也缓存，避免重复调用
-            self._cache[city_name] = result
+            # 出错也短暂缓存，避免故障期间重复调用
+            self._remember(city_name, result, self.ERROR_CACHE_TTL)
             return result
 
 
@@ -30,6 +30,9 @@ CITY_COORDINATES = {
     "天津": (39.3434, 117.3616),
 }
 
+# 城市名常见行政后缀
+ADMIN_SUFFIXES = ("市", "省", "自治区", "特别行政区")
+
 
 class WeatherClient:
     """Open-Meteo 天气数据客户端"""
@@ -58,7 +61,7 @@ class WeatherClient:
         """
         city_name = city_name.strip()
         # 去掉常见行政后缀以匹配标准名称
-        for suffix in ("市", "省", "自治区", "特别行政区"):
+        for suffix in ADMIN_SUFFIXES:
             if city_name.endswith(suffix) and city_name[:-len(suffix)] in CITY_COORDINATES:
                 city_name = city_name[:-len(suffix)]
                 break
@@ -1,13 +1,21 @@
 import os
 import asyncio
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v2 import api_router as api_router_v2
 from app.services.stock_matcher import get_stock_matcher  # 保留以兼容
 from app.services.region_matcher import get_region_matcher
-from app.services.rag_client import get_rag_client
+from app.services.rag_client import get_rag_client, close_rag_http_client
+from app.agents.llm_client import close_async_http_client
+from app.core.task_queue import get_task_queue
+from app.core.redis_client import RedisClient
 
 
 async def check_external_services():
@@ -38,13 +46,66 @@ async def check_external_services():
         print(f"[Startup] Region Matcher 初始化失败: {e}")
 
 
+# 请求级 INFO 日志过多的第三方 logger
+NOISY_LOGGERS = ("httpx", "httpcore")
+
+
+def setup_logging() -> QueueListener:
+    """
+    配置根 logger：记录经 QueueHandler 入队，由后台线程写 stdout，
+    并发请求的日志调用不会阻塞在 stdout 锁上
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    )
+    listener = QueueListener(log_queue, stream_handler)
+
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    # HTTP 客户端库在 INFO 级别逐请求打日志（每次 LLM/搜索调用一行），只保留警告以上
+    for name in NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    listener.start()
+    return listener
+
+
+# 阻塞调用线程数（asyncio.to_thread 与同步路由各自使用此上限，多为 Redis/HTTP 等 I/O 等待）
+BLOCKING_THREADS = int(os.getenv("BLOCKING_THREADS", 32))
+
+
+def setup_thread_pools():
+    """
+    设置阻塞调用线程池大小：
+
+    - asyncio 默认 executor（asyncio.to_thread，分析任务中的模型训练/Redis 读写）
+    - anyio 线程限制（FastAPI 同步路由）
+    """
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix="blocking")
+    )
+    anyio.to_thread.current_default_thread_limiter().total_tokens = BLOCKING_THREADS
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
+    log_listener = setup_logging()
+    setup_thread_pools()
     # 启动时：检查外部服务连接（不阻塞）
     asyncio.create_task(check_external_services())
+    # 启动后台分析任务 worker
+    get_task_queue().start()
     yield
-    # 关闭时：清理资源（如需要）
+    await get_task_queue().stop()
+    # 关闭时：释放共享的 LLM / RAG / Redis 连接池
+    await close_async_http_client()
+    await close_rag_http_client()
+    RedisClient.close()
+    log_listener.stop()
 
 
 app = FastAPI(title="小易猜猜 API", version="2.0.0", lifespan=lifespan)
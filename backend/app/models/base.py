@@ -14,6 +14,9 @@ from app.schemas.session_schema import ForecastResult
 class BaseForecaster(ABC):
     """预测器基类"""
 
+    # 非特征列（日期与目标值），构造特征矩阵时排除
+    NON_FEATURE_COLUMNS = frozenset({"ds", "y"})
+
     @abstractmethod
     def forecast(self, df: pd.DataFrame, horizon: int = 30) -> ForecastResult:
         """
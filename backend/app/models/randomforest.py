@@ -44,7 +44,7 @@ class RandomForestForecaster(BaseForecaster):
         feature_df = TimeSeriesAnalyzer.create_features(df, max_lag=min(30, len(df) // 2))
 
         # 准备训练数据
-        feature_cols = [col for col in feature_df.columns if col not in ["ds", "y"]]
+        feature_cols = [col for col in feature_df.columns if col not in self.NON_FEATURE_COLUMNS]
         X = feature_df[feature_cols].values
         y = feature_df["y"].values
 
@@ -40,7 +40,7 @@ class XGBoostForecaster(BaseForecaster):
         feature_df = TimeSeriesAnalyzer.create_features(df, max_lag=min(30, len(df) // 2))
 
         # 准备训练数据
-        feature_cols = [col for col in feature_df.columns if col not in ["ds", "y"]]
+        feature_cols = [col for col in feature_df.columns if col not in self.NON_FEATURE_COLUMNS]
         X = feature_df[feature_cols].values
         y = feature_df["y"].values
 
@@ -124,6 +124,8 @@ class XGBoostForecaster(BaseForecaster):
         forecast_points = []
         last_date = df["ds"].iloc[-1]
         last_values = df["y"].values[-30:].tolist()
+        # 每步都要判断特征是否存在，用集合代替列表查找
+        feature_set = frozenset(feature_cols)
 
         for i in range(horizon):
             future_date = last_date + timedelta(days=i + 1)
@@ -139,7 +141,7 @@ class XGBoostForecaster(BaseForecaster):
 
             for lag in [7, 14, 30]:
                 lag_col = f"lag_{lag}"
-                if lag_col in feature_cols:
+                if lag_col in feature_set:
                     if i + 1 >= lag:
                         if i + 1 - lag < len(forecast_points):
                             future_features[lag_col] = forecast_points[i + 1 - lag].value
@@ -155,7 +157,7 @@ class XGBoostForecaster(BaseForecaster):
             for window in [7, 14, 30]:
                 ma_col = f"ma_{window}"
                 std_col = f"std_{window}"
-                if ma_col in feature_cols:
+                if ma_col in feature_set:
                     window_values = all_values[-window:] if len(all_values) >= window else all_values
                     future_features[ma_col] = np.mean(window_values)
                     future_features[std_col] = np.std(window_values) if len(window_values) > 1 else 0
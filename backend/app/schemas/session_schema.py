@@ -11,14 +11,18 @@ Session 数据模型
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from enum import Enum
+from typing import List, Optional, Dict, Any, Literal
 
 
 # ========== 枚举类型 ==========
 
 
-class MessageStatus(str, Enum):
+# 状态字段直接存字符串（Literal 校验，不构造枚举对象）；下面的类只提供取值常量
+MessageStatusValue = Literal["pending", "processing", "completed", "error"]
+StepStatusValue = Literal["pending", "running", "completed", "error"]
+
+
+class MessageStatus:
     """消息状态"""
 
     PENDING = "pending"
@@ -27,7 +31,7 @@ class MessageStatus(str, Enum):
     ERROR = "error"
 
 
-class StepStatus(str, Enum):
+class StepStatus:
     """步骤状态"""
 
     PENDING = "pending"
@@ -120,7 +124,7 @@ class StepDetail(BaseModel):
 
     id: str
     name: str
-    status: StepStatus = StepStatus.PENDING
+    status: StepStatusValue = StepStatus.PENDING
     message: str = ""
 
 
@@ -258,7 +262,7 @@ class MessageData(BaseModel):
     user_query: str = ""
 
     # 状态
-    status: MessageStatus = MessageStatus.PENDING
+    status: MessageStatusValue = MessageStatus.PENDING
     steps: int = 0
     total_steps: int = 0
     step_details: List[StepDetail] = Field(default_factory=list)
@@ -316,7 +320,7 @@ class MessageData(BaseModel):
     thinking_logs: List[ThinkingLogEntry] = Field(default_factory=list)
 
     # 流式状态 (用于断点续传)
-    stream_status: str = Field(default="idle")  # idle | streaming | completed | error
+    stream_status: str = Field(default="idle")  # idle | queued | streaming | completed | error
 
 
 class SessionData(BaseModel):
@@ -339,8 +343,7 @@ class SessionData(BaseModel):
     message_ids: List[str] = Field(default_factory=list)
     current_message_id: Optional[str] = None
 
-    # 对话历史 (文本形式，用于 LLM 上下文)
-    conversation_history: List[Dict[str, str]] = Field(default_factory=list)
+    # 对话历史不在此模型中：单独存于 Redis List（见 app.core.session.Session）
 
 
 # ========== API 请求/响应模型 ==========
@@ -363,7 +366,7 @@ class AnalysisStatusResponse(BaseModel):
 
     session_id: str
     message_id: str
-    status: MessageStatus
+    status: MessageStatusValue
     steps: int
     total_steps: int = 0
     data: MessageData
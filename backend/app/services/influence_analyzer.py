@@ -9,6 +9,8 @@
 - 城市工业结构（第二产业增加值占GDP比例）
 """
 
+import math
+
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional, List
@@ -101,6 +103,10 @@ class InfluenceAnalyzer:
         
         power_values = merged_df['y'].values
         
+        # 时序数据点公共列：日期字符串与供电量整列转换一次，各因子共用
+        dates = merged_df['ds'].dt.strftime('%Y-%m-%d').tolist()
+        power_list = power_values.astype(float).tolist()
+        
         # 计算各因子的相关性和影响力得分
         factors_result = {}
         for factor_name, factor_values in factors_data.items():
@@ -117,17 +123,16 @@ class InfluenceAnalyzer:
                 )
             
             # 准备时序数据点
-            data_points = []
-            for i in range(len(merged_df)):
-                data_points.append({
-                    'date': merged_df.iloc[i]['ds'].strftime('%Y-%m-%d'),
-                    'power': float(power_values[i]),
-                    'factor_value': float(factor_values[i])
-                })
+            data_points = [
+                {'date': date, 'power': power, 'factor_value': value}
+                for date, power, value in zip(
+                    dates, power_list, factor_values.astype(float).tolist()
+                )
+            ]
             
             # 确保值不是NaN
-            correlation_clean = correlation if not (np.isnan(correlation) or np.isinf(correlation)) else 0.0
-            influence_score_clean = influence_score if not (np.isnan(influence_score) or np.isinf(influence_score)) else 0.0
+            correlation_clean = correlation if math.isfinite(correlation) else 0.0
+            influence_score_clean = influence_score if math.isfinite(influence_score) else 0.0
             
             factors_result[factor_name] = {
                 'correlation': round(float(correlation_clean), 4),
@@ -156,10 +161,10 @@ class InfluenceAnalyzer:
         valid_scores = [
             factor['influence_score'] 
             for factor in ranking 
-            if not (np.isnan(factor['influence_score']) or np.isinf(factor['influence_score']))
+            if math.isfinite(factor['influence_score'])
         ]
         overall_score = np.mean(valid_scores) if valid_scores else 0.0
-        if np.isnan(overall_score) or np.isinf(overall_score):
+        if not math.isfinite(overall_score):
             overall_score = 0.0
         
         result = {
@@ -227,7 +232,7 @@ class InfluenceAnalyzer:
         influence_score = abs(correlation) * (0.7 + 0.3 * significance_weight)
         
         # 确保influence_score不是NaN
-        if np.isnan(influence_score) or np.isinf(influence_score):
+        if not math.isfinite(influence_score):
             influence_score = 0.0
         
         return correlation, influence_score
@@ -428,7 +433,7 @@ class InfluenceAnalyzer:
         # 过滤掉NaN值的因子
         valid_ranking = [
             f for f in ranking 
-            if not (np.isnan(f.get('influence_score', np.nan)) or np.isinf(f.get('influence_score', np.nan)))
+            if math.isfinite(f.get('influence_score', math.nan))
         ]
         
         if not valid_ranking:
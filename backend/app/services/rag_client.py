@@ -2,6 +2,7 @@
 RAG Service Client
 
 HTTP client for calling the external RAG (Research Reports) service.
+All async requests share one keep-alive connection pool (see get_rag_http_client).
 """
 
 import httpx
@@ -9,6 +10,35 @@ from typing import Optional, List
 from pydantic import BaseModel
 
 from app.core.config import settings
+from app.agents.llm_client import HTTP2_AVAILABLE
+
+RAG_HTTP_LIMITS = httpx.Limits(
+    max_connections=200,
+    max_keepalive_connections=50,
+    keepalive_expiry=60.0,
+)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_rag_http_client() -> httpx.AsyncClient:
+    """获取共享的 RAG 服务异步 HTTP 客户端（单例，复用 keep-alive 连接）"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=RAG_HTTP_LIMITS,
+            timeout=30.0,
+        )
+    return _http_client
+
+
+async def close_rag_http_client():
+    """关闭共享的 RAG HTTP 客户端（应用关闭时调用）"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 class SearchFilters(BaseModel):
@@ -78,53 +108,54 @@ class RAGClient:
         Returns:
             SearchResponse with results
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                request_data = {
-                    "query": query,
-                    "top_k": top_k,
-                    "mode": mode,
-                    "use_rerank": use_rerank
-                }
-                if filters:
-                    request_data["filters"] = filters.model_dump(exclude_none=True)
-
-                response = await client.post(
-                    f"{self.base_url}/api/v1/search",
-                    json=request_data
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                return SearchResponse(
-                    query=data["query"],
-                    total=data["total"],
-                    results=[SearchResultItem(**r) for r in data["results"]],
-                    mode=data["mode"],
-                    took_ms=data["took_ms"],
-                    used_rerank=data["used_rerank"]
-                )
-
-            except httpx.HTTPError as e:
-                print(f"[RAGClient] HTTP error: {e}")
-                return SearchResponse(
-                    query=query,
-                    total=0,
-                    results=[],
-                    mode=mode,
-                    took_ms=0,
-                    used_rerank=False
-                )
-            except Exception as e:
-                print(f"[RAGClient] Error: {e}")
-                return SearchResponse(
-                    query=query,
-                    total=0,
-                    results=[],
-                    mode=mode,
-                    took_ms=0,
-                    used_rerank=False
-                )
+        client = get_rag_http_client()
+        try:
+            request_data = {
+                "query": query,
+                "top_k": top_k,
+                "mode": mode,
+                "use_rerank": use_rerank
+            }
+            if filters:
+                request_data["filters"] = filters.model_dump(exclude_none=True)
+
+            response = await client.post(
+                f"{self.base_url}/api/v1/search",
+                json=request_data,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            return SearchResponse(
+                query=data["query"],
+                total=data["total"],
+                results=[SearchResultItem(**r) for r in data["results"]],
+                mode=data["mode"],
+                took_ms=data["took_ms"],
+                used_rerank=data["used_rerank"]
+            )
+
+        except httpx.HTTPError as e:
+            print(f"[RAGClient] HTTP error: {e}")
+            return SearchResponse(
+                query=query,
+                total=0,
+                results=[],
+                mode=mode,
+                took_ms=0,
+                used_rerank=False
+            )
+        except Exception as e:
+            print(f"[RAGClient] Error: {e}")
+            return SearchResponse(
+                query=query,
+                total=0,
+                results=[],
+                mode=mode,
+                took_ms=0,
+                used_rerank=False
+            )
 
     def search_sync(
         self,
@@ -187,28 +218,28 @@ class RAGClient:
 
     async def health(self) -> dict:
         """Check service health"""
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                response = await client.get(f"{self.base_url}/api/v1/health")
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                return {
-                    "status": "unavailable",
-                    "error": str(e)
-                }
+        client = get_rag_http_client()
+        try:
+            response = await client.get(f"{self.base_url}/api/v1/health", timeout=10.0)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            return {
+                "status": "unavailable",
+                "error": str(e)
+            }
 
     async def get_stats(self) -> dict:
         """Get service statistics"""
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                response = await client.get(f"{self.base_url}/api/v1/stats")
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                return {
-                    "error": str(e)
-                }
+        client = get_rag_http_client()
+        try:
+            response = await client.get(f"{self.base_url}/api/v1/stats", timeout=10.0)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            return {
+                "error": str(e)
+            }
 
 
 # Singleton instance
@@ -106,6 +106,30 @@ CITY_ALIASES: Dict[str, str] = {
 }
 
 
+@lru_cache(maxsize=1024)
+def _normalize_region_name(region_name: str) -> Optional[str]:
+    """标准化区域名称（结果只取决于输入字符串，按输入缓存）"""
+    # 直接匹配
+    if region_name in SUPPORTED_REGIONS:
+        return region_name
+
+    # 别名匹配
+    if region_name in CITY_ALIASES:
+        return CITY_ALIASES[region_name]
+
+    # 模糊匹配（包含关系）
+    for standard_name in SUPPORTED_REGIONS.keys():
+        if standard_name in region_name or region_name in standard_name:
+            return standard_name
+
+    # 别名模糊匹配
+    for alias, standard_name in CITY_ALIASES.items():
+        if alias in region_name or region_name in alias:
+            return standard_name
+
+    return None
+
+
 class RegionMatcher:
     """区域匹配服务"""
 
@@ -136,28 +160,7 @@ class RegionMatcher:
         """
         if not region_name:
             return None
-
-        region_name = region_name.strip()
-
-        # 直接匹配
-        if region_name in SUPPORTED_REGIONS:
-            return region_name
-
-        # 别名匹配
-        if region_name in CITY_ALIASES:
-            return CITY_ALIASES[region_name]
-
-        # 模糊匹配（包含关系）
-        for standard_name in SUPPORTED_REGIONS.keys():
-            if standard_name in region_name or region_name in standard_name:
-                return standard_name
-
-        # 别名模糊匹配
-        for alias, standard_name in CITY_ALIASES.items():
-            if alias in region_name or region_name in alias:
-                return standard_name
-
-        return None
+        return _normalize_region_name(region_name.strip())
 
     def match(self, region_mention: str) -> Optional[RegionMatchResult]:
         """
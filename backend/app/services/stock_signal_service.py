@@ -8,7 +8,7 @@ Combines logic from dynamic clustering and significant points detection.
 
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
 from datetime import datetime, timedelta
 
 
@@ -37,7 +37,7 @@ class StockSignalService:
     # ==========================================
 
     def calculate_daily_scores(
-        self, df: pd.DataFrame, news_counts: Dict[str, int]
+        self, df: pd.DataFrame, news_counts: Optional[Dict[str, int]] = None
     ) -> pd.DataFrame:
         """Calculate daily composite scores for clustering."""
         if df.empty or len(df) < 2:
@@ -57,10 +57,14 @@ class StockSignalService:
         )
         df["vol_ratio"] = df["volume"] / rolling_vol_mean
 
-        # 3. News Density (log1p smoothed)
-        df["news_density"] = df["date"].apply(
-            lambda x: np.log1p(news_counts.get(str(x)[:10], 0))
-        )
+        # 3. News Density (log1p smoothed), vectorised lookup by date string
+        if news_counts:
+            counts = (
+                df["date"].astype(str).str[:10].map(news_counts).fillna(0).to_numpy()
+            )
+            df["news_density"] = np.log1p(counts.astype(np.float64))
+        else:
+            df["news_density"] = 0.0
 
         # 4. Normalize to 0-1
         for col in ["abs_return", "vol_ratio", "news_density"]:
@@ -104,49 +108,55 @@ class StockSignalService:
             t_high = max(t_high, 0.3)
             t_low = max(t_low, 0.2)
 
+        # Only positions above t_high can seed a zone; scan those directly and
+        # expand over a plain list (scalar indexing on ndarrays is slow)
+        n = len(scores)
+        score_list = scores.tolist()
+        seeds = np.flatnonzero(scores > t_high).tolist()
+
         zones = []
         i = 0
-        while i < len(scores):
-            if scores[i] > t_high:
-                zone_start = i
-                zone_end = i
-
-                # Expand forward
-                j = i + 1
-                while (
-                    j < len(scores)
-                    and scores[j] > t_low
-                    and (j - zone_start) < self.max_zone_days
-                ):
-                    zone_end = j
-                    j += 1
-
-                # Expand backward
-                j = i - 1
-                while (
-                    j >= 0 and scores[j] > t_low and (zone_end - j) < self.max_zone_days
-                ):
-                    zone_start = j
-                    j -= 1
-
-                zone_returns = returns[zone_start : zone_end + 1]
-                avg_return = float(np.mean(zone_returns))
-
-                zones.append(
-                    {
-                        "start_idx": zone_start,
-                        "end_idx": zone_end,
-                        "startDate": dates[zone_start],
-                        "endDate": dates[zone_end],
-                        "avg_score": float(np.mean(scores[zone_start : zone_end + 1])),
-                        "avg_return": avg_return,
-                        "zone_type": "cluster",
-                    }
-                )
+        for seed in seeds:
+            if seed < i:
+                # Already covered by the previous zone
+                continue
+            zone_start = seed
+            zone_end = seed
+
+            # Expand forward
+            j = seed + 1
+            while (
+                j < n
+                and score_list[j] > t_low
+                and (j - zone_start) < self.max_zone_days
+            ):
+                zone_end = j
+                j += 1
+
+            # Expand backward
+            j = seed - 1
+            while (
+                j >= 0 and score_list[j] > t_low and (zone_end - j) < self.max_zone_days
+            ):
+                zone_start = j
+                j -= 1
+
+            zone_returns = returns[zone_start : zone_end + 1]
+            avg_return = float(np.mean(zone_returns))
 
-                i = zone_end + 1
-            else:
-                i += 1
+            zones.append(
+                {
+                    "start_idx": zone_start,
+                    "end_idx": zone_end,
+                    "startDate": dates[zone_start],
+                    "endDate": dates[zone_end],
+                    "avg_score": float(np.mean(scores[zone_start : zone_end + 1])),
+                    "avg_return": avg_return,
+                    "zone_type": "cluster",
+                }
+            )
+
+            i = zone_end + 1
 
         return zones
 
@@ -180,9 +190,9 @@ class StockSignalService:
         return max(impact, 0.3)
 
     def generate_zones(
-        self, df: pd.DataFrame, news_counts: Dict[str, int]
+        self, df: pd.DataFrame, news_counts: Optional[Dict[str, int]] = None
     ) -> List[Dict]:
-        """Generate final anomaly zones."""
+        """Generate final anomaly zones (news density is 0 without news_counts)."""
         # Step 1: Calculate scores
         df_with_scores = self.calculate_daily_scores(df, news_counts)
 
@@ -339,93 +349,90 @@ class StockSignalService:
         if df.empty or len(df) < window_size * 2:
             return []
 
-        df = df.copy()
         # Ensure we have the target column 'y' (prophet format) or 'close' (stock format)
         target_col = "y" if "y" in df.columns else "close"
 
-        values = df[target_col].values
-        dates = df["date"].astype(str).str[:10].tolist()
-        n = len(values)
+        return self.detect_change_points_arr(
+            df[target_col].to_numpy(dtype=np.float64),
+            df["date"].astype(str).to_numpy(),
+            window_size=window_size,
+            threshold=threshold,
+        )
+
+    def detect_change_points_arr(
+        self,
+        values: np.ndarray,
+        dates: Sequence,
+        window_size: int = 5,
+        threshold: float = 1.5,
+    ) -> List[Dict]:
+        """
+        Array version of detect_change_points (no DataFrame needed).
 
-        change_points = []
+        Args:
+            values: Series values (float64 array).
+            dates: Dates aligned with values (only the first 10 chars are used).
+            window_size: Size of the window before and after to compare.
+            threshold: Z-score threshold for significance.
+
+        Returns:
+            List of dictionaries with change point details.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n < window_size * 2:
+            return []
 
         # Calculate rolling statistics for global context
         global_std = np.std(values)
         if global_std == 0:
             return []
 
-        # Sliding window DoM
-        for i in range(window_size, n - window_size):
-            # Window before: [i-window_size : i]
-            # Window after:  [i : i+window_size]
-            before = values[i - window_size : i]
-            after = values[i : i + window_size]
-
-            mean_before = np.mean(before)
-            mean_after = np.mean(after)
-
-            diff = mean_after - mean_before
-
-            # Key metric: Difference normalized by global std dev
-            # This represents "how many standard deviations did the level shift?"
-            score = abs(diff) / global_std
-
-            if score > threshold:
-                # Local check: is this a local maximum of change?
-                # This prevents consecutive points triggering for the same step
-                neighbor_scores = []
-                for j in range(max(window_size, i - 2), min(n - window_size, i + 3)):
-                    if j == i:
-                        continue
-
-                    b = values[j - window_size : j]
-                    a = values[j : j + window_size]
-                    neighbor_scores.append(abs(np.mean(a) - np.mean(b)) / global_std)
-
-                if not neighbor_scores or score >= max(neighbor_scores):
-                    change_points.append(
-                        {
-                            "date": dates[i],
-                            "index": i,
-                            "type": "rise" if diff > 0 else "drop",
-                            "magnitude": float(score),  # Z-score of the shift
-                            "diff_val": float(diff),  # Absolute value difference
-                            "confidence": min(
-                                float(score / threshold) * 0.5 + 0.5, 0.99
-                            ),
-                        }
-                    )
+        # Sliding window DoM, all positions at once:
+        # window_means[k] = mean(values[k : k + window_size]),
+        # so for i in [window_size, n - window_size) before = means[i - w], after = means[i]
+        window_means = np.lib.stride_tricks.sliding_window_view(values, window_size).mean(axis=1)
+        count = n - 2 * window_size
+        diffs = window_means[window_size : window_size + count] - window_means[:count]
+        # Key metric: Difference normalized by global std dev
+        # This represents "how many standard deviations did the level shift?"
+        scores = np.abs(diffs) / global_std
+
+        # Local check: is this a local maximum of change within +/-2 positions?
+        # This prevents consecutive points triggering for the same step
+        padded = np.pad(scores, 2, constant_values=-np.inf)
+        neighbor_max = np.maximum.reduce(
+            [padded[k : k + count] for k in (0, 1, 3, 4)]
+        )
+        candidates = np.flatnonzero((scores > threshold) & (scores >= neighbor_max))
+
+        change_points = [
+            {
+                "date": str(dates[k + window_size])[:10],
+                "index": int(k + window_size),
+                "type": "rise" if diffs[k] > 0 else "drop",
+                "magnitude": float(scores[k]),  # Z-score of the shift
+                "diff_val": float(diffs[k]),  # Absolute value difference
+                "confidence": min(float(scores[k] / threshold) * 0.5 + 0.5, 0.99),
+            }
+            for k in candidates
+        ]
 
         # Sort by magnitude descent
         change_points.sort(key=lambda x: x["magnitude"], reverse=True)
 
         # Fallback: if no points found with high threshold, try lower threshold
-        if not change_points and threshold > 0.5:
-            # Just do a quick scan here to guarantee at least 1 point
-            # Find the max single-step change
-            max_score = 0
-            best_idx = -1
-            best_diff = 0
-
-            for i in range(window_size, n - window_size):
-                before = values[i - window_size : i]
-                after = values[i : i + window_size]
-                diff = np.mean(after) - np.mean(before)
-                score = abs(diff) / (global_std if global_std > 0 else 1)
-
-                if score > max_score:
-                    max_score = score
-                    best_idx = i
-                    best_diff = diff
-
-            if best_idx != -1:
+        if not change_points and threshold > 0.5 and count:
+            # Guarantee at least 1 point: the max single-step change
+            best = int(np.argmax(scores))
+            if scores[best] > 0:
                 change_points.append(
                     {
-                        "date": dates[best_idx],
-                        "index": best_idx,
-                        "type": "rise" if best_diff > 0 else "drop",
-                        "magnitude": float(max_score),
-                        "diff_val": float(best_diff),
+                        "date": str(dates[best + window_size])[:10],
+                        "index": best + window_size,
+                        "type": "rise" if diffs[best] > 0 else "drop",
+                        "magnitude": float(scores[best]),
+                        "diff_val": float(diffs[best]),
                         "confidence": 0.5,  # Lower confidence for fallback
                         "is_fallback": True,
                     }
@@ -0,0 +1,129 @@
+"""Session / Message Redis 存储测试（fakeredis，需支持 Lua）"""
+import orjson
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Lua 脚本（_PATCH_SCRIPT 等）依赖
+
+from app.core import session as session_module
+from app.core.session import Message, Session
+from app.core.step_definitions import get_step_details
+from app.schemas.session_schema import MessageData, SessionData
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """替换为内存 Redis（原始 bytes 客户端，与 get_redis_raw 一致）"""
+    fake = fakeredis.FakeRedis()
+    monkeypatch.setattr(session_module, "get_redis_raw", lambda: fake)
+    return fake
+
+
+def test_open_for_query_stores_hashes(redis):
+    """新会话与消息以 Hash 存储，历史写入独立 List"""
+    session, message = Session.open_for_query(None, "北京下个月用电量")
+
+    assert redis.type(session.key) == b"hash"
+    assert redis.type(message.key) == b"hash"
+    assert message.get_stream_status() == "queued"
+
+    data = session.get()
+    assert data.title == "北京下个月用电量"
+    assert data.message_ids == [message.message_id]
+    assert session.get_conversation_history() == [
+        {"role": "user", "content": "北京下个月用电量"}
+    ]
+
+
+def test_patch_writes_only_existing_documents(redis):
+    """_patch 只更新存在的文档，不会为已删除的 key 写出残缺 hash"""
+    session, _ = Session.open_for_query(None, "问题")
+    assert session.update_title("新标题") is True
+    assert session.get().title == "新标题"
+
+    missing = Session("missing")
+    assert missing.update_title("x") is False
+    assert not redis.exists(missing.key)
+
+
+def test_update_step_detail_lua(redis):
+    """步骤更新由 Lua 脚本在服务端完成读改写"""
+    _, message = Session.open_for_query(None, "问题")
+    steps = get_step_details(is_forecast=True, is_in_scope=True, has_stock=False)
+    message._patch(total_steps=len(steps), step_details=steps)
+    message.update_step_detail(2, "running", "获取数据...")
+
+    data = message.get()
+    assert data.steps == 2
+    assert data.status == "processing"
+    assert data.step_details[1].status == "running"
+    assert data.step_details[1].message == "获取数据..."
+
+
+def test_history_trimmed_to_max(redis):
+    """对话历史只保留最近 MAX_HISTORY 条"""
+    session, _ = Session.open_for_query(None, "0")
+    for i in range(1, Session.MAX_HISTORY + 5):
+        session.add_conversation_message("user", str(i))
+
+    history = session.get_conversation_history()
+    assert len(history) == Session.MAX_HISTORY
+    assert history[-1]["content"] == str(Session.MAX_HISTORY + 4)
+
+
+def test_legacy_session_migrated_on_write(redis):
+    """旧版整文档字符串：写入时迁移为 Hash，对话历史迁移到 List"""
+    legacy = SessionData(
+        session_id="old", created_at="2024-01-01T00:00:00", updated_at="2024-01-01T00:00:00"
+    ).model_dump()
+    legacy["conversation_history"] = [
+        {"role": "user", "content": "旧问题"},
+        {"role": "assistant", "content": "旧回答"},
+    ]
+    redis.set("session:old", orjson.dumps(legacy))
+
+    session = Session("old")
+    assert session.update_title("x") is True
+    assert redis.type(session.key) == b"hash"
+    assert session.get().title == "x"
+
+    session.add_conversation_message("user", "新问题")
+    assert [entry["content"] for entry in session.get_conversation_history()] == [
+        "旧问题", "旧回答", "新问题",
+    ]
+
+
+def test_legacy_history_kept_when_pushed_before_migration(redis):
+    """迁移前已追加的新历史排在旧历史之后"""
+    legacy = SessionData(
+        session_id="old", created_at="2024-01-01T00:00:00", updated_at="2024-01-01T00:00:00"
+    ).model_dump()
+    legacy["conversation_history"] = [{"role": "user", "content": "旧问题"}]
+    redis.set("session:old", orjson.dumps(legacy))
+
+    session = Session("old")
+    session.add_conversation_message("user", "新问题")
+    assert [entry["content"] for entry in session.get_conversation_history()] == [
+        "旧问题", "新问题",
+    ]
+
+
+def test_legacy_message_migrated(redis):
+    """旧版消息：字段读取与步骤更新都会先迁移"""
+    legacy = MessageData(
+        message_id="m1",
+        session_id="s1",
+        user_query="问题",
+        created_at="2024-01-01T00:00:00",
+        updated_at="2024-01-01T00:00:00",
+        step_details=get_step_details(is_forecast=True, is_in_scope=True, has_stock=False),
+    )
+    redis.set("message:m1", legacy.model_dump_json())
+
+    message = Message("m1", "s1")
+    message.update_step_detail(1, "running", "识别意图...")
+    assert redis.type(message.key) == b"hash"
+
+    data = message.get()
+    assert data.user_query == "问题"
+    assert data.step_details[0].status == "running"
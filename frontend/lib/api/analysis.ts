@@ -284,6 +284,7 @@ export interface FullStreamEvent {
   step?: number
   step_name?: string
   content?: string
+  delta?: string  // thinking / report_chunk / chat_chunk 的增量文本
   data_type?: 'time_series_original' | 'time_series_full' | 'news' | 'emotion' | 'influence' | 'anomaly_zones' | 'rag_sources'
   data?: unknown
   prediction_start_day?: string
@@ -473,7 +474,8 @@ export async function resumeStream(
     // 任务已完成，返回 JSON 数据
     const result = await response.json()
     return {
-      completed: result.status !== 'streaming',
+      // 排队中的任务尚未开始，不视为已完成
+      completed: result.status !== 'streaming' && result.status !== 'queued',
       data: result.data
     }
   }
@@ -487,6 +489,10 @@ export async function resumeStream(
   }
 
   let buffer = ''
+  // 流式文本按增量下发，这里累积后再回调完整内容
+  let thinkingContent = ''
+  let reportContent = ''
+  let chatContent = ''
 
   try {
     while (true) {
@@ -527,7 +533,8 @@ export async function resumeStream(
                 break
 
               case 'thinking':
-                callbacks.onThinking?.(event.content || '')
+                thinkingContent += event.delta || ''
+                callbacks.onThinking?.(thinkingContent)
                 break
 
               case 'intent':
@@ -548,11 +555,13 @@ export async function resumeStream(
                 break
 
               case 'report_chunk':
-                callbacks.onReportChunk?.(event.content || '')
+                reportContent += event.delta || ''
+                callbacks.onReportChunk?.(reportContent)
                 break
 
               case 'chat_chunk':
-                callbacks.onChatChunk?.(event.content || '')
+                chatContent += event.delta || ''
+                callbacks.onChatChunk?.(chatContent)
                 break
 
               case 'emotion_chunk':